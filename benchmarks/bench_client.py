@@ -0,0 +1,86 @@
+"""
+Drives Client against the local PayU stand-in and reports throughput and latency percentiles per sub API.
+
+    python benchmarks/bench_client.py --requests 2000 --concurrency 16 --latency 0.005 --error-rate 0.01
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from payu.client import Client  # noqa: E402
+from payu.metrics import MetricsRegistry  # noqa: E402
+from payu.standin import StandInServer  # noqa: E402
+
+import data  # noqa: E402
+
+
+def get_operations(client):
+    return [
+        ('payments.ping', lambda i: client.payments.ping()),
+        ('payments.get_payments_methods', lambda i: client.payments.get_payments_methods()),
+        ('payments.make_payment', lambda i: client.payments.make_payment(**data.get_payment(i))),
+        ('tokenization.make_payment', lambda i: client.tokenization.make_payment(**data.get_token_payment(i))),
+        ('tokenization.get_tokens', lambda i: client.tokenization.get_tokens(**data.get_tokens_query())),
+        ('queries.ping', lambda i: client.queries.ping()),
+        ('queries.get_order_by_reference', lambda i: client.queries.get_order_by_reference('BENCH-{}'.format(i))),
+        ('queries.get_transaction_response', lambda i: client.queries.get_transaction_response('TX')),
+        ('recurring.get_plan', lambda i: client.recurring.get_plan('PLAN-{}'.format(i % 10))),
+        ('recurring.get_customer', lambda i: client.recurring.get_customer('CUSTOMER-{}'.format(i % 10))),
+        ('recurring.create_customer', lambda i: client.recurring.create_customer(full_name='Name',
+                                                                                 email='a@example.com')),
+    ]
+
+
+def timed(func, i):
+    start = time.perf_counter()
+    try:
+        func(i)
+    except Exception:
+        return time.perf_counter() - start, True
+    return time.perf_counter() - start, False
+
+
+def run(client, name, func, requests, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda i: timed(func, i), range(requests)))
+    elapsed = time.perf_counter() - start
+    data.report(name, [latency for latency, _ in results], elapsed, sum(error for _, error in results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500, help='calls per operation')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added by the stand-in to each response')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--slow-rate', type=float, default=0.0)
+    parser.add_argument('--slow-latency', type=float, default=1.0)
+    parser.add_argument('--non-json-rate', type=float, default=0.0)
+    parser.add_argument('--only', help='run only the operations whose name contains this text')
+    parser.add_argument('--metrics', action='store_true', help='record metrics and print them in Prometheus format')
+    args = parser.parse_args()
+
+    metrics = MetricsRegistry() if args.metrics else None
+
+    with StandInServer(latency=args.latency, error_rate=args.error_rate, slow_rate=args.slow_rate,
+                       slow_latency=args.slow_latency, non_json_rate=args.non_json_rate) as server:
+        with Client(data.API_LOGIN, data.API_KEY, data.MERCHANT_ID, data.ACCOUNT_ID, base_url=server.url,
+                    pool_maxsize=args.concurrency, metrics=metrics) as client:
+            data.print_header()
+            for name, func in get_operations(client):
+                if args.only and args.only not in name:
+                    continue
+                run(client, name, func, args.requests, args.concurrency)
+
+    if metrics is not None:
+        print()
+        print(metrics.to_prometheus(), end='')
+
+
+if __name__ == '__main__':
+    main()
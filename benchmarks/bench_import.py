@@ -0,0 +1,98 @@
+"""
+Measures the cold start of the client in fresh interpreters: importing payu.client, creating a Client and its first
+and second calls against the local PayU stand-in. Exits with an error when a median is over its budget or when the
+import loads modules that must only be loaded on first use.
+
+    python benchmarks/bench_import.py --runs 20 --import-budget 100 --first-call-budget 300
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from payu.standin import StandInServer  # noqa: E402
+
+import data  # noqa: E402
+
+# Modules that importing payu.client must not load: the HTTP stack, asyncio and the sub APIs.
+LAZY_MODULES = ('requests', 'urllib3', 'asyncio', 'payu.payments', 'payu.recurring', 'payu.tokenization',
+                'payu.queries', 'payu.watcher', 'payu.notifications', 'payu.batch')
+
+CHILD = """
+import json
+import sys
+import time
+
+start = time.perf_counter()
+from payu.client import Client
+imported = time.perf_counter()
+loaded = [name for name in {lazy_modules!r} if name in sys.modules]
+
+client = Client(*sys.argv[2:6], base_url=sys.argv[1])
+created = time.perf_counter()
+client.payments.ping()
+first = time.perf_counter()
+client.payments.ping()
+second = time.perf_counter()
+client.close()
+
+print(json.dumps({{
+    'import': imported - start,
+    'create': created - imported,
+    'first_call': first - created,
+    'second_call': second - first,
+    'loaded': loaded,
+}}))
+"""
+
+
+def run_child(url):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+    code = CHILD.format(lazy_modules=LAZY_MODULES)
+    arguments = [url] + [str(value) for value in (data.API_LOGIN, data.API_KEY, data.MERCHANT_ID, data.ACCOUNT_ID)]
+    output = subprocess.run([sys.executable, '-c', code] + arguments, env=env, check=True, stdout=subprocess.PIPE,
+                            universal_newlines=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='fresh interpreters to measure')
+    parser.add_argument('--import-budget', type=float, default=100.0, help='median ms allowed for the import')
+    parser.add_argument('--first-call-budget', type=float, default=300.0,
+                        help='median ms allowed from the end of the import to the first response')
+    args = parser.parse_args()
+
+    with StandInServer() as server:
+        results = [run_child(server.url) for _ in range(args.runs)]
+
+    print('{:<24} {:>9} {:>9} {:>9}'.format('phase', 'p50 ms', 'min ms', 'max ms'))
+    medians = {}
+    for phase in ('import', 'create', 'first_call', 'second_call'):
+        values = [result[phase] * 1000 for result in results]
+        medians[phase] = statistics.median(values)
+        print('{:<24} {:>9.2f} {:>9.2f} {:>9.2f}'.format(phase, medians[phase], min(values), max(values)))
+
+    failures = []
+    loaded = sorted(set(name for result in results for name in result['loaded']))
+    if loaded:
+        failures.append('importing payu.client loaded {}'.format(', '.join(loaded)))
+    if medians['import'] > args.import_budget:
+        failures.append('import took {:.2f} ms, over the budget of {:.2f} ms'.format(medians['import'],
+                                                                                     args.import_budget))
+    first_call = medians['create'] + medians['first_call']
+    if first_call > args.first_call_budget:
+        failures.append('the first call took {:.2f} ms, over the budget of {:.2f} ms'.format(first_call,
+                                                                                            args.first_call_budget))
+    for failure in failures:
+        print('FAIL: ' + failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
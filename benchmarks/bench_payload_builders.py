@@ -0,0 +1,124 @@
+"""
+Compares the precompiled SUBMIT_TRANSACTION builder with the previous path that coerced the enums, built the whole
+payload dict and JSON-encoded it on every call.
+
+    python benchmarks/bench_payload_builders.py --number 20000 --codec json
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from payu.builders import to_country, to_currency, to_franchise, to_transaction_type  # noqa: E402
+from payu.client import Client  # noqa: E402
+from payu.codecs import JSONCodec, get_default_codec  # noqa: E402
+from payu.enumerators import Country, Currency, Franchise, PaymentCommand, TransactionType  # noqa: E402
+
+import data  # noqa: E402
+
+
+def get_legacy_payload(client, *, reference_code, description, tx_value, tx_tax, tx_tax_return_base, currency,
+                       buyer, payer, credit_card, payment_method, payment_country, device_session_id, ip_address,
+                       cookie, user_agent, language=None, shipping_address=None, extra_parameters=None,
+                       notify_url=None, transaction_type=TransactionType.AUTHORIZATION_AND_CAPTURE):
+    if not isinstance(payment_country, Country):
+        payment_country = Country(payment_country)
+
+    if not isinstance(transaction_type, TransactionType):
+        transaction_type = TransactionType(transaction_type)
+
+    if not isinstance(payment_method, Franchise):
+        payment_method = Franchise(payment_method)
+
+    if not isinstance(currency, Currency):
+        currency = Currency(currency)
+
+    return {
+        "language": client.language.value,
+        "command": PaymentCommand.SUBMIT_TRANSACTION.value,
+        "merchant": {
+            "apiKey": client.api_key,
+            "apiLogin": client.api_login
+        },
+        "transaction": {
+            "order": {
+                "accountId": client.account_id,
+                "referenceCode": reference_code,
+                "description": description,
+                "language": language or client.language.value,
+                "signature": client._get_signature(reference_code, tx_value, currency.value),
+                "notifyUrl": notify_url,
+                "additionalValues": {
+                    "TX_VALUE": {
+                        "value": tx_value,
+                        "currency": currency.value
+                    },
+                    "TX_TAX": {
+                        "value": tx_tax,
+                        "currency": currency.value
+                    },
+                    "TX_TAX_RETURN_BASE": {
+                        "value": tx_tax_return_base,
+                        "currency": currency.value
+                    }
+                },
+                "buyer": buyer,
+                "shippingAddress": shipping_address
+            },
+            "payer": payer,
+            "creditCard": credit_card,
+            "extraParameters": extra_parameters,
+            "type": transaction_type.value,
+            "paymentMethod": payment_method.value,
+            "paymentCountry": payment_country.value,
+            "deviceSessionId": device_session_id,
+            "ipAddress": ip_address,
+            "cookie": cookie,
+            "userAgent": user_agent
+        },
+        "test": client.is_test
+    }
+
+
+def build_legacy(client, **kwargs):
+    return json.dumps(get_legacy_payload(client, **kwargs)).encode('utf-8')
+
+
+def build_precompiled(client, *, currency, payment_method, payment_country,
+                      transaction_type=TransactionType.AUTHORIZATION_AND_CAPTURE, **kwargs):
+    return client.transaction_builder.build(currency=to_currency(currency), payment_method=to_franchise(payment_method),
+                                            payment_country=to_country(payment_country),
+                                            transaction_type=to_transaction_type(transaction_type), **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--codec', choices=['default', 'json'], default='default',
+                        help='codec of the precompiled builder; default uses orjson when installed')
+    args = parser.parse_args()
+
+    codec = JSONCodec() if args.codec == 'json' else get_default_codec()
+    client = Client(data.API_LOGIN, data.API_KEY, data.MERCHANT_ID, data.ACCOUNT_ID, codec=codec)
+    payment = data.get_payment(1)
+    for tax in (payment['tx_tax'], None):
+        sample = dict(payment, tx_tax=tax)
+        assert bytes(build_precompiled(client, **sample)) == codec.dumps(get_legacy_payload(client, **sample))
+
+    results = {}
+    builder = 'precompiled builder ({})'.format(codec.name)
+    for name, func in (('legacy dict + json.dumps', build_legacy), (builder, build_precompiled)):
+        timer = timeit.Timer(lambda: func(client, **payment))
+        best = min(timer.repeat(repeat=args.repeat, number=args.number)) / args.number
+        results[name] = best
+        print('{:<32} {:>8.2f} us/payload'.format(name, best * 1e6))
+    legacy, precompiled = results.values()
+    print('{:<32} {:>8.2f}x'.format('speedup', legacy / precompiled))
+
+
+if __name__ == '__main__':
+    main()
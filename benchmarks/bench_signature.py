@@ -0,0 +1,53 @@
+"""
+Compares the signature engine with the former per-call path that formatted the whole
+"api_key~merchant_id~reference_code~tx_value~currency" string and hashed it from scratch.
+
+    python benchmarks/bench_signature.py --number 100000
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from payu.signature import SignatureEngine  # noqa: E402
+
+import data  # noqa: E402
+
+
+def sign_legacy(api_key, merchant_id, reference_code, tx_value, currency):
+    signature = '{}~{}~{}~{}~{}'.format(api_key, merchant_id, reference_code, tx_value, currency)
+    return hashlib.md5(signature.encode('utf')).hexdigest()
+
+
+def measure(name, func, number):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print('{:<32} {:>8.3f} us/signature'.format(name, elapsed / number * 1e6))
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=100000)
+    args = parser.parse_args()
+
+    engine = SignatureEngine(data.API_KEY, data.MERCHANT_ID)
+    items = [('REFERENCE-{}'.format(i), 10000 + i, 'COP') for i in range(args.number)]
+    confirmations = [(engine.sign_confirmation(reference, value, currency, '4'), reference, value, currency, '4')
+                     for reference, value, currency in items]
+    assert engine.sign(*items[0]) == sign_legacy(data.API_KEY, data.MERCHANT_ID, *items[0])
+
+    legacy = measure('legacy format + md5', lambda: [sign_legacy(data.API_KEY, data.MERCHANT_ID, *item)
+                                                    for item in items], args.number)
+    measure('engine.sign', lambda: [engine.sign(*item) for item in items], args.number)
+    bulk = measure('engine.sign_many', lambda: engine.sign_many(items), args.number)
+    print('{:<32} {:>8.2f}x'.format('sign_many speedup', legacy / bulk))
+    measure('engine.verify_many', lambda: engine.verify_many(confirmations), args.number)
+
+
+if __name__ == '__main__':
+    main()
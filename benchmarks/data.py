@@ -0,0 +1,102 @@
+import datetime
+
+API_LOGIN = 'pRRXKOl8ikMmt9u'
+API_KEY = '4Vj8eK4rloUd272L48hsrarnUA'
+MERCHANT_ID = 508029
+ACCOUNT_ID = 512321
+
+BUYER = {
+    "merchantBuyerId": "1",
+    "fullName": "First name and second buyer name",
+    "emailAddress": "buyer_test@test.com",
+    "contactPhone": "7563126",
+    "dniNumber": "5415668464654",
+    "shippingAddress": {
+        "street1": "calle 100",
+        "street2": "5555487",
+        "city": "Medellin",
+        "state": "Antioquia",
+        "country": "CO",
+        "postalCode": "000000",
+        "phone": "7563126"
+    }
+}
+
+PAYER = {
+    "merchantPayerId": "1",
+    "fullName": "First name and second payer name",
+    "emailAddress": "payer_test@test.com",
+    "contactPhone": "7563126",
+    "dniNumber": "5415668464654",
+    "billingAddress": {
+        "street1": "calle 93",
+        "street2": "125544",
+        "city": "Bogota",
+        "state": "Bogota DC",
+        "country": "CO",
+        "postalCode": "000000",
+        "phone": "7563126"
+    }
+}
+
+CREDIT_CARD = {
+    "number": "4097440000000004",
+    "securityCode": "321",
+    "expirationDate": "2022/12",
+    "name": "APPROVED"
+}
+
+
+def get_payment(i):
+    return {
+        'reference_code': 'BENCH-{}'.format(i),
+        'description': 'Benchmark payment',
+        'tx_value': 10000,
+        'tx_tax': 0,
+        'tx_tax_return_base': 0,
+        'currency': 'COP',
+        'buyer': BUYER,
+        'payer': PAYER,
+        'credit_card': CREDIT_CARD,
+        'payment_method': 'VISA',
+        'payment_country': 'CO',
+        'device_session_id': 'vghs6tvkcle931686k1900o6e1',
+        'ip_address': '127.0.0.1',
+        'cookie': 'pt1t38347bs6jc9ruv2ecpv7o2',
+        'user_agent': 'Mozilla/5.0 (Windows NT 5.1; rv:18.0) Gecko/20100101 Firefox/18.0',
+        'extra_parameters': {'INSTALLMENTS_NUMBER': 1},
+        'notify_url': 'https://example.com/payu/notification/',
+    }
+
+
+def get_token_payment(i):
+    payment = get_payment(i)
+    for key in ('tx_tax', 'tx_tax_return_base', 'credit_card'):
+        del payment[key]
+    payment['credit_card_token_id'] = 'b01877c3-b044-455a-99f5-82aed33795e9'
+    return payment
+
+
+def get_tokens_query():
+    now = datetime.datetime(2018, 1, 1)
+    return {'payer_id': '1', 'credit_card_token_id': 'b01877c3-b044-455a-99f5-82aed33795e9',
+            'start_date': now.replace(year=2017), 'end_date': now}
+
+
+def percentile(ordered, p):
+    if not ordered:
+        return float('nan')
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def report(name, latencies, elapsed, errors=0):
+    ordered = sorted(latencies)
+    print('{:<40} {:>8} {:>6} {:>10.1f} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f}'.format(
+        name, len(ordered), errors, len(ordered) / elapsed if elapsed else 0,
+        percentile(ordered, 50) * 1000, percentile(ordered, 90) * 1000, percentile(ordered, 99) * 1000,
+        (ordered[-1] if ordered else 0) * 1000))
+
+
+def print_header():
+    print('{:<40} {:>8} {:>6} {:>10} {:>9} {:>9} {:>9} {:>9}'.format(
+        'operation', 'calls', 'errors', 'calls/s', 'p50 ms', 'p90 ms', 'p99 ms', 'max ms'))
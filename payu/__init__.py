@@ -0,0 +1,5 @@
+import logging
+
+# The library never configures logging; applications add their own handlers, or call
+# payu.logs.enable_async_logging().
+logging.getLogger(__name__).addHandler(logging.NullHandler())
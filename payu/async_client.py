@@ -0,0 +1,273 @@
+import asyncio
+import time
+
+from payu.batch import run_batch_async
+from payu.cache import AsyncStaleWhileRevalidateCache
+from payu.circuit import CircuitState, probing
+from payu.client import Client
+from payu.enumerators import PaymentCommand
+from payu.exceptions import AmbiguousTransactionError
+from payu.retry import get_reference_code
+from payu.singleflight import AsyncSingleFlight
+
+
+class AsyncClient(Client):
+    """
+    Asyncio flavor of the Client. The payments, tokenization, recurring and queries sub APIs are the very same classes
+    used by the synchronous client, so both build identical payloads; with this client their methods return
+    awaitables instead of parsed responses.
+
+    It requires the optional httpx dependency (pip install payu-python[async]). Its connection pool opens at most
+    pool_maxsize connections and keeps all of them alive; further calls wait for a free one.
+    """
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def __enter__(self):
+        raise TypeError('Use "async with" with AsyncClient.')
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def _create_session(self):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError('AsyncClient requires httpx. Install it with: pip install payu-python[async]')
+
+        # httpx has a single pool for every host instead of one pool per host, and the client only talks to PayU:
+        # pool_maxsize bounds the open connections, all of which can be kept alive. pool_connections has no
+        # equivalent, and calls always wait for a free connection as if pool_block were True.
+        limits = httpx.Limits(max_connections=self.pool_maxsize, max_keepalive_connections=self.pool_maxsize)
+        return httpx.AsyncClient(limits=limits)
+
+    async def close(self):
+        """
+        Releases the pooled connections shared by all the sub APIs.
+
+        Returns:
+
+        """
+        for executor in (self._hedging_executor, self._refresh_executor):
+            if executor is not None:
+                executor.shutdown(wait=False)
+        if self._owns_session and self._session is not None:
+            await self._session.aclose()
+
+    def batch(self, calls, max_workers=10, stream=False):
+        """
+        Asyncio version of Client.batch(). The callables must return awaitables, like the methods of the sub APIs of
+        this client.
+
+        Args:
+            calls: Iterable of callables, (callable, kwargs) or (callable, args, kwargs) tuples.
+            max_workers: Maximum number of calls awaited at the same time.
+            stream: Whether to return an async generator that yields the results as they complete instead of an
+            awaitable of the list with the results in the order of the calls.
+
+        Returns:
+            Awaitable of a list, or async generator, of payu.batch.BatchResult.
+
+        """
+        if stream:
+            return run_batch_async(calls, max_workers=max_workers, ordered=False)
+        return self._collect(run_batch_async(calls, max_workers=max_workers))
+
+    async def _consume(self, results, callback, value):
+        async for result in results:
+            callback(result)
+        return value
+
+    def _iter_windows(self, fetch, windows, get_records, max_workers):
+        from payu.history import iter_windows_async
+
+        return iter_windows_async(fetch, windows, get_records, max_workers=max_workers)
+
+    def create_order_watcher(self, callback=None, **kwargs):
+        """
+        Asyncio version of Client.create_order_watcher(). The callback may be a coroutine function.
+
+        Returns:
+            payu.watcher.AsyncOrderWatcher.
+
+        """
+        from payu.watcher import AsyncOrderWatcher
+
+        return AsyncOrderWatcher(self, callback=callback, **kwargs)
+
+    async def _collect(self, results):
+        return [result async for result in results]
+
+    async def _request(self, method, url, headers=None, timeout=None, **kwargs):
+        command = self._get_command(method, url, kwargs)
+        info = self._prepare(command, method, url, kwargs)
+
+        key = self._get_flight_key(command, method, url, kwargs)
+        if key is not None:
+            return await self.flights.do(key, self._call, command, method, url, headers, timeout, kwargs, info)
+        return await self._call(command, method, url, headers, timeout, kwargs, info)
+
+    async def _call(self, command, method, url, headers, timeout, kwargs, info=None):
+        if info is None:
+            return await self._call_with_retries(command, method, url, headers, timeout, kwargs)
+        self._before_call(info, kwargs)
+        try:
+            return await self._call_with_retries(command, method, url, headers, timeout, kwargs, info)
+        except Exception as e:
+            info.error = e
+            raise
+        finally:
+            self._after_call(info)
+
+    async def _call_with_retries(self, command, method, url, headers, timeout, kwargs, info=None):
+        _headers = self._prepare_headers(headers)
+        if isinstance(kwargs.get('data'), bytes):
+            # httpx takes raw bodies through content.
+            kwargs['content'] = kwargs.pop('data')
+
+        breaker = self._get_circuit_breaker(url)
+        probe = breaker is not None and await self._check_circuit(breaker, command)
+
+        if self.is_debug:
+            self.logger.debug('%s %s %s %s', method, url, headers, kwargs)
+
+        try:
+            attempt = 0
+            while True:
+                attempt += 1
+                if info is not None:
+                    info.attempts = attempt
+                _timeout = self._get_timeout(command, timeout)
+                start = time.monotonic()
+                try:
+                    response = await self._send(command, method, url, headers=_headers, timeout=_timeout, **kwargs)
+                except Exception as e:
+                    if not self._is_transport_error(e):
+                        raise
+                    probe = self._record_call(breaker, False, start, probe)
+                    delay = self._get_retry_delay(command, attempt, error=e)
+                    if delay is not None:
+                        await asyncio.sleep(delay)
+                        continue
+                    if command == PaymentCommand.SUBMIT_TRANSACTION.value and not self._is_connect_error(e):
+                        return await self._resolve_transaction(kwargs, e)
+                    raise
+
+                probe = self._record_call(breaker, response.status_code < 500, start, probe)
+                delay = self._get_retry_delay(command, attempt, status_code=response.status_code)
+                if delay is not None:
+                    await asyncio.sleep(delay)
+                    continue
+                if self.retry_policy.is_ambiguous_status(command, response.status_code):
+                    return await self._resolve_transaction(kwargs, self._parse(response, info))
+                return self._parse(response, info)
+        except BaseException:
+            if probe:
+                # The probe ended without an outcome, e.g. its deadline expired or it was cancelled.
+                breaker.open()
+            raise
+
+    async def _send(self, command, method, url, **kwargs):
+        if self.hedging is None or not self.hedging.is_hedgeable(command):
+            return await self.session.request(method, url, **kwargs)
+
+        start = time.monotonic()
+        first = asyncio.ensure_future(self.session.request(method, url, **kwargs))
+        done, _ = await asyncio.wait({first}, timeout=self.hedging.get_delay(command))
+        if done:
+            self.hedging.count(command)
+            response = first.result()
+            self.hedging.record(command, time.monotonic() - start)
+            return response
+
+        second = asyncio.ensure_future(self.session.request(method, url, **kwargs))
+        pending = {first, second}
+        winner = error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        error = e
+                        continue
+                    winner = task
+                    self.hedging.count(command, hedged=True, hedge_won=task is second)
+                    self.hedging.record(command, time.monotonic() - start)
+                    return response
+        finally:
+            for task in (first, second):
+                if task is winner:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled() and task.exception() is None:
+                    # Both attempts answered at the same time: the losing response gives its connection back.
+                    await task.result().aclose()
+        self.hedging.count(command, hedged=True)
+        raise error
+
+    async def _then(self, response, callback):
+        return callback(await response)
+
+    async def _resolved(self, value):
+        return value
+
+    def _create_flights(self):
+        return AsyncSingleFlight()
+
+    def _create_cache(self, ttl, stale_ttl=None):
+        return AsyncStaleWhileRevalidateCache(ttl, stale_ttl, is_cacheable=self._is_success)
+
+    async def _check_circuit(self, breaker, command):
+        if breaker.before_call() == CircuitState.CLOSED:
+            return False
+
+        ping = self._get_ping(breaker.name)
+        if ping is None or command == PaymentCommand.PING.value:
+            return True
+
+        token = probing.set(True)
+        try:
+            response = await ping()
+        except Exception:
+            response = None
+        except BaseException:
+            breaker.open()
+            raise
+        finally:
+            probing.reset(token)
+        return self._finish_probe(breaker, response)
+
+    async def _resolve_transaction(self, kwargs, error):
+        reference_code = get_reference_code(kwargs)
+        if reference_code is None:
+            raise AmbiguousTransactionError('The transaction outcome is unknown: {}'.format(error))
+
+        try:
+            response = await self.queries.get_order_by_reference(reference_code)
+        except Exception as e:
+            fmt = 'The transaction {} outcome is unknown and it could not be resolved: {}'
+            raise AmbiguousTransactionError(fmt.format(reference_code, e), reference_code) from e
+        return self._get_resolved_response(reference_code, response, error)
+
+    def _is_transport_error(self, error):
+        import httpx
+
+        return isinstance(error, httpx.TransportError)
+
+    def _is_connect_error(self, error):
+        import httpx
+
+        return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout))
+
+    def _get_timeout(self, command, timeout=None):
+        import httpx
+
+        connect, read = super()._get_timeout(command, timeout)
+        return httpx.Timeout(read, connect=connect)
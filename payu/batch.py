@@ -0,0 +1,149 @@
+import asyncio
+import contextvars
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class BatchResult(namedtuple('BatchResult', ['index', 'result', 'error'])):
+    """
+    Outcome of one call of a batch: the index of the call spec in the input, the value it returned and the exception
+    it raised, if any.
+    """
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def get_call(spec):
+    """
+
+    Args:
+        spec: A callable, a (callable, kwargs) tuple or a (callable, args, kwargs) tuple, e.g.
+        (client.payments.make_payment, {'reference_code': 'REF1', ...}).
+
+    Returns:
+        Tuple of callable, args and kwargs.
+
+    """
+    if callable(spec):
+        return spec, (), {}
+    if len(spec) == 2:
+        func, kwargs = spec
+        return func, (), kwargs
+    func, args, kwargs = spec
+    return func, args, kwargs
+
+
+def _run(spec):
+    func, args, kwargs = get_call(spec)
+    return func(*args, **kwargs)
+
+
+async def _run_async(spec):
+    # The call itself runs in the task, so an exception raised before it returns an awaitable, e.g. a validation
+    # error, is captured like any other.
+    return await _run(spec)
+
+
+def run_batch(specs, max_workers=10, ordered=True):
+    """
+    Runs the calls on a pool of at most max_workers threads. Only a bounded number of calls is pulled from the
+    iterable at a time, so it can be a generator of any length. Exceptions are captured per call.
+
+    Args:
+        specs: Iterable of call specs, see get_call().
+        max_workers: Maximum number of calls running at the same time.
+        ordered: Whether the results are yielded in the order of the specs instead of as they complete.
+
+    Returns:
+        Generator of BatchResult.
+
+    """
+    window = max_workers * 2
+    specs = enumerate(specs)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='payu-batch') as executor:
+        pending = {}
+        finished = {}
+        next_index = 0
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) + len(finished) < window:
+                try:
+                    index, spec = next(specs)
+                except StopIteration:
+                    exhausted = True
+                    break
+                # Each call keeps the context of the caller, e.g. an active client.deadline().
+                future = executor.submit(contextvars.copy_context().run, _run, spec)
+                pending[future] = index
+
+            if not pending and not finished:
+                return
+
+            if pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    error = future.exception()
+                    result = BatchResult(index, None if error else future.result(), error)
+                    if ordered:
+                        finished[index] = result
+                    else:
+                        yield result
+
+            while next_index in finished:
+                yield finished.pop(next_index)
+                next_index += 1
+
+
+async def run_batch_async(specs, max_workers=10, ordered=True):
+    """
+    Asyncio version of run_batch(). The callables must return awaitables.
+
+    Args:
+        specs: Iterable of call specs, see get_call().
+        max_workers: Maximum number of calls awaited at the same time.
+        ordered: Whether the results are yielded in the order of the specs instead of as they complete.
+
+    Returns:
+        Async generator of BatchResult.
+
+    """
+    window = max_workers
+    specs = enumerate(specs)
+    pending = {}
+    finished = {}
+    next_index = 0
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) + len(finished) < window:
+                try:
+                    index, spec = next(specs)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[asyncio.ensure_future(_run_async(spec))] = index
+
+            if not pending and not finished:
+                return
+
+            if pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index = pending.pop(task)
+                    error = task.exception()
+                    result = BatchResult(index, None if error else task.result(), error)
+                    if ordered:
+                        finished[index] = result
+                    else:
+                        yield result
+
+            while next_index in finished:
+                yield finished.pop(next_index)
+                next_index += 1
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,193 @@
+from payu.enumerators import Country, Currency, Franchise, PaymentCommand, TransactionType
+
+
+def _get_table(enum):
+    table = {member.value: member for member in enum}
+    table.update({member: member for member in enum})
+    return table
+
+
+COUNTRIES = _get_table(Country)
+CURRENCIES = _get_table(Currency)
+FRANCHISES = _get_table(Franchise)
+TRANSACTION_TYPES = _get_table(TransactionType)
+
+
+def _coerce(table, enum, value):
+    try:
+        return table[value]
+    except (KeyError, TypeError):
+        # Let the enum raise its usual ValueError.
+        return enum(value)
+
+
+def to_known_enum(enum, value):
+    """
+    Lenient mapping for values read from PayU responses and notifications, which may have members the enum does not
+    know yet.
+
+    Returns:
+        The member of the enum, the value itself if it is not one, or None.
+
+    """
+    if value is None:
+        return None
+    try:
+        return enum(value)
+    except ValueError:
+        return value
+
+
+def to_country(value):
+    return _coerce(COUNTRIES, Country, value)
+
+
+def to_currency(value):
+    return _coerce(CURRENCIES, Currency, value)
+
+
+def to_franchise(value):
+    return _coerce(FRANCHISES, Franchise, value)
+
+
+def to_transaction_type(value):
+    return _coerce(TRANSACTION_TYPES, TransactionType, value)
+
+
+class EncodedPayload(bytes):
+    """
+    JSON body already serialized to bytes, which keeps the command and reference code it was built for so the client
+    does not need to decode it again.
+    """
+
+    def __new__(cls, body, command, reference_code=None):
+        payload = super().__new__(cls, body)
+        payload.command = command
+        payload.reference_code = reference_code
+        return payload
+
+
+class SubmitTransactionBuilder(object):
+    """
+    Precompiled builder of SUBMIT_TRANSACTION bodies for one client. The static sections (language, command, merchant
+    and test flag) are serialized once and only the transaction itself is encoded on each call, with the codec of the
+    client.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.dumps = client.codec.dumps
+        self.account_id = client.account_id
+        self.language = client.language.value
+
+        merchant = {
+            "apiKey": client.api_key,
+            "apiLogin": client.api_login
+        }
+        self._prefix = b''.join([
+            b'{"language":', self.dumps(self.language),
+            b',"command":', self.dumps(PaymentCommand.SUBMIT_TRANSACTION.value),
+            b',"merchant":', self.dumps(merchant),
+            b',"transaction":'
+        ])
+        self._suffix = b''.join([b',"test":', self.dumps(client.is_test), b'}'])
+
+    def build(self, *, reference_code, description, tx_value, tx_tax, tx_tax_return_base, currency, buyer, payer,
+              credit_card, payment_method, payment_country, device_session_id, ip_address, cookie, user_agent,
+              transaction_type, language=None, shipping_address=None, extra_parameters=None, notify_url=None):
+        """
+        Builds the body of a payment with a credit card, with the same keys, in the same order, as
+        Payment.make_payment always sent: TX_TAX, TX_TAX_RETURN_BASE and creditCard are sent even when they are None.
+        The enumerations must be already coerced with the to_* functions of this module.
+
+        Returns:
+            EncodedPayload.
+
+        """
+        currency_value = currency.value
+        additional_values = {
+            "TX_VALUE": {
+                "value": tx_value,
+                "currency": currency_value
+            },
+            "TX_TAX": {
+                "value": tx_tax,
+                "currency": currency_value
+            },
+            "TX_TAX_RETURN_BASE": {
+                "value": tx_tax_return_base,
+                "currency": currency_value
+            }
+        }
+        transaction = {
+            "order": self._get_order(reference_code, description, tx_value, currency_value, additional_values, buyer,
+                                     language, shipping_address, notify_url),
+            "payer": payer,
+            "creditCard": credit_card,
+            "extraParameters": extra_parameters,
+            "type": transaction_type.value,
+            "paymentMethod": payment_method.value,
+            "paymentCountry": payment_country.value,
+            "deviceSessionId": device_session_id,
+            "ipAddress": ip_address,
+            "cookie": cookie,
+            "userAgent": user_agent
+        }
+        return self._encode(transaction, reference_code)
+
+    def build_token(self, *, reference_code, description, tx_value, currency, buyer, payer, credit_card_token_id,
+                    payment_method, payment_country, device_session_id, ip_address, cookie, user_agent,
+                    transaction_type, language=None, shipping_address=None, extra_parameters=None, notify_url=None,
+                    security_code=None):
+        """
+        Builds the body of a payment with a credit card token, with the same keys, in the same order, as
+        Tokenization.make_payment always sent: only TX_VALUE, and creditCard only with a security code.
+
+        Returns:
+            EncodedPayload.
+
+        """
+        currency_value = currency.value
+        additional_values = {
+            "TX_VALUE": {
+                "value": tx_value,
+                "currency": currency_value
+            }
+        }
+        transaction = {
+            "order": self._get_order(reference_code, description, tx_value, currency_value, additional_values, buyer,
+                                     language, shipping_address, notify_url),
+            "payer": payer,
+            "creditCardTokenId": credit_card_token_id,
+            "extraParameters": extra_parameters,
+            "type": transaction_type.value,
+            "paymentMethod": payment_method.value,
+            "paymentCountry": payment_country.value,
+            "deviceSessionId": device_session_id,
+            "ipAddress": ip_address,
+            "cookie": cookie,
+            "userAgent": user_agent
+        }
+        if security_code:
+            transaction["creditCard"] = {
+                "securityCode": security_code
+            }
+        return self._encode(transaction, reference_code)
+
+    def _get_order(self, reference_code, description, tx_value, currency_value, additional_values, buyer, language,
+                   shipping_address, notify_url):
+        return {
+            "accountId": self.account_id,
+            "referenceCode": reference_code,
+            "description": description,
+            "language": language or self.language,
+            "signature": self.client._get_signature(reference_code, tx_value, currency_value),
+            "notifyUrl": notify_url,
+            "additionalValues": additional_values,
+            "buyer": buyer,
+            "shippingAddress": shipping_address
+        }
+
+    def _encode(self, transaction, reference_code):
+        body = self._prefix + self.dumps(transaction) + self._suffix
+        return EncodedPayload(body, PaymentCommand.SUBMIT_TRANSACTION.value, reference_code)
@@ -0,0 +1,182 @@
+import csv
+import io
+import os
+import tempfile
+from collections import Counter
+
+from payu.exceptions import AmbiguousTransactionError
+from payu.retry import is_resolved
+
+MAX_ROWS = 10000
+
+# Columns of the massive tokenization file, in the order PayU expects them.
+TOKEN_FIELDS = ('payer_id', 'name', 'number', 'expiration_date', 'payment_method', 'identification_number')
+
+# Columns of the massive tokenization result file: the registered card, with its number masked, followed by the
+# token assigned to it and the error of the rows that were rejected.
+TOKEN_RESULT_FIELDS = ('payer_id', 'name', 'masked_number', 'expiration_date', 'payment_method',
+                       'identification_number', 'credit_card_token_id', 'error')
+
+# Columns of the massive payments file, in the order PayU expects them.
+PAYMENT_FIELDS = ('account_id', 'credit_card_token_id', 'security_code', 'installments', 'reference_code',
+                  'description', 'buyer_email', 'currency', 'tx_value', 'tx_tax', 'tx_tax_return_base',
+                  'additional_value', 'language')
+
+# Columns of the massive payments file that can be left empty.
+OPTIONAL_PAYMENT_FIELDS = ('security_code',)
+
+
+def get_row(record, fields, optional=()):
+    """
+
+    Args:
+        record: Mapping with the fields as keys, or a sequence with the values already in the order of the fields.
+        fields: Column names of the file.
+        optional: Fields a mapping can leave out or set to None; they are written empty.
+
+    Returns:
+        List of the values of the row.
+
+    Raises:
+        ValueError: If a mapping has no value for a field that is not optional, or a sequence has not one value per
+        field.
+
+    """
+    if hasattr(record, 'keys'):
+        missing = [field for field in fields if record.get(field) is None and field not in optional]
+        if missing:
+            raise ValueError('Missing required fields: {}.'.format(', '.join(missing)))
+        return [record.get(field) for field in fields]
+    row = list(record)
+    if len(row) != len(fields):
+        raise ValueError('Expected {} columns ({}), got {}.'.format(len(fields), ', '.join(fields), len(row)))
+    return row
+
+
+def write_chunks(rows, directory=None, prefix='payu-', chunk_size=MAX_ROWS):
+    """
+    Streams rows into UTF-8 CSV files without header of at most chunk_size rows each. Only the row being written is
+    held in memory, so rows can be a generator of any length.
+
+    Args:
+        rows: Iterable of lists of values.
+        directory: Directory where the files are created. Defaults to a new temporary directory.
+        prefix: Prefix of the file names, which are numbered from 1.
+        chunk_size: Maximum number of rows per file.
+
+    Returns:
+        Generator of the paths of the files, each one yielded once it is complete.
+
+    """
+    if not 0 < chunk_size <= MAX_ROWS:
+        raise ValueError('chunk_size must be between 1 and {}.'.format(MAX_ROWS))
+    if directory is None:
+        directory = tempfile.mkdtemp(prefix=prefix)
+
+    rows = iter(rows)
+    number = 0
+    for row in rows:
+        number += 1
+        path = os.path.join(directory, '{}{:04d}.csv'.format(prefix, number))
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(row)
+            count = 1
+            while count < chunk_size:
+                try:
+                    row = next(rows)
+                except StopIteration:
+                    break
+                writer.writerow(row)
+                count += 1
+        yield path
+
+
+def _open(source):
+    if isinstance(source, (str, bytes, os.PathLike)):
+        return open(source, encoding='utf-8', newline='')
+    if isinstance(source, io.TextIOBase):
+        return None
+    raise TypeError('Expected a path or a text file, got {}.'.format(type(source).__name__))
+
+
+def iter_results(source, fields):
+    """
+    Parses a result file lazily, one row at a time. Blank lines are skipped and columns beyond the known fields are
+    kept in a list under the None key.
+
+    Args:
+        source: Path or text file of the result, or an iterable of them.
+        fields: Column names of the file.
+
+    Returns:
+        Generator of dicts.
+
+    """
+    if not isinstance(source, (str, bytes, os.PathLike, io.TextIOBase)):
+        for item in source:
+            yield from iter_results(item, fields)
+        return
+
+    f = _open(source)
+    try:
+        for row in csv.DictReader(f or source, fieldnames=fields):
+            if any(row.values()):
+                yield row
+    finally:
+        if f is not None:
+            f.close()
+
+
+class BulkReport(object):
+    """
+    Aggregated outcome of many payments: the number of them per transaction state, and the index, reference code,
+    state and reason of each one that was not approved. States are those of transactionResponse; calls that failed or
+    were rejected by the API are counted as ERROR, and those whose outcome could not be resolved as UNKNOWN. Payments
+    whose outcome was resolved through an order lookup are also counted in resolved.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.resolved = 0
+        self.states = Counter()
+        self.failures = []
+
+    def add(self, index, reference_code, response, error=None):
+        """
+
+        Args:
+            index: Position of the payment in the input.
+            reference_code:
+            response: Decoded response of the payment, None if the call raised.
+            error: Exception the call raised.
+
+        """
+        if isinstance(error, AmbiguousTransactionError):
+            state, reason = 'UNKNOWN', error
+        elif error is not None:
+            state, reason = 'ERROR', error
+        elif not isinstance(response, dict) or response.get('code') != 'SUCCESS':
+            state, reason = 'ERROR', response.get('error') if isinstance(response, dict) else response
+        else:
+            transaction = response.get('transactionResponse') or {}
+            state, reason = transaction.get('state') or 'ERROR', transaction.get('responseCode')
+
+        self.total += 1
+        self.states[state] += 1
+        if is_resolved(response):
+            self.resolved += 1
+        if state != 'APPROVED':
+            self.failures.append((index, reference_code, state, reason))
+
+    @property
+    def approved(self):
+        return self.states['APPROVED']
+
+    def as_dict(self):
+        return {
+            'total': self.total,
+            'states': dict(self.states),
+            'resolved': self.resolved,
+            'failures': list(self.failures),
+        }
@@ -0,0 +1,269 @@
+import threading
+import time
+from collections import OrderedDict
+
+from payu.singleflight import AsyncSingleFlight, SingleFlight
+
+
+class StaleWhileRevalidateCache(object):
+    """
+    Cache whose entries are fresh for ttl seconds and then, for stale_ttl more seconds, are still served while a
+    single background refresh runs. Concurrent misses of the same key are coalesced into one load.
+    """
+
+    def __init__(self, ttl, stale_ttl=None, executor=None, is_cacheable=None):
+        """
+
+        Args:
+            ttl: Seconds an entry is fresh.
+            stale_ttl: Seconds a stale entry can be served while it is refreshed. Defaults to ttl.
+            executor: Callable that returns the concurrent.futures.Executor the refreshes run on. Without it the
+            refreshes run in a new daemon thread.
+            is_cacheable: Callable that receives a loaded value and returns whether it can be cached, e.g. to skip
+            error responses.
+        """
+        self.ttl = ttl
+        self.stale_ttl = ttl if stale_ttl is None else stale_ttl
+        self.executor = executor
+        self.is_cacheable = is_cacheable
+
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._flights = self._create_flights()
+        self._refreshing = set()
+        # Bumped by invalidate(), so the loads that started before it do not store what they loaded.
+        self._generation = 0
+
+    def _create_flights(self):
+        return SingleFlight()
+
+    def get(self, key, loader):
+        """
+
+        Args:
+            key:
+            loader: Callable without arguments that loads the value.
+
+        Returns:
+            The cached value, or the loaded one on a miss.
+
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, loaded_at = entry
+                age = now - loaded_at
+                if age < self.ttl:
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        self._submit(key, loader, self._generation)
+                    return value
+
+        return self._flights.do(key, self._load_missing, key, loader)
+
+    def _load_missing(self, key, loader):
+        # A load that finished just before this one started may have stored the value already.
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self._generation
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            return entry[0]
+        return self._load(key, loader, generation)
+
+    def _load(self, key, loader, generation):
+        value = loader()
+        self._store(key, value, generation)
+        return value
+
+    def _store(self, key, value, generation):
+        if self.is_cacheable is None or self.is_cacheable(value):
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[key] = (value, time.monotonic())
+
+    def _refresh(self, key, loader, generation):
+        try:
+            self._load(key, loader, generation)
+        except Exception:
+            # The stale value keeps being served until it expires; the next miss reports the error.
+            pass
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _submit(self, key, loader, generation):
+        # Called with the lock held.
+        try:
+            if self.executor is not None:
+                self.executor().submit(self._refresh, key, loader, generation)
+            else:
+                threading.Thread(target=self._refresh, args=(key, loader, generation), daemon=True).start()
+        except RuntimeError:
+            # The executor was shut down by Client.close(): the stale value is served until it expires and the key
+            # can be refreshed again if a new executor is created.
+            self._refreshing.discard(key)
+
+    def invalidate(self, key=None):
+        """
+        Removes an entry, or every entry if no key is given.
+
+        Args:
+            key:
+
+        """
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+class AsyncStaleWhileRevalidateCache(StaleWhileRevalidateCache):
+    """
+    Asyncio version of StaleWhileRevalidateCache, for loaders that return awaitables. get() returns an awaitable and
+    the refreshes run as tasks of the running event loop.
+    """
+
+    def __init__(self, ttl, stale_ttl=None, executor=None, is_cacheable=None):
+        super().__init__(ttl, stale_ttl, executor, is_cacheable)
+        # The event loop only keeps weak references to the tasks, so the running refreshes are kept here.
+        self._tasks = set()
+
+    def _create_flights(self):
+        return AsyncSingleFlight()
+
+    async def get(self, key, loader):
+        import asyncio
+
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, loaded_at = entry
+            age = now - loaded_at
+            if age < self.ttl:
+                return value
+            if age < self.ttl + self.stale_ttl:
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    task = asyncio.ensure_future(self._refresh(key, loader, self._generation))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                return value
+
+        return await self._flights.do(key, self._load, key, loader, self._generation)
+
+    async def _load(self, key, loader, generation):
+        value = await loader()
+        self._store(key, value, generation)
+        return value
+
+    async def _refresh(self, key, loader, generation):
+        try:
+            await self._load(key, loader, generation)
+        except Exception:
+            pass
+        finally:
+            self._refreshing.discard(key)
+
+
+class LRUCache(object):
+    """
+    Thread-safe cache that keeps at most maxsize entries, evicting the least recently used one, and expires entries
+    ttl seconds after they are stored. It counts hits, misses and evictions.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        """
+
+        Args:
+            maxsize: Maximum number of entries.
+            ttl: Seconds an entry is valid. None keeps entries until they are evicted or invalidated.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._set(key, value)
+
+    def _set(self, key, value):
+        self._entries[key] = (value, None if self.ttl is None else time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def add(self, key, value=True):
+        """
+        Stores the value only if the key has no valid entry, atomically, e.g. to deduplicate by key.
+
+        Returns:
+            True if the value was stored; otherwise, False.
+
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return False
+            self.misses += 1
+            self._set(key, value)
+            return True
+
+    def invalidate(self, key=None):
+        """
+        Removes an entry, or every entry if no key is given.
+
+        Args:
+            key:
+
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_stats(self):
+        """
+
+        Returns:
+            Dict with the hits, misses, evictions, hit rate and current size of the cache.
+
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._entries),
+            }
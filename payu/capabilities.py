@@ -0,0 +1,165 @@
+import json
+import os
+from types import MappingProxyType
+
+from payu.builders import to_country, to_franchise, to_transaction_type
+from payu.enumerators import Country, Franchise, TransactionType
+from payu.exceptions import CVVRequiredError, FranchiseUnavailableError, InvalidCountryError
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'capabilities.json')
+
+PAYMENT = 'payment'
+TOKENIZATION = 'tokenization'
+CVV_TOKENIZATION = 'cvv_tokenization'
+
+
+class CapabilityMatrix(object):
+    """
+    Immutable table of the credit card franchises supported by PayU for each country and transaction type, loaded
+    from a versioned data file so rule updates don't need code changes. Every lookup is a single hash lookup.
+    """
+
+    def __init__(self, rules, version=None):
+        """
+
+        Args:
+            rules: Dict with the payment, tokenization and cvv_tokenization sections, each one a dict of country code
+            to a dict of transaction type to a list of franchise codes. "*" stands for every franchise.
+            version: Version of the rules.
+        """
+        self.version = version
+
+        franchises = {}
+        capabilities = set()
+        for section in (PAYMENT, TOKENIZATION, CVV_TOKENIZATION):
+            for country_code, transaction_types in rules[section].items():
+                country = Country(country_code)
+                for transaction_type_code, franchise_codes in transaction_types.items():
+                    transaction_type = TransactionType(transaction_type_code)
+                    if '*' in franchise_codes:
+                        members = tuple(Franchise.__members__.values())
+                    else:
+                        members = tuple(Franchise(code) for code in franchise_codes)
+                    # Aliases (e.g. VISA_DEBIT is VISA) are listed once.
+                    members = tuple(dict.fromkeys(members))
+                    franchises[(section, country, transaction_type)] = members or None
+                    capabilities.update((section, country, transaction_type, franchise) for franchise in members)
+
+        self._countries = frozenset(country for _, country, _ in franchises)
+        self._franchises = MappingProxyType(franchises)
+        self._capabilities = frozenset(capabilities)
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH):
+        """
+
+        Args:
+            path: Path of the JSON data file. Defaults to the rules shipped with the library.
+
+        Returns:
+            CapabilityMatrix.
+
+        """
+        with open(path, encoding='utf-8') as f:
+            rules = json.load(f)
+        return cls(rules, version=rules.get('version'))
+
+    def _check_country(self, country):
+        if country not in self._countries:
+            raise InvalidCountryError(country)
+
+    def get_franchises(self, section, country, transaction_type):
+        """
+
+        Args:
+            section: payment, tokenization or cvv_tokenization.
+            country:
+            transaction_type:
+
+        Returns:
+            Tuple of the franchises of the section for the country and transaction type, or None if there is none.
+
+        """
+        self._check_country(country)
+        return self._franchises.get((section, country, transaction_type))
+
+    def is_available(self, section, country, transaction_type, franchise):
+        self._check_country(country)
+        return (section, country, transaction_type, franchise) in self._capabilities
+
+    def is_payment_available(self, country, transaction_type, franchise):
+        return self.is_available(PAYMENT, country, transaction_type, franchise)
+
+    def is_tokenization_available(self, country, transaction_type, franchise):
+        return self.is_available(TOKENIZATION, country, transaction_type, franchise)
+
+    def requires_cvv(self, country, transaction_type, franchise):
+        return self.is_available(CVV_TOKENIZATION, country, transaction_type, franchise)
+
+    def validate_payment(self, *, payment_country, payment_method,
+                         transaction_type=TransactionType.AUTHORIZATION_AND_CAPTURE, tokenization=False,
+                         security_code=None, **kwargs):
+        """
+        Checks a payment the same way Payment.make_payment (or Tokenization.make_payment if tokenization is True)
+        does before sending it.
+
+        Raises:
+            InvalidCountryError, FranchiseUnavailableError or CVVRequiredError.
+
+        """
+        payment_country = to_country(payment_country)
+        transaction_type = to_transaction_type(transaction_type)
+        payment_method = to_franchise(payment_method)
+
+        section = TOKENIZATION if tokenization else PAYMENT
+        if not self.is_available(section, payment_country, transaction_type, payment_method):
+            fmt = 'The credit card franchise {} with transaction type {} is not available for {}.'
+            message = fmt.format(payment_method.value, transaction_type.value, payment_country.name)
+            # Payment.make_payment has always reported an unavailable franchise as CVVRequiredError.
+            raise FranchiseUnavailableError(message) if tokenization else CVVRequiredError(message)
+
+        if tokenization and not security_code and self.requires_cvv(payment_country, transaction_type,
+                                                                    payment_method):
+            fmt = 'Card verification value (CVV) is required for franchise {} with transaction type {} in {}.'
+            raise CVVRequiredError(fmt.format(payment_method.value, transaction_type.value, payment_country.name))
+
+    def validate_payments(self, payments, tokenization=False):
+        """
+        Validates a whole batch of payments in one pass.
+
+        Args:
+            payments: Iterable of dicts with the keyword arguments of Payment.make_payment, or of
+            Tokenization.make_payment if tokenization is True.
+            tokenization: Whether the payments are made with credit card tokens.
+
+        Returns:
+            List with, for each payment, None if it is valid or the exception that make_payment would raise, e.g. a
+            TypeError for a payment without payment_country.
+
+        """
+        errors = []
+        for payment in payments:
+            try:
+                self.validate_payment(tokenization=tokenization, **payment)
+            except (TypeError, ValueError, InvalidCountryError, FranchiseUnavailableError, CVVRequiredError) as e:
+                # TypeError: the payment is not a dict or misses a required argument.
+                errors.append(e)
+            else:
+                errors.append(None)
+        return errors
+
+
+_default = None
+
+
+def get_capability_matrix():
+    """
+
+    Returns:
+        The CapabilityMatrix with the rules shipped with the library, loaded on first use.
+
+    """
+    global _default
+    if _default is None:
+        _default = CapabilityMatrix.load()
+    return _default
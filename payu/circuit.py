@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from enum import Enum
+
+from payu.exceptions import CircuitOpenError
+
+# Set while the client probes a half-open circuit, so the probe itself is not stopped by the breaker.
+probing = ContextVar('payu_circuit_probing', default=False)
+
+
+class CircuitState(Enum):
+    CLOSED = 'CLOSED'
+    OPEN = 'OPEN'
+    HALF_OPEN = 'HALF_OPEN'
+
+
+class CircuitBreaker(object):
+    """
+    Tracks the outcome of the last calls made to one PayU API surface and stops sending calls to it while it is
+    failing or too slow, so callers fail fast instead of queueing behind it.
+
+    The circuit opens when, over the last window_size calls (and at least minimum_calls), the rate of failed calls
+    reaches failure_rate_threshold or the rate of calls slower than slow_call_duration reaches
+    slow_call_rate_threshold. After open_duration seconds it becomes half-open and a single probe decides whether it
+    closes again or goes back to open.
+    """
+
+    def __init__(self, name, failure_rate_threshold=0.5, slow_call_rate_threshold=0.8, slow_call_duration=10,
+                 minimum_calls=20, window_size=100, open_duration=30):
+        """
+
+        Args:
+            name: Base path of the API surface, e.g. /reports-api/4.0/service.cgi.
+            failure_rate_threshold: Rate of failed calls, between 0 and 1, that opens the circuit.
+            slow_call_rate_threshold: Rate of slow calls, between 0 and 1, that opens the circuit.
+            slow_call_duration: Seconds after which a call is considered slow.
+            minimum_calls: Calls that must be recorded before the rates are evaluated.
+            window_size: Number of most recent calls the rates are computed on.
+            open_duration: Seconds the circuit stays open before allowing a probe.
+        """
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.minimum_calls = minimum_calls
+        self.open_duration = open_duration
+
+        self._lock = threading.Lock()
+        self._calls = deque(maxlen=window_size)
+        self._failures = 0
+        self._slow_calls = 0
+        self._state = CircuitState.CLOSED
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._get_state()
+
+    def _get_state(self):
+        if self._state == CircuitState.OPEN and time.monotonic() - self._opened_at >= self.open_duration:
+            self._state = CircuitState.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def before_call(self):
+        """
+        Must be called before every call to the surface.
+
+        Returns:
+            CircuitState.CLOSED if the call can be sent, or CircuitState.HALF_OPEN if the caller was elected to probe
+            the surface and must report the outcome through close() or open().
+
+        Raises:
+            CircuitOpenError: If the circuit is open or another caller is already probing it.
+
+        """
+        with self._lock:
+            state = self._get_state()
+            if state == CircuitState.CLOSED:
+                return state
+            if state == CircuitState.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return state
+            self._rejected += 1
+        raise CircuitOpenError('The circuit for {} is {}.'.format(self.name, state.value))
+
+    def record(self, success, duration, probe=False):
+        """
+
+        Args:
+            success: Whether the call succeeded. Transport errors and 5xx responses are failures.
+            duration: Seconds the call took.
+            probe: Whether the call is the probe elected by before_call().
+
+        """
+        slow = duration >= self.slow_call_duration
+        with self._lock:
+            if probe:
+                if success and not slow:
+                    self._close()
+                else:
+                    self._open()
+                return
+
+            if len(self._calls) == self._calls.maxlen:
+                old_failure, old_slow = self._calls[0]
+                self._failures -= old_failure
+                self._slow_calls -= old_slow
+            self._calls.append((not success, slow))
+            self._failures += not success
+            self._slow_calls += slow
+
+            if self._state == CircuitState.CLOSED and len(self._calls) >= self.minimum_calls:
+                total = len(self._calls)
+                if self._failures / total >= self.failure_rate_threshold or \
+                        self._slow_calls / total >= self.slow_call_rate_threshold:
+                    self._open()
+
+    def open(self):
+        with self._lock:
+            self._open()
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _open(self):
+        self._state = CircuitState.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+
+    def _close(self):
+        self._state = CircuitState.CLOSED
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._calls.clear()
+        self._failures = 0
+        self._slow_calls = 0
+
+    def snapshot(self):
+        """
+
+        Returns:
+            Dict with the current state and the counters of the circuit.
+
+        """
+        with self._lock:
+            total = len(self._calls)
+            return {
+                'name': self.name,
+                'state': self._get_state().value,
+                'calls': total,
+                'failure_rate': self._failures / total if total else 0.0,
+                'slow_call_rate': self._slow_calls / total if total else 0.0,
+                'rejected': self._rejected,
+            }
@@ -1,36 +1,101 @@
-import hashlib
+import importlib
 import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-import requests
+from payu.builders import EncodedPayload, SubmitTransactionBuilder
+from payu.cache import StaleWhileRevalidateCache
+from payu.capabilities import get_capability_matrix
+from payu.circuit import CircuitBreaker, CircuitState, probing
+from payu.codecs import JSON, LAZY, RAW, LazyJSON, get_default_codec
+from payu.enumerators import Language, PaymentCommand
+from payu.exceptions import AmbiguousTransactionError, CircuitOpenError
+from payu.metrics import RequestInfo
+from payu.retry import RetryPolicy, get_reference_code, get_resolved_response, is_order_found
+from payu.signature import SignatureEngine
+from payu.singleflight import COALESCED_COMMANDS, SingleFlight
+from payu.timeouts import DEFAULT_TIMEOUTS, clamp_timeout, deadline, get_remaining
 
-from payu.enumerators import Language
-from payu.payments import Payment
-from payu.queries import Query
-from payu.recurring import Recurring
-from payu.tokenization import Tokenization
-
-fh = logging.FileHandler('spam.log')
-fh.setLevel(logging.DEBUG)
-
-ch = logging.StreamHandler()
-ch.setLevel(logging.WARNING)
-
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-fh.setFormatter(formatter)
-ch.setFormatter(formatter)
+# Threads the stale-while-revalidate caches refresh their entries on.
+REFRESH_WORKERS = 4
 
 
 class Client(object):
     TEST_BASE = 'https://sandbox.api.payulatam.com'
     PROD_BASE = 'https://api.payulatam.com'
 
+    # Sub APIs, created on first access, as attribute to (module, class).
+    SUB_APIS = {
+        'payments': ('payu.payments', 'Payment'),
+        'recurring': ('payu.recurring', 'Recurring'),
+        'tokenization': ('payu.tokenization', 'Tokenization'),
+        'queries': ('payu.queries', 'Query'),
+    }
+
     def __init__(self, api_login, api_key, merchant_id, account_id, language=Language.ENGLISH,
                  payments_api_version='4.0', recurring_api_version='4.9', reports_api_version='4.0', sandbox=False,
-                 test=False, debug=False):
+                 test=False, debug=False, pool_connections=10, pool_maxsize=10, pool_block=False, session=None,
+                 connect_timeout=5, read_timeout=60, timeouts=None, retry_policy=None,
+                 circuit_breaker=CircuitBreaker, hedging=None, base_url=None,
+                 codec=None, response_mode=JSON, capabilities=None, payment_methods_ttl=None,
+                 payment_methods_stale_ttl=None, recurring_cache=None, coalesce=True,
+                 coalesced_commands=COALESCED_COMMANDS, request_hooks=None, response_hooks=None, metrics=None):
+        """
+
+        Args:
+            api_login:
+            api_key:
+            merchant_id:
+            account_id:
+            language:
+            payments_api_version:
+            recurring_api_version:
+            reports_api_version:
+            sandbox:
+            test:
+            debug:
+            pool_connections: Number of per-host connection pools to cache.
+            pool_maxsize: Maximum number of connections kept alive in each host pool.
+            pool_block: Whether the pool should block waiting for a free connection instead of opening
+            a new, non-reused one when all of them are busy.
+            session: An optional requests.Session to use instead of creating a new one. The client does not
+            close sessions it did not create.
+            connect_timeout: Seconds to wait for a connection to be established when the command has no profile.
+            read_timeout: Seconds to wait for the server response when the command has no profile.
+            timeouts: Dict of command to (connect, read) timeouts that overrides the defaults in
+            payu.timeouts.DEFAULT_TIMEOUTS.
+            retry_policy: A payu.retry.RetryPolicy. By default idempotent calls are attempted up to three times.
+            circuit_breaker: Callable that receives the base path of an API surface and returns its
+            payu.circuit.CircuitBreaker, e.g. functools.partial(CircuitBreaker, open_duration=10). Use None to
+            disable the circuit breakers.
+            hedging: An optional payu.hedging.HedgingPolicy to hedge the read-only Query calls.
+            base_url: Overrides the PayU host, e.g. the url of a payu.standin.StandInServer.
+            codec: Object with dumps(obj) -> bytes and loads(bytes) methods used to encode the requests and decode
+            the responses. Defaults to payu.codecs.OrjsonCodec when orjson is installed and to the standard library
+            json module otherwise.
+            response_mode: How JSON responses are returned: 'json' decodes them to dicts, 'lazy' returns a
+            payu.codecs.LazyJSON mapping decoded on first access and 'raw' returns the response bytes.
+            capabilities: The payu.capabilities.CapabilityMatrix payments are validated with. Defaults to the rules
+            shipped with the library.
+            payment_methods_ttl: Seconds Payment.get_payments_methods() responses are cached. None disables it.
+            payment_methods_stale_ttl: Seconds a cached payment methods response is still served while it is
+            refreshed in the background. Defaults to payment_methods_ttl.
+            recurring_cache: An optional payu.cache.LRUCache for the plans, customers, credit cards and subscriptions
+            read through the Recurring sub API, e.g. LRUCache(maxsize=10000, ttl=300).
+            coalesce: Whether identical concurrent calls of the coalesced commands share one request to PayU. Callers
+            that join a call get their own copy of its response.
+            coalesced_commands: Read-only commands whose calls are coalesced.
+            request_hooks: Callables called with the payu.metrics.RequestInfo of each request to PayU before it is
+            sent.
+            response_hooks: Callables called with the completed payu.metrics.RequestInfo of each request to PayU.
+            metrics: An optional payu.metrics.MetricsRegistry that records every request.
+        """
         self.api_login = api_login
         self.api_key = api_key
         self.merchant_id = merchant_id
         self.account_id = account_id
+        self.signature = SignatureEngine(api_key, merchant_id)
 
         if not isinstance(language, Language):
             language = Language(language)
@@ -43,17 +108,120 @@ class Client(object):
         self.test = test
         self.debug = debug
 
-        self.url = self.TEST_BASE if self.is_sandbox else self.PROD_BASE
+        self.capabilities = capabilities or get_capability_matrix()
+        self.codec = codec or get_default_codec()
+        self.response_mode = response_mode
+        self.transaction_builder = SubmitTransactionBuilder(self)
+
+        self.payment_methods_ttl = payment_methods_ttl
+        self.payment_methods_stale_ttl = payment_methods_stale_ttl
+        self.recurring_cache = recurring_cache
+        self.coalesced_commands = coalesced_commands
+        self.flights = self._create_flights() if coalesce else None
+        self.request_hooks = list(request_hooks or ())
+        self.response_hooks = list(response_hooks or ())
+        self.metrics = metrics
+        if metrics is not None:
+            self.response_hooks.append(metrics.record)
+
+        self.url = base_url or (self.TEST_BASE if self.is_sandbox else self.PROD_BASE)
+
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.retry_policy = retry_policy or RetryPolicy()
+
+        self.hedging = hedging
+        self._hedging_executor = None
+        self._refresh_executor = None
+        self._executor_lock = threading.Lock()
+        # Reentrant: creating a sub API may create the session.
+        self._lazy_lock = threading.RLock()
+        self._sub_apis = {}
 
-        self.payments = Payment(self)
-        self.recurring = Recurring(self)
-        self.tokenization = Tokenization(self)
-        self.queries = Query(self)
+        self.payments_path = '/payments-api/{}/service.cgi'.format(self.payments_api_version)
+        self.reports_path = '/reports-api/{}/service.cgi'.format(self.reports_api_version)
+        self.recurring_path = '/payments-api/rest/v{}/'.format(self.recurring_api_version)
+        self.circuit_breakers = {}
+        if circuit_breaker is not None:
+            for path in (self.payments_path, self.reports_path, self.recurring_path):
+                self.circuit_breakers[path] = circuit_breaker(path)
+        self._owns_session = session is None
+        self._session = session
 
         self.logger = logging.getLogger(__name__)
-        self.logger.setLevel(logging.DEBUG)
-        self.logger.addHandler(fh)
-        self.logger.addHandler(ch)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def session(self):
+        """
+        The HTTP session, created with its connection pool on first use.
+        """
+        if self._session is None:
+            with self._lazy_lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    @property
+    def payments(self):
+        return self._get_sub_api('payments')
+
+    @property
+    def recurring(self):
+        return self._get_sub_api('recurring')
+
+    @property
+    def tokenization(self):
+        return self._get_sub_api('tokenization')
+
+    @property
+    def queries(self):
+        return self._get_sub_api('queries')
+
+    def _get_sub_api(self, name):
+        sub_api = self._sub_apis.get(name)
+        if sub_api is None:
+            with self._lazy_lock:
+                sub_api = self._sub_apis.get(name)
+                if sub_api is None:
+                    module, cls = self.SUB_APIS[name]
+                    sub_api = self._sub_apis[name] = getattr(importlib.import_module(module), cls)(self)
+        return sub_api
+
+    def _create_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize,
+                              pool_block=self.pool_block)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def close(self):
+        """
+        Releases the pooled connections shared by all the sub APIs.
+
+        Returns:
+
+        """
+        for executor in (self._hedging_executor, self._refresh_executor):
+            if executor is not None:
+                executor.shutdown(wait=False)
+        if self._owns_session and self._session is not None:
+            self._session.close()
 
     @property
     def is_sandbox(self):
@@ -79,7 +247,102 @@ class Client(object):
     def _delete(self, url, **kwargs):
         return self._request('DELETE', url, **kwargs)
 
-    def _request(self, method, url, headers=None, **kwargs):
+    def deadline(self, seconds):
+        """
+        Context manager that bounds every call made inside it, e.g. a request handler with 5 seconds left:
+
+            with client.deadline(5):
+                client.queries.get_order_by_reference('REFERENCE_CODE')
+
+        Args:
+            seconds: Time budget for the block.
+
+        Returns:
+
+        """
+        return deadline(seconds)
+
+    def batch(self, calls, max_workers=10, stream=False):
+        """
+        Runs many calls, e.g. payouts with Payment.make_payment or Tokenization.make_payment, on a bounded pool of
+        workers. An error in one call is captured in its result and does not abort the batch.
+
+            results = client.batch((client.tokenization.make_payment, kwargs) for kwargs in payments)
+
+        Args:
+            calls: Iterable of callables, (callable, kwargs) or (callable, args, kwargs) tuples.
+            max_workers: Maximum number of calls running at the same time.
+            stream: Whether to return a generator that yields the results as they complete instead of a list with
+            the results in the order of the calls.
+
+        Returns:
+            List or generator of payu.batch.BatchResult.
+
+        """
+        from payu.batch import run_batch
+
+        if stream:
+            return run_batch(calls, max_workers=max_workers, ordered=False)
+        return list(run_batch(calls, max_workers=max_workers))
+
+    def _consume(self, results, callback, value):
+        """
+        Passes each item of a generator to a callback, then returns value. The async client consumes async
+        generators the same way.
+        """
+        for result in results:
+            callback(result)
+        return value
+
+    def _iter_windows(self, fetch, windows, get_records, max_workers):
+        from payu.history import iter_windows
+
+        return iter_windows(fetch, windows, get_records, max_workers=max_workers)
+
+    def create_order_watcher(self, callback=None, **kwargs):
+        """
+        Creates a watcher that polls the status of many orders, e.g. pending PSE or cash payments, and emits an event
+        each time one of them changes.
+
+        Args:
+            callback: Called with each payu.watcher.OrderEvent. Without it the events are read with events().
+            **kwargs: Arguments of payu.watcher.OrderWatcher, like max_workers, rate or max_interval.
+
+        Returns:
+            payu.watcher.OrderWatcher.
+
+        """
+        from payu.watcher import OrderWatcher
+
+        return OrderWatcher(self, callback=callback, **kwargs)
+
+    def create_notification_processor(self, handler, **kwargs):
+        """
+        Creates a processor for the confirmation page notifications of this merchant, with WSGI and ASGI adapters.
+
+        Args:
+            handler: Called with each payu.notifications.Notification, from a worker thread or, in synchronous mode,
+            from the request.
+            **kwargs: Arguments of payu.notifications.NotificationProcessor, like max_workers, synchronous or on_error.
+
+        Returns:
+            payu.notifications.NotificationProcessor.
+
+        """
+        from payu.notifications import NotificationProcessor
+
+        return NotificationProcessor(self.signature, handler, **kwargs)
+
+    def get_circuit_states(self):
+        """
+
+        Returns:
+            Dict of API surface base path to the snapshot of its circuit breaker.
+
+        """
+        return {path: breaker.snapshot() for path, breaker in self.circuit_breakers.items()}
+
+    def _request(self, method, url, headers=None, timeout=None, **kwargs):
         """
         Normally the connection guarantees response times of 3 seconds on average,
         if there is an abnormal situation, the maximum response time is 1 minute.
@@ -89,33 +352,452 @@ class Client(object):
             method:
             url:
             headers:
+            timeout: Optional (connect, read) tuple that overrides the command profile.
             **kwargs:
 
         Returns:
 
         """
+        command = self._get_command(method, url, kwargs)
+        info = self._prepare(command, method, url, kwargs)
+
+        key = self._get_flight_key(command, method, url, kwargs)
+        if key is not None:
+            return self.flights.do(key, self._call, command, method, url, headers, timeout, kwargs, info)
+        return self._call(command, method, url, headers, timeout, kwargs, info)
+
+    def _prepare(self, command, method, url, kwargs):
+        """
+        Encodes the body of the call.
+
+        Returns:
+            The RequestInfo of the call for the hooks, or None if the client has none.
+
+        """
+        if not self.request_hooks and not self.response_hooks:
+            self._encode(command, kwargs)
+            return None
+        start = time.perf_counter()
+        self._encode(command, kwargs)
+        return RequestInfo(command, self._get_resource(url), method, url, time.perf_counter() - start)
+
+    def _get_resource(self, url):
+        path = url[len(self.url):]
+        if path.startswith(self.recurring_path):
+            # REST paths alternate resources and identifiers, e.g. customers/{id}/creditCards.
+            return '/'.join(path[len(self.recurring_path):].split('/')[::2])
+        if path.startswith(self.reports_path):
+            return 'reports'
+        return 'payments'
+
+    def _call(self, command, method, url, headers, timeout, kwargs, info=None):
+        if info is None:
+            return self._call_with_retries(command, method, url, headers, timeout, kwargs)
+        self._before_call(info, kwargs)
+        try:
+            return self._call_with_retries(command, method, url, headers, timeout, kwargs, info)
+        except Exception as e:
+            info.error = e
+            raise
+        finally:
+            self._after_call(info)
+
+    def _before_call(self, info, kwargs):
+        data = kwargs.get('data')
+        info.bytes_out = len(data) if data else 0
+        info.start = time.perf_counter()
+        self._run_hooks(self.request_hooks, info)
+
+    def _after_call(self, info):
+        info.latency = time.perf_counter() - info.start
+        self._run_hooks(self.response_hooks, info)
+
+    def _run_hooks(self, hooks, info):
+        for hook in hooks:
+            try:
+                hook(info)
+            except Exception:
+                self.logger.exception('The hook {!r} failed.'.format(hook))
+
+    def _call_with_retries(self, command, method, url, headers, timeout, kwargs, info=None):
+        _headers = self._prepare_headers(headers)
+        breaker = self._get_circuit_breaker(url)
+        probe = breaker is not None and self._check_circuit(breaker, command)
+
+        if self.is_debug:
+            self.logger.debug('%s %s %s %s', method, url, headers, kwargs)
+
+        try:
+            attempt = 0
+            while True:
+                attempt += 1
+                if info is not None:
+                    info.attempts = attempt
+                _timeout = self._get_timeout(command, timeout)
+                start = time.monotonic()
+                try:
+                    response = self._send(command, method, url, headers=_headers, timeout=_timeout, **kwargs)
+                except Exception as e:
+                    if not self._is_transport_error(e):
+                        raise
+                    probe = self._record_call(breaker, False, start, probe)
+                    delay = self._get_retry_delay(command, attempt, error=e)
+                    if delay is not None:
+                        time.sleep(delay)
+                        continue
+                    if command == PaymentCommand.SUBMIT_TRANSACTION.value and not self._is_connect_error(e):
+                        return self._resolve_transaction(kwargs, e)
+                    raise
+
+                probe = self._record_call(breaker, response.status_code < 500, start, probe)
+                delay = self._get_retry_delay(command, attempt, status_code=response.status_code)
+                if delay is not None:
+                    time.sleep(delay)
+                    continue
+                if self.retry_policy.is_ambiguous_status(command, response.status_code):
+                    return self._resolve_transaction(kwargs, self._parse(response, info))
+                return self._parse(response, info)
+        except BaseException:
+            if probe:
+                # The probe ended without an outcome, e.g. its deadline expired or it was cancelled.
+                breaker.open()
+            raise
+
+    def _send(self, command, method, url, **kwargs):
+        if self.hedging is None or not self.hedging.is_hedgeable(command):
+            return self.session.request(method, url, **kwargs)
+
+        executor = self._get_hedging_executor()
+        start = time.monotonic()
+        first = executor.submit(self.session.request, method, url, **kwargs)
+        done, _ = wait([first], timeout=self.hedging.get_delay(command))
+        if done:
+            self.hedging.count(command)
+            response = first.result()
+            self.hedging.record(command, time.monotonic() - start)
+            return response
+
+        second = executor.submit(self.session.request, method, url, **kwargs)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                # The losing attempt gives its connection back to the pool as soon as it finishes.
+                (second if future is first else first).add_done_callback(_close_response)
+                self.hedging.count(command, hedged=True, hedge_won=future is second)
+                self.hedging.record(command, time.monotonic() - start)
+                return response
+        self.hedging.count(command, hedged=True)
+        raise error
+
+    def _get_hedging_executor(self):
+        if self._hedging_executor is None:
+            with self._executor_lock:
+                if self._hedging_executor is None:
+                    self._hedging_executor = ThreadPoolExecutor(max_workers=self.hedging.max_workers,
+                                                                thread_name_prefix='payu-hedging')
+        return self._hedging_executor
+
+    def _get_refresh_executor(self):
+        # Separate from the hedging threads, so slow refreshes never delay a hedge.
+        if self._refresh_executor is None:
+            with self._executor_lock:
+                if self._refresh_executor is None:
+                    self._refresh_executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS,
+                                                                thread_name_prefix='payu-refresh')
+        return self._refresh_executor
+
+    def _then(self, response, callback):
+        """
+        Applies a callback to the response of a call. Sub APIs use it to post-process responses the same way with
+        the sync and async clients.
+
+        Args:
+            response: What the call returned.
+            callback:
+
+        Returns:
+
+        """
+        return callback(response)
+
+    def _resolved(self, value):
+        """
+
+        Args:
+            value:
+
+        Returns:
+            The value as the sub API methods of this client return their responses.
+
+        """
+        return value
+
+    def _create_flights(self):
+        return SingleFlight()
+
+    def _create_cache(self, ttl, stale_ttl=None):
+        return StaleWhileRevalidateCache(ttl, stale_ttl, executor=self._get_refresh_executor,
+                                         is_cacheable=self._is_success)
+
+    def _is_success(self, response):
+        response = self._decode(response)
+        return isinstance(response, dict) and response.get('code') == 'SUCCESS'
+
+    def _get_circuit_breaker(self, url):
+        if not self.circuit_breakers or probing.get():
+            return None
+        path = url[len(self.url):]
+        if path.startswith(self.recurring_path):
+            path = self.recurring_path
+        return self.circuit_breakers.get(path)
+
+    def _check_circuit(self, breaker, command):
+        """
+        Stops the call if the circuit of its API surface is open. When the circuit is half-open, the surface is probed
+        with its ping() method; surfaces without ping (recurring) and pings themselves are probed by the call itself.
+
+        Args:
+            breaker:
+            command:
+
+        Returns:
+            True if the call itself is the probe of a half-open circuit; otherwise, False.
+
+        """
+        if breaker.before_call() == CircuitState.CLOSED:
+            return False
+
+        ping = self._get_ping(breaker.name)
+        if ping is None or command == PaymentCommand.PING.value:
+            return True
+
+        token = probing.set(True)
+        try:
+            response = ping()
+        except Exception:
+            response = None
+        except BaseException:
+            breaker.open()
+            raise
+        finally:
+            probing.reset(token)
+        return self._finish_probe(breaker, response)
+
+    def _get_ping(self, path):
+        if path == self.payments_path:
+            return self.payments.ping
+        if path == self.reports_path:
+            return self.queries.ping
+        return None
+
+    def _finish_probe(self, breaker, response):
+        if self._is_success(response):
+            breaker.close()
+            return False
+        breaker.open()
+        raise CircuitOpenError('The circuit for {} is {}.'.format(breaker.name, CircuitState.OPEN.value))
+
+    def _record_call(self, breaker, success, start, probe):
+        if breaker is not None:
+            breaker.record(success, time.monotonic() - start, probe)
+        return False
+
+    def _get_retry_delay(self, command, attempt, error=None, status_code=None):
+        """
+
+        Args:
+            command:
+            attempt: Number of attempts already made.
+            error: The transport exception of the failed attempt, if any.
+            status_code: The HTTP status of the attempt, if a response was received.
+
+        Returns:
+            Seconds to wait before sending the call again, or None if it must not be retried.
+
+        """
+        if error is not None:
+            retry = self.retry_policy.should_retry_error(command, attempt, self._is_connect_error(error))
+        else:
+            retry = self.retry_policy.should_retry_status(command, attempt, status_code)
+        if not retry:
+            return None
+
+        delay = self.retry_policy.get_backoff(attempt)
+        remaining = get_remaining()
+        if remaining is not None and delay >= remaining:
+            return None
+        return delay
+
+    def _is_transport_error(self, error):
+        import requests
+
+        return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                                  requests.exceptions.ChunkedEncodingError))
+
+    def _is_connect_error(self, error):
+        """
+        Returns:
+            True if the connection could not be established, so the request never reached PayU.
+        """
+        import requests
+        from urllib3.exceptions import NewConnectionError
+
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        if not isinstance(error, requests.exceptions.ConnectionError) or not error.args:
+            return False
+        # requests wraps the MaxRetryError of urllib3, whose reason is the error of the connection.
+        reason = getattr(error.args[0], 'reason', error.args[0])
+        return isinstance(reason, NewConnectionError)
+
+    def _resolve_transaction(self, kwargs, error):
+        """
+        Resolves a SUBMIT_TRANSACTION whose outcome is unknown (the request may or may not have been processed by PayU)
+        by looking the order up through its reference code instead of resending it.
+
+        Args:
+            kwargs: The keyword arguments of the SUBMIT_TRANSACTION request.
+            error: The transport exception or the parsed error response of the failed submission.
+
+        Returns:
+            A payment response built from the order if PayU registered it, see payu.retry.get_resolved_response.
+
+        """
+        reference_code = get_reference_code(kwargs)
+        if reference_code is None:
+            raise AmbiguousTransactionError('The transaction outcome is unknown: {}'.format(error))
+
+        try:
+            response = self.queries.get_order_by_reference(reference_code)
+        except Exception as e:
+            fmt = 'The transaction {} outcome is unknown and it could not be resolved: {}'
+            raise AmbiguousTransactionError(fmt.format(reference_code, e), reference_code) from e
+        return self._get_resolved_response(reference_code, response, error)
+
+    def _get_resolved_response(self, reference_code, response, error):
+        """
+
+        Args:
+            reference_code:
+            response: Response of the Query.get_order_by_reference lookup.
+            error: The transport exception or the parsed error response of the failed submission.
+
+        Returns:
+            The payment response built from the order, in the response mode of the client.
+
+        """
+        lookup = self._decode(response)
+        if not is_order_found(lookup):
+            fmt = 'The transaction {} outcome is unknown and PayU has no order for it yet: {}'
+            raise AmbiguousTransactionError(fmt.format(reference_code, error), reference_code)
+        resolved = get_resolved_response(lookup)
+        if resolved is None:
+            fmt = 'The transaction {} outcome is unknown and its order has no transaction response yet: {}'
+            raise AmbiguousTransactionError(fmt.format(reference_code, error), reference_code)
+
+        if self.response_mode == RAW:
+            return self.codec.dumps(resolved)
+        if self.response_mode == LAZY:
+            return LazyJSON(self.codec.dumps(resolved), self.codec)
+        return resolved
+
+    def _get_command(self, method, url, kwargs):
+        payload = kwargs.get('json')
+        if isinstance(payload, dict) and 'command' in payload:
+            return payload['command']
+        if isinstance(kwargs.get('data'), EncodedPayload):
+            return kwargs['data'].command
+        if '/rest/' in url:
+            return 'RECURRING_{}'.format(method)
+        return None
+
+    def _get_flight_key(self, command, method, url, kwargs):
+        """
+        Returns:
+            The key identical in-flight calls are coalesced by, or None if the call can not be coalesced.
+        """
+        if self.flights is None or command not in self.coalesced_commands:
+            return None
+        params = kwargs.get('params')
+        params = tuple(sorted(params.items())) if isinstance(params, dict) else params
+        # The body is the encoded payload, which already identifies the command and its details.
+        return method, url, kwargs.get('data'), params
+
+    def _encode(self, command, kwargs):
+        payload = kwargs.pop('json', None)
+        if payload is not None:
+            reference_code = get_reference_code({'json': payload})
+            kwargs['data'] = EncodedPayload(self.codec.dumps(payload), command, reference_code)
+
+    def _decode(self, response):
+        """
+        Decodes a response returned in the lazy or raw response modes, for the checks the client itself makes.
+
+        Args:
+            response:
+
+        Returns:
+            The decoded response, or None if it is not JSON.
+
+        """
+        if isinstance(response, LazyJSON):
+            return response.value
+        if isinstance(response, bytes):
+            try:
+                return self.codec.loads(response)
+            except ValueError:
+                return None
+        return response
+
+    def _get_timeout(self, command, timeout=None):
+        if timeout is None:
+            timeout = self.timeouts.get(command, (self.connect_timeout, self.read_timeout))
+        return clamp_timeout(timeout)
+
+    def _prepare_headers(self, headers=None):
         _headers = {
             'Accept': 'application/json',
             'Content-Type': 'application/json'
         }
         if headers:
             _headers.update(headers)
+        return _headers
 
-        if self.is_debug:
-            self.logger.debug('{} {} {} {}'.format(method, url, headers, kwargs))
-        return self._parse(requests.request(method, url, headers=_headers, timeout=60, **kwargs))
+    def _parse(self, response, info=None):
+        if info is not None:
+            start = time.perf_counter()
+            r = self._parse(response)
+            info.status = response.status_code
+            info.bytes_in = len(response.content)
+            info.serialization_time += time.perf_counter() - start
+            return r
 
-    def _parse(self, response):
         if 'Content-Type' in response.headers and 'application/json' in response.headers['Content-Type']:
-            r = response.json()
+            if self.response_mode == RAW:
+                r = response.content
+            elif self.response_mode == LAZY:
+                r = LazyJSON(response.content, self.codec)
+            else:
+                r = self.codec.loads(response.content)
         else:
             if self.is_debug:
                 fmt = 'The response with status code ({}) is not JSON deserializable. Response: {}'
                 self.logger.warning(fmt.format(response.status_code, response.text))
 
-            r = response.text
+            r = response.content if self.response_mode == RAW else response.text
         return r
 
     def _get_signature(self, reference_code, tx_value, currency):
-        signature = '{}~{}~{}~{}~{}'.format(self.api_key, self.merchant_id, reference_code, tx_value, currency)
-        return hashlib.md5(signature.encode('utf')).hexdigest()
+        return self.signature.sign(reference_code, tx_value, currency)
+
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
@@ -0,0 +1,83 @@
+import json
+from collections.abc import Mapping
+
+JSON = 'json'
+LAZY = 'lazy'
+RAW = 'raw'
+
+
+class JSONCodec(object):
+    """
+    Codec backed by the standard library json module.
+    """
+    name = 'json'
+
+    def __init__(self):
+        self._encoder = json.JSONEncoder(separators=(',', ':'))
+
+    def dumps(self, obj):
+        return self._encoder.encode(obj).encode('utf-8')
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec(object):
+    """
+    Codec backed by orjson, several times faster than the standard library for both encoding and decoding.
+    """
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+
+    def dumps(self, obj):
+        return self._orjson.dumps(obj)
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+
+def get_default_codec():
+    """
+
+    Returns:
+        An OrjsonCodec if orjson is installed; otherwise, a JSONCodec.
+
+    """
+    try:
+        return OrjsonCodec()
+    except ImportError:
+        return JSONCodec()
+
+
+class LazyJSON(Mapping):
+    """
+    Read-only mapping over a JSON body that is only decoded the first time one of its fields is accessed.
+    """
+    __slots__ = ('content', '_codec', '_value')
+
+    def __init__(self, content, codec):
+        self.content = content
+        self._codec = codec
+        self._value = None
+
+    @property
+    def value(self):
+        if self._value is None:
+            self._value = self._codec.loads(self.content)
+        return self._value
+
+    def __getitem__(self, key):
+        return self.value[key]
+
+    def __iter__(self):
+        return iter(self.value)
+
+    def __len__(self):
+        return len(self.value)
+
+    def __repr__(self):
+        return 'LazyJSON({!r})'.format(self.content if self._value is None else self._value)
@@ -0,0 +1,247 @@
+import heapq
+import itertools
+import time
+from collections import namedtuple
+
+from payu.builders import to_known_enum
+from payu.cache import LRUCache
+from payu.enumerators import MessagePol, TransactionState
+from payu.exceptions import AmbiguousTransactionError, BaseError, CircuitOpenError, DeadlineExceededError
+
+RETRYABLE = 'RETRYABLE'
+RETRY_LATER = 'RETRY_LATER'
+NON_RETRYABLE = 'NON_RETRYABLE'
+
+# Soft declines of the network or the provider, worth retrying within minutes or hours.
+RETRYABLE_CODES = frozenset([
+    MessagePol.PAYMENT_NETWORK_NO_RESPONSE,
+    MessagePol.PAYMENT_NETWORK_NO_CONNECTION,
+    MessagePol.PAYMENT_NETWORK_BAD_RESPONSE,
+    MessagePol.BANK_UNREACHABLE,
+    MessagePol.ENTITY_MESSAGING_ERROR,
+    MessagePol.INTERNAL_PAYMENT_PROVIDER_ERROR,
+    MessagePol.ERROR,
+])
+
+# Declines of the issuer that may pass days later, e.g. once the card has funds again.
+RETRY_LATER_CODES = frozenset([
+    MessagePol.INSUFFICIENT_FUNDS,
+    MessagePol.EXCEEDED_AMOUNT,
+    MessagePol.CONTACT_THE_ENTITY,
+    MessagePol.ENTITY_DECLINED,
+    MessagePol.PAYMENT_NETWORK_REJECTED,
+    MessagePol.INACTIVE_PAYMENT_PROVIDER,
+])
+
+# Errors raised before the payment reached PayU, worth trying again later.
+UNSENT_ERRORS = (CircuitOpenError, DeadlineExceededError)
+
+# Errors of payments that can not succeed as they are, e.g. a franchise not available in the country.
+INVALID_ERRORS = (BaseError, ValueError)
+
+# Outcomes of a scheduled payment.
+APPROVED = 'APPROVED'
+PENDING = 'PENDING'
+SCHEDULED = 'SCHEDULED'
+DECLINED = 'DECLINED'
+EXHAUSTED = 'EXHAUSTED'
+UNKNOWN = 'UNKNOWN'
+
+
+def classify(response_code):
+    """
+    Classifies the response code of a declined transaction. Codes not known to be soft, like INVALID_CARD or
+    EXPIRED_CARD, are not retried.
+
+    Args:
+        response_code: MessagePol, or its value.
+
+    Returns:
+        RETRYABLE, RETRY_LATER or NON_RETRYABLE.
+
+    """
+    response_code = to_known_enum(MessagePol, response_code)
+    if response_code in RETRYABLE_CODES:
+        return RETRYABLE
+    if response_code in RETRY_LATER_CODES:
+        return RETRY_LATER
+    return NON_RETRYABLE
+
+
+def classify_response(response):
+    """
+
+    Args:
+        response: Decoded response of a payment, also one the client resolved through an order lookup.
+
+    Returns:
+        Tuple of the TransactionState, or None if the payment was rejected by the API, and the classification of
+        its response code, None if it was approved or is pending.
+
+    """
+    if not isinstance(response, dict) or response.get('code') != 'SUCCESS' or not response.get('transactionResponse'):
+        return None, NON_RETRYABLE
+    transaction = response['transactionResponse']
+    state = to_known_enum(TransactionState, transaction.get('state'))
+    if state in (TransactionState.APPROVED, TransactionState.PENDING):
+        return state, None
+    return state, classify(transaction.get('responseCode'))
+
+
+class RetryOutcome(namedtuple('RetryOutcome', ['payment', 'attempt', 'outcome', 'response', 'error', 'next_at'])):
+    """
+    Result of one attempt of a scheduled payment: the arguments it was made with, its attempt number, the outcome
+    (APPROVED, PENDING, SCHEDULED, DECLINED, EXHAUSTED or UNKNOWN), the response or exception and, when it was
+    scheduled again, the time of the next attempt.
+    """
+    __slots__ = ()
+
+
+class RetryScheduler(object):
+    """
+    Makes token payments with Tokenization.make_payment() and schedules the declined ones again according to their
+    response code: soft declines on the retry_delays timeline, issuer declines on the later_delays one, and hard
+    declines never. Each card, by credit_card_token_id, has a budget of attempts across all its payments, which is
+    restored when one of them is approved. Each timeline keeps its own count of retries, so a payment that moves from
+    one timeline to the other starts the second one from its first delay.
+
+        scheduler = RetryScheduler(client)
+        for payment in collections:
+            scheduler.schedule(payment)
+        outcomes = scheduler.run_pending()
+
+    Retries are made with the reference code formatted with reference_code_format, so each attempt is a new order.
+    Payments whose outcome is unknown (AmbiguousTransactionError) are never retried, to avoid charging twice. Payments
+    that raised before reaching PayU (UNSENT_ERRORS and connection errors) are retried on the retry_delays timeline,
+    and invalid ones (INVALID_ERRORS) are declined; neither counts against the budget of the card.
+    With AsyncClient, run_pending() returns an awaitable.
+    """
+
+    def __init__(self, client, retry_delays=(300, 3600, 6 * 3600), later_delays=(86400, 3 * 86400, 7 * 86400),
+                 max_card_attempts=4, max_workers=10, reference_code_format='{reference_code}-R{attempt}',
+                 clock=time.time, max_cards=100000):
+        """
+
+        Args:
+            client: payu.client.Client.
+            retry_delays: Seconds from each attempt of a RETRYABLE decline to the next one.
+            later_delays: Seconds from each attempt of a RETRY_LATER decline to the next one.
+            max_card_attempts: Maximum number of attempts per card.
+            max_workers: Maximum number of payments made at the same time.
+            reference_code_format: Format of the reference code of the retries.
+            clock: Callable that returns the current time as a timestamp.
+            max_cards: Maximum number of cards whose attempts are tracked. The least recently used are forgotten.
+        """
+        self.client = client
+        self.retry_delays = retry_delays
+        self.later_delays = later_delays
+        self.max_card_attempts = max_card_attempts
+        self.max_workers = max_workers
+        self.reference_code_format = reference_code_format
+        self.clock = clock
+
+        self.card_attempts = LRUCache(maxsize=max_cards, ttl=None)
+        self._heap = []
+        self._sequence = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, payment, at=None, attempt=1, retries=None):
+        """
+
+        Args:
+            payment: Dict with the arguments of Tokenization.make_payment().
+            at: Timestamp of the attempt. Defaults to now.
+            attempt: Number of the attempt.
+            retries: Dict of RETRYABLE and RETRY_LATER to the number of retries already made on their timelines.
+
+        """
+        at = self.clock() if at is None else at
+        retries = {} if retries is None else retries
+        heapq.heappush(self._heap, (at, next(self._sequence), payment, attempt, retries))
+
+    def get_timeline(self):
+        """
+
+        Returns:
+            List of (timestamp, reference_code, attempt) of the scheduled attempts, in order.
+
+        """
+        return [(at, payment.get('reference_code'), attempt) for at, _, payment, attempt, _ in sorted(self._heap)]
+
+    def get_next_at(self):
+        return self._heap[0][0] if self._heap else None
+
+    def run_pending(self):
+        """
+        Makes the attempts that are due, at most max_workers at a time.
+
+        Returns:
+            List of RetryOutcome.
+
+        """
+        now = self.clock()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[2:])
+
+        calls = []
+        for payment, attempt, retries in due:
+            token = payment['credit_card_token_id']
+            self.card_attempts.set(token, self.card_attempts.get(token, 0) + 1)
+            calls.append((self.client.tokenization.make_payment, self._get_arguments(payment, attempt)))
+
+        results = self.client.batch(calls, max_workers=self.max_workers)
+        return self.client._then(results, lambda r: [self._handle(item, result) for item, result in zip(due, r)])
+
+    def _get_arguments(self, payment, attempt):
+        if attempt == 1:
+            return payment
+        reference_code = self.reference_code_format.format(reference_code=payment['reference_code'], attempt=attempt)
+        return dict(payment, reference_code=reference_code)
+
+    def _handle(self, item, result):
+        payment, attempt, retries = item
+        token = payment['credit_card_token_id']
+        if not result.ok:
+            error = result.error
+            if isinstance(error, AmbiguousTransactionError):
+                return RetryOutcome(payment, attempt, UNKNOWN, None, error, None)
+            if isinstance(error, UNSENT_ERRORS) or self.client._is_connect_error(error):
+                self._release_attempt(token)
+                return self._retry(payment, attempt, retries, RETRYABLE, None, error)
+            if isinstance(error, INVALID_ERRORS):
+                self._release_attempt(token)
+            return self._retry(payment, attempt, retries, NON_RETRYABLE, None, error)
+
+        response = self.client._decode(result.result)
+        state, decision = classify_response(response)
+        if state is TransactionState.APPROVED:
+            self.card_attempts.invalidate(token)
+            return RetryOutcome(payment, attempt, APPROVED, response, None, None)
+        if state is TransactionState.PENDING:
+            return RetryOutcome(payment, attempt, PENDING, response, None, None)
+        return self._retry(payment, attempt, retries, decision, response, None)
+
+    def _release_attempt(self, token):
+        # The payment never reached PayU, so it does not count against the card.
+        attempts = self.card_attempts.get(token, 0) - 1
+        if attempts > 0:
+            self.card_attempts.set(token, attempts)
+        else:
+            self.card_attempts.invalidate(token)
+
+    def _retry(self, payment, attempt, retries, decision, response, error):
+        if decision == NON_RETRYABLE:
+            return RetryOutcome(payment, attempt, DECLINED, response, error, None)
+
+        delays = self.retry_delays if decision == RETRYABLE else self.later_delays
+        count = retries.get(decision, 0)
+        card_attempts = self.card_attempts.get(payment['credit_card_token_id'], 0)
+        if count >= len(delays) or card_attempts >= self.max_card_attempts:
+            return RetryOutcome(payment, attempt, EXHAUSTED, response, error, None)
+
+        next_at = self.clock() + delays[count]
+        self.schedule(payment, next_at, attempt + 1, dict(retries, **{decision: count + 1}))
+        return RetryOutcome(payment, attempt, SCHEDULED, response, error, next_at)
@@ -12,3 +12,26 @@ class CVVRequiredError(BaseError):
 
 class InvalidCountryError(BaseError):
     pass
+
+
+class DeadlineExceededError(BaseError):
+    pass
+
+
+class AmbiguousTransactionError(BaseError):
+
+    def __init__(self, message, reference_code=None):
+        super().__init__(message)
+        self.reference_code = reference_code
+
+
+class CircuitOpenError(BaseError):
+    pass
+
+
+class HistoryWindowError(BaseError):
+
+    def __init__(self, message, window, response=None):
+        super().__init__(message)
+        self.window = window
+        self.response = response
@@ -0,0 +1,113 @@
+import threading
+from collections import deque
+
+from payu.enumerators import QueryCommand
+
+# Read-only lookups that are safe to send twice.
+HEDGEABLE_COMMANDS = frozenset([
+    QueryCommand.ORDER_DETAIL.value,
+    QueryCommand.ORDER_DETAIL_REFERENCE_CODE.value,
+    QueryCommand.TRANSACTION_RESPONSE_DETAIL.value,
+])
+
+
+class HedgingPolicy(object):
+    """
+    Hedged requests for side-effect free commands: when the first attempt takes longer than the given percentile of
+    the recent latencies of its command, an identical second request is sent and whichever answers first wins.
+    """
+
+    def __init__(self, percentile=95, initial_delay=1.0, min_delay=0.05, min_samples=20, sample_size=500,
+                 commands=HEDGEABLE_COMMANDS, max_workers=20):
+        """
+
+        Args:
+            percentile: Percentile of the observed latencies after which the hedge is sent.
+            initial_delay: Seconds after which the hedge is sent until min_samples latencies are observed.
+            min_delay: Lower bound of the hedging delay in seconds.
+            min_samples: Number of latencies needed before the percentile is used.
+            sample_size: Number of most recent latencies kept per command.
+            commands: Commands that can be hedged.
+            max_workers: Threads the sync Client sends the hedged calls on, whatever the size of its connection pool.
+            Each hedged call takes one thread, and a second one once its hedge is sent.
+        """
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.sample_size = sample_size
+        self.commands = frozenset(commands)
+        self.max_workers = max_workers
+
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._delays = {}
+        self._stats = {}
+
+    def is_hedgeable(self, command):
+        return command in self.commands
+
+    def get_delay(self, command):
+        """
+
+        Args:
+            command:
+
+        Returns:
+            Seconds to wait for the first attempt before sending the hedge.
+
+        """
+        return self._delays.get(command, self.initial_delay)
+
+    def record(self, command, latency):
+        """
+        Records the latency of a successful call. The percentile is recomputed every min_samples calls.
+
+        Args:
+            command:
+            latency: Seconds the call took.
+
+        """
+        with self._lock:
+            samples = self._samples.get(command)
+            if samples is None:
+                samples = self._samples[command] = deque(maxlen=self.sample_size)
+            samples.append(latency)
+            stats = self._get_stats(command)
+            stats['samples'] += 1
+            if stats['samples'] % self.min_samples == 0:
+                ordered = sorted(samples)
+                index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+                self._delays[command] = max(self.min_delay, ordered[index])
+
+    def count(self, command, hedged=False, hedge_won=False):
+        with self._lock:
+            stats = self._get_stats(command)
+            stats['requests'] += 1
+            stats['hedged'] += hedged
+            stats['hedge_wins'] += hedge_won
+
+    def _get_stats(self, command):
+        stats = self._stats.get(command)
+        if stats is None:
+            stats = self._stats[command] = {'requests': 0, 'hedged': 0, 'hedge_wins': 0, 'samples': 0}
+        return stats
+
+    def get_stats(self):
+        """
+
+        Returns:
+            Dict of command to its counters: requests, hedged (hedges sent), hedge_wins (hedges that answered first)
+            and the current hedging delay.
+
+        """
+        with self._lock:
+            return {
+                command: {
+                    'requests': stats['requests'],
+                    'hedged': stats['hedged'],
+                    'hedge_wins': stats['hedge_wins'],
+                    'delay': self.get_delay(command),
+                }
+                for command, stats in self._stats.items()
+            }
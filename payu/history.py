@@ -0,0 +1,94 @@
+import datetime
+
+from payu.batch import run_batch, run_batch_async
+from payu.exceptions import HistoryWindowError
+
+
+def split_date_range(start, end, window, resolution=None):
+    """
+    Splits an inclusive date range into consecutive windows that do not overlap.
+
+        split_date_range(date(2017, 1, 1), date(2017, 3, 15), timedelta(days=31))
+        [(date(2017, 1, 1), date(2017, 1, 31)), (date(2017, 2, 1), date(2017, 3, 3)),
+         (date(2017, 3, 4), date(2017, 3, 15))]
+
+    Args:
+        start: First date or datetime of the range.
+        end: Last date or datetime of the range, included.
+        window: timedelta that each window spans.
+        resolution: Smallest step of the dates the API takes, the gap between a window and the next one. Defaults to a
+        day for dates and a second for datetimes.
+
+    Returns:
+        List of (begin, end) tuples in date order.
+
+    """
+    if window <= datetime.timedelta(0):
+        raise ValueError('The window must be positive.')
+    if resolution is None:
+        is_datetime = isinstance(start, datetime.datetime)
+        resolution = datetime.timedelta(seconds=1) if is_datetime else datetime.timedelta(days=1)
+
+    windows = []
+    begin = start
+    while begin <= end:
+        next_begin = begin + window
+        windows.append((begin, min(next_begin - resolution, end)))
+        begin = next_begin
+    return windows
+
+
+def _fetch(fetch, window):
+    return fetch(*window)
+
+
+def _get_records(get_records, window, response):
+    records = get_records(response)
+    if records is None:
+        raise HistoryWindowError('The window {} to {} failed: {}'.format(window[0], window[1], response), window,
+                                 response)
+    return records
+
+
+def iter_windows(fetch, windows, get_records, max_workers=4):
+    """
+    Fetches the windows on at most max_workers threads and yields their records one at a time, window after window,
+    so only a bounded number of window responses is held in memory.
+
+    Args:
+        fetch: Callable that takes the begin and end of a window and returns its response.
+        windows: Iterable of (begin, end) tuples, see split_date_range().
+        get_records: Callable that takes a response and returns its list of records, or None if it is an error.
+        max_workers: Maximum number of windows fetched at the same time.
+
+    Returns:
+        Generator of records.
+
+    """
+    windows = list(windows)
+    specs = ((_fetch, (fetch, window), {}) for window in windows)
+    for result in run_batch(specs, max_workers=max_workers):
+        if not result.ok:
+            raise result.error
+        yield from _get_records(get_records, windows[result.index], result.result)
+
+
+async def iter_windows_async(fetch, windows, get_records, max_workers=4):
+    """
+    Asyncio version of iter_windows(). fetch must return awaitables.
+
+    Returns:
+        Async generator of records.
+
+    """
+    windows = list(windows)
+    specs = ((_fetch, (fetch, window), {}) for window in windows)
+    results = run_batch_async(specs, max_workers=max_workers)
+    try:
+        async for result in results:
+            if not result.ok:
+                raise result.error
+            for record in _get_records(get_records, windows[result.index], result.result):
+                yield record
+    finally:
+        await results.aclose()
@@ -0,0 +1,133 @@
+import logging
+import queue
+import random
+import re
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+LOGGER_NAME = 'payu'
+
+# Fields of the payloads and headers whose values never reach the logs.
+REDACTED_FIELDS = ('apiKey', 'apiLogin', 'number', 'securityCode', 'expirationDate', 'Authorization',
+                   'creditCardTokenId', 'identificationNumber', 'dniNumber')
+
+# Sequences of 13 to 19 digits, optionally grouped by spaces or dashes, like card numbers.
+CARD_NUMBER = re.compile(r'(?<!\d)(?:\d[ -]?){12,18}\d(?!\d)')
+
+_listener = None
+_handler = None
+
+
+def _get_field_pattern(fields):
+    # "field": "value", 'field': 'value' and field=value.
+    names = '|'.join(re.escape(field) for field in fields)
+    return re.compile(r'''(?P<key>["']?(?:''' + names + r''')["']?\s*[:=]\s*)(?P<value>"[^"]*"|'[^']*'|[^,&}\s]+)''')
+
+
+def _mask(match, mask):
+    value = match.group('value')
+    quote = value[0] if value[0] in '"\'' else ''
+    return match.group('key') + quote + mask + quote
+
+
+class RedactingFilter(logging.Filter):
+    """
+    Masks the values of sensitive fields and anything that looks like a card number in the final message of the
+    records. The message is formatted first, so it also covers the payloads logged as arguments.
+    """
+
+    def __init__(self, fields=REDACTED_FIELDS, mask='***'):
+        super().__init__()
+        self.mask = mask
+        self._fields = _get_field_pattern(fields)
+
+    def redact(self, message):
+        message = self._fields.sub(lambda match: _mask(match, self.mask), message)
+        return CARD_NUMBER.sub(self.mask, message)
+
+    def filter(self, record):
+        record.msg = self.redact(record.getMessage())
+        record.args = None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of the records below a level, e.g. 1% of the debug lines of every request, and all the others.
+    """
+
+    def __init__(self, rate, level=logging.WARNING):
+        """
+
+        Args:
+            rate: Fraction of the records kept, between 0 and 1.
+            level: Records of this level or higher are always kept.
+        """
+        super().__init__()
+        self.rate = rate
+        self.level = level
+
+    def filter(self, record):
+        return record.levelno >= self.level or random.random() < self.rate
+
+
+def enable_async_logging(handlers=None, level=logging.DEBUG, sample_rate=1.0, redact=True, max_queue_size=10000):
+    """
+    Sends the records of the payu loggers through a queue to the handlers, which run in a background thread, so
+    logging does not block the requests on I/O. The records are sampled before they are queued and redacted in the
+    background thread. When the queue is full, records are dropped instead of blocking.
+
+    Args:
+        handlers: Handlers that write the records. Defaults to a StreamHandler on stderr.
+        level: Level of the payu logger.
+        sample_rate: Fraction of the records below WARNING that are kept.
+        redact: Whether the values of REDACTED_FIELDS and card numbers are masked.
+        max_queue_size: Maximum number of records waiting to be written.
+
+    Returns:
+        The logging.handlers.QueueListener, already started.
+
+    """
+    global _listener, _handler
+    disable_async_logging()
+
+    if handlers is None:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        handlers = [handler]
+    if redact:
+        redacting = RedactingFilter()
+        for handler in handlers:
+            handler.addFilter(redacting)
+
+    _handler = _DroppingQueueHandler(queue.Queue(max_queue_size))
+    if sample_rate < 1:
+        _handler.addFilter(SamplingFilter(sample_rate))
+    _listener = QueueListener(_handler.queue, *handlers, respect_handler_level=True)
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level)
+    logger.addHandler(_handler)
+    _listener.start()
+    return _listener
+
+
+def disable_async_logging():
+    """
+    Stops the background thread of enable_async_logging() once the queued records are written.
+    """
+    global _listener, _handler
+    if _listener is None:
+        return
+    logging.getLogger(LOGGER_NAME).removeHandler(_handler)
+    _listener.stop()
+    _listener = _handler = None
+
+
+class _DroppingQueueHandler(QueueHandler):
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
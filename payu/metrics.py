@@ -0,0 +1,229 @@
+import threading
+from bisect import bisect_left
+
+# Upper bounds in seconds of the latency buckets.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Upper bounds in seconds of the serialization time buckets.
+SERIALIZATION_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+
+
+class RequestInfo(object):
+    """
+    What the client knows about one request to PayU. Request hooks get it once the body is encoded and before it is
+    sent; response hooks get it completed once the call returns or raises, after its retries.
+
+    Attributes:
+        command: Command of the payload, or RECURRING_<METHOD> for the recurring REST API.
+        resource: API surface: payments, reports, or the path of the recurring resource without identifiers, e.g.
+        customers/creditCards.
+        method:
+        url:
+        status: HTTP status code of the last attempt, None if no response was received.
+        bytes_out: Size of the request body.
+        bytes_in: Size of the response body.
+        serialization_time: Seconds spent encoding the request and decoding the response.
+        latency: Wall seconds of the call, including retries.
+        attempts: Number of attempts.
+        error: Exception the call raised, if any.
+    """
+    __slots__ = ('command', 'resource', 'method', 'url', 'status', 'bytes_out', 'bytes_in', 'serialization_time',
+                 'latency', 'attempts', 'error', 'start')
+
+    def __init__(self, command, resource, method, url, serialization_time=0.0):
+        self.command = command
+        self.resource = resource
+        self.method = method
+        self.url = url
+        self.status = None
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.serialization_time = serialization_time
+        self.latency = None
+        self.attempts = 0
+        self.error = None
+        self.start = None
+
+    def __repr__(self):
+        return '<RequestInfo {} {} status={} latency={}>'.format(self.command, self.resource, self.status,
+                                                                 self.latency)
+
+
+class Histogram(object):
+    """
+    Fixed-bucket histogram. Observing a value is a binary search and three increments.
+    """
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        # One more bucket for the values over the last bound.
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def get_cumulative_counts(self):
+        total = 0
+        counts = []
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return counts
+
+
+class _Series(object):
+    __slots__ = ('latency', 'serialization', 'bytes_out', 'bytes_in', 'errors')
+
+    def __init__(self, buckets, serialization_buckets):
+        self.latency = Histogram(buckets)
+        self.serialization = Histogram(serialization_buckets)
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.errors = 0
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_bound(bound):
+    return '{:g}'.format(bound)
+
+
+class MetricsRegistry(object):
+    """
+    Latency and serialization histograms, byte counters and error counts per command, resource and status, fed by
+    the response hook of the client:
+
+        metrics = MetricsRegistry()
+        client = Client(..., metrics=metrics)
+        text = metrics.to_prometheus()
+
+    Recording takes a lock and a few increments, so it can stay on in production.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, serialization_buckets=SERIALIZATION_BUCKETS, prefix='payu_client'):
+        self.buckets = buckets
+        self.serialization_buckets = serialization_buckets
+        self.prefix = prefix
+
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def __call__(self, info):
+        self.record(info)
+
+    def record(self, info):
+        """
+
+        Args:
+            info: RequestInfo of a completed request.
+
+        """
+        key = (info.command, info.resource, 'error' if info.status is None else str(info.status))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(self.buckets, self.serialization_buckets)
+            series.latency.observe(info.latency)
+            series.serialization.observe(info.serialization_time)
+            series.bytes_out += info.bytes_out
+            series.bytes_in += info.bytes_in
+            if info.error is not None:
+                series.errors += 1
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+
+    def collect(self):
+        """
+        Data points in the shape of OpenTelemetry explicit bucket histograms and sums, to feed an OTel meter or
+        exporter.
+
+        Returns:
+            List of dicts with name, unit, kind, attributes and either bounds, bucket_counts, sum and count for
+            histograms, or value for sums.
+
+        """
+        points = []
+        with self._lock:
+            for (command, resource, status), series in self._get_series():
+                attributes = {'command': command, 'resource': resource, 'status': status}
+                for name, histogram in (('request.duration', series.latency),
+                                        ('serialization.duration', series.serialization)):
+                    points.append({
+                        'name': '{}.{}'.format(self.prefix.replace('_', '.'), name),
+                        'unit': 's',
+                        'kind': 'histogram',
+                        'attributes': attributes,
+                        'bounds': list(histogram.bounds),
+                        'bucket_counts': list(histogram.counts),
+                        'sum': histogram.sum,
+                        'count': histogram.count,
+                    })
+                for name, value, unit in (('request.body.size', series.bytes_out, 'By'),
+                                          ('response.body.size', series.bytes_in, 'By'),
+                                          ('errors', series.errors, '{error}')):
+                    points.append({
+                        'name': '{}.{}'.format(self.prefix.replace('_', '.'), name),
+                        'unit': unit,
+                        'kind': 'sum',
+                        'attributes': attributes,
+                        'value': value,
+                    })
+        return points
+
+    def to_prometheus(self):
+        """
+
+        Returns:
+            The metrics in the Prometheus text exposition format.
+
+        """
+        with self._lock:
+            series = self._get_series()
+            lines = []
+            histograms = (
+                ('request_duration_seconds', 'Latency of the requests to PayU, including retries.', 'latency'),
+                ('serialization_duration_seconds', 'Time spent encoding requests and decoding responses.',
+                 'serialization'),
+            )
+            for name, description, attribute in histograms:
+                name = '{}_{}'.format(self.prefix, name)
+                lines.append('# HELP {} {}'.format(name, description))
+                lines.append('# TYPE {} histogram'.format(name))
+                for labels, s in series:
+                    histogram = getattr(s, attribute)
+                    labels = self._format_labels(labels)
+                    counts = histogram.get_cumulative_counts()
+                    for bound, count in zip(histogram.bounds, counts):
+                        lines.append('{}_bucket{{{},le="{}"}} {}'.format(name, labels, _format_bound(bound), count))
+                    lines.append('{}_bucket{{{},le="+Inf"}} {}'.format(name, labels, counts[-1]))
+                    lines.append('{}_sum{{{}}} {}'.format(name, labels, repr(histogram.sum)))
+                    lines.append('{}_count{{{}}} {}'.format(name, labels, histogram.count))
+
+            counters = (
+                ('sent_bytes_total', 'Bytes of the request bodies sent to PayU.', 'bytes_out'),
+                ('received_bytes_total', 'Bytes of the response bodies received from PayU.', 'bytes_in'),
+                ('errors_total', 'Requests that raised an exception.', 'errors'),
+            )
+            for name, description, attribute in counters:
+                name = '{}_{}'.format(self.prefix, name)
+                lines.append('# HELP {} {}'.format(name, description))
+                lines.append('# TYPE {} counter'.format(name))
+                for labels, s in series:
+                    lines.append('{}{{{}}} {}'.format(name, self._format_labels(labels), getattr(s, attribute)))
+        return '\n'.join(lines) + '\n'
+
+    def _get_series(self):
+        return sorted(self._series.items(), key=lambda item: tuple(map(str, item[0])))
+
+    def _format_labels(self, labels):
+        command, resource, status = labels
+        return 'command="{}",resource="{}",status="{}"'.format(_escape(command), _escape(resource), _escape(status))
@@ -0,0 +1,297 @@
+from functools import partial
+
+from payu.builders import to_known_enum
+from payu.codecs import LazyJSON, get_default_codec
+from payu.enumerators import Franchise, MessagePol, OrderStatus, TransactionState, TransactionType
+
+_codec = None
+
+
+def _get_codec():
+    global _codec
+    if _codec is None:
+        _codec = get_default_codec()
+    return _codec
+
+
+def _enum(enum):
+    return partial(to_known_enum, enum)
+
+
+def _models(cls):
+    return lambda items: [cls(item) for item in items]
+
+
+def _get(data, key):
+    for part in key if isinstance(key, tuple) else (key,):
+        if data is None:
+            return None
+        data = data.get(part)
+    return data
+
+
+class Model(object):
+    """
+    Typed copy of a section of a PayU response that keeps only the fields it declares, so the response can be
+    dropped once it is wrapped. Scalar fields are declared in _fields as attribute name to (key or path of keys,
+    converter) and are stored in their slot when the model is built, with states mapped to the enums. Nested sections
+    are declared the same way in _sections; they are kept together as one compact JSON bytes value and only decoded,
+    converted and stored in their slots the first time one of them is accessed.
+    """
+    __slots__ = ('_encoded',)
+    _fields = {}
+    _sections = {}
+    _repr_fields = ()
+
+    def __init__(self, data):
+        """
+
+        Args:
+            data: Dict of the section of the response.
+        """
+        for name, (key, convert) in self._fields.items():
+            value = _get(data, key)
+            if value is not None and convert is not None:
+                value = convert(value)
+            setattr(self, name, value)
+
+        sections = {name: data[key] for name, (key, _) in self._sections.items() if data.get(key) is not None}
+        if sections:
+            # Copied to an exact size: encoders like orjson return bytes with spare capacity.
+            self._encoded = memoryview(_get_codec().dumps(sections)).tobytes()
+        else:
+            self._encoded = None
+            self._set_sections({})
+
+    def __getattr__(self, name):
+        if name not in self._sections:
+            raise AttributeError("'{}' object has no attribute '{}'".format(type(self).__name__, name))
+        encoded = self._encoded
+        if encoded is not None:
+            # The slots are filled before the encoded sections are dropped, so concurrent readers always find them.
+            self._set_sections(_get_codec().loads(encoded))
+            self._encoded = None
+        return object.__getattribute__(self, name)
+
+    def __repr__(self):
+        fields = ' '.join('{}={!r}'.format(name, getattr(self, name)) for name in self._repr_fields)
+        return '<{} {}>'.format(type(self).__name__, fields)
+
+    def _set_sections(self, sections):
+        for name, (_, convert) in self._sections.items():
+            value = sections.get(name)
+            if value is not None and convert is not None:
+                value = convert(value)
+            setattr(self, name, value)
+
+
+class TransactionResponse(Model):
+    _fields = {
+        'order_id': ('orderId', None),
+        'transaction_id': ('transactionId', None),
+        'state': ('state', _enum(TransactionState)),
+        'response_code': ('responseCode', _enum(MessagePol)),
+        'payment_network_response_code': ('paymentNetworkResponseCode', None),
+        'payment_network_response_error_message': ('paymentNetworkResponseErrorMessage', None),
+        'trazability_code': ('trazabilityCode', None),
+        'authorization_code': ('authorizationCode', None),
+        'pending_reason': ('pendingReason', None),
+        'error_code': ('errorCode', None),
+        'response_message': ('responseMessage', None),
+        'operation_date': ('operationDate', None),
+    }
+    _sections = {
+        'extra_parameters': ('extraParameters', None),
+    }
+    __slots__ = tuple(_fields) + tuple(_sections)
+    _repr_fields = ('transaction_id', 'state', 'response_code')
+
+
+class Transaction(Model):
+    _fields = {
+        'id': ('id', None),
+        'type': ('type', _enum(TransactionType)),
+        'payment_method': ('paymentMethod', None),
+        'payment_country': ('paymentCountry', None),
+        'state': (('transactionResponse', 'state'), _enum(TransactionState)),
+        'response_code': (('transactionResponse', 'responseCode'), _enum(MessagePol)),
+    }
+    _sections = {
+        'credit_card': ('creditCard', None),
+        'payer': ('payer', None),
+        'extra_parameters': ('extraParameters', None),
+        'response': ('transactionResponse', TransactionResponse),
+    }
+    __slots__ = tuple(_fields) + tuple(_sections)
+    _repr_fields = ('id', 'type', 'state')
+
+
+class Order(Model):
+    _fields = {
+        'id': ('id', None),
+        'account_id': ('accountId', None),
+        'status': ('status', _enum(OrderStatus)),
+        'reference_code': ('referenceCode', None),
+        'description': ('description', None),
+        'language': ('language', None),
+    }
+    _sections = {
+        'buyer': ('buyer', None),
+        'additional_values': ('additionalValues', None),
+        'transactions': ('transactions', _models(Transaction)),
+    }
+    __slots__ = tuple(_fields) + tuple(_sections)
+    _repr_fields = ('id', 'reference_code', 'status')
+
+    @property
+    def last_transaction(self):
+        return self.transactions[-1] if self.transactions else None
+
+
+class Token(Model):
+    _fields = {
+        'credit_card_token_id': ('creditCardTokenId', None),
+        'name': ('name', None),
+        'payer_id': ('payerId', None),
+        'identification_number': ('identificationNumber', None),
+        'payment_method': ('paymentMethod', _enum(Franchise)),
+        'masked_number': ('maskedNumber', None),
+        'expiration_date': ('expirationDate', None),
+        'creation_date': ('creationDate', None),
+        'error_description': ('errorDescription', None),
+    }
+    __slots__ = tuple(_fields)
+    _repr_fields = ('credit_card_token_id', 'payer_id', 'masked_number')
+
+
+class Subscription(Model):
+    _fields = {
+        'id': ('id', None),
+        'quantity': ('quantity', None),
+        'installments': ('installments', None),
+        'trial_days': ('trialDays', None),
+        'current_period_start': ('currentPeriodStart', None),
+        'current_period_end': ('currentPeriodEnd', None),
+        'plan_code': (('plan', 'planCode'), None),
+        'customer_id': (('customer', 'id'), None),
+    }
+    _sections = {
+        'plan': ('plan', None),
+        'customer': ('customer', None),
+    }
+    __slots__ = tuple(_fields) + tuple(_sections)
+    _repr_fields = ('id', 'plan_code', 'customer_id')
+
+
+class RecurringBill(Model):
+    _fields = {
+        'id': ('id', None),
+        'order_id': ('orderId', None),
+        'subscription_id': ('subscriptionId', None),
+        'state': ('state', None),
+        'amount': ('amount', None),
+        'currency': ('currency', None),
+        'date_charge': ('dateCharge', None),
+    }
+    __slots__ = tuple(_fields)
+    _repr_fields = ('id', 'subscription_id', 'state')
+
+
+def _decode(response):
+    if isinstance(response, LazyJSON):
+        return response.value
+    if isinstance(response, bytes):
+        return _get_codec().loads(response)
+    return response
+
+
+def _get_payload(response):
+    return ((response or {}).get('result') or {}).get('payload')
+
+
+def get_order(response):
+    """
+
+    Args:
+        response: Response of Query.get_order_by_identifier(), in any response mode.
+
+    Returns:
+        Order, or None if it was not found.
+
+    """
+    payload = _get_payload(_decode(response))
+    return Order(payload) if payload else None
+
+
+def get_orders(response):
+    """
+
+    Args:
+        response: Response of Query.get_order_by_reference(), in any response mode.
+
+    Returns:
+        List of Order.
+
+    """
+    return [Order(order) for order in _get_payload(_decode(response)) or []]
+
+
+def get_transaction_response(response):
+    """
+
+    Args:
+        response: Response of a payment, or of Query.get_transaction_response(), in any response mode.
+
+    Returns:
+        TransactionResponse, or None if the response has none.
+
+    """
+    response = _decode(response)
+    transaction = (response or {}).get('transactionResponse') or _get_payload(response)
+    return TransactionResponse(transaction) if transaction else None
+
+
+def get_token(response):
+    """
+
+    Args:
+        response: Response of Tokenization.create_single_token() or remove_token(), in any response mode.
+
+    Returns:
+        Token, or None if the response has none.
+
+    """
+    token = (_decode(response) or {}).get('creditCardToken')
+    return Token(token) if token else None
+
+
+def get_tokens(response):
+    """
+
+    Args:
+        response: Response of Tokenization.get_tokens(), in any response mode.
+
+    Returns:
+        List of Token.
+
+    """
+    return [Token(token) for token in (_decode(response) or {}).get('creditCardTokenList') or []]
+
+
+def get_subscription(response):
+    response = _decode(response)
+    return Subscription(response) if response else None
+
+
+def get_recurring_bills(response):
+    """
+
+    Args:
+        response: Response of Recurring.get_recurring_bill_by_client() or get_recurring_bill_by_subscription(), in
+        any response mode.
+
+    Returns:
+        List of RecurringBill.
+
+    """
+    return [RecurringBill(bill) for bill in (_decode(response) or {}).get('recurringBillList') or []]
@@ -0,0 +1,315 @@
+import logging
+import queue
+import threading
+from decimal import Decimal, InvalidOperation
+from urllib.parse import parse_qsl
+
+from payu.builders import to_known_enum
+from payu.cache import LRUCache
+from payu.enumerators import MessagePol, StatePol
+
+ACCEPTED = 'ACCEPTED'
+DUPLICATE = 'DUPLICATE'
+INVALID = 'INVALID'
+BUSY = 'BUSY'
+FAILED = 'FAILED'
+
+# PayU only sends again the notifications it does not get a 200 for: the ones that could not be queued and, in
+# synchronous mode, the ones whose handler failed.
+STATUS_CODES = {
+    ACCEPTED: 200,
+    DUPLICATE: 200,
+    INVALID: 400,
+    BUSY: 503,
+    FAILED: 500,
+}
+
+_STOP = object()
+
+logger = logging.getLogger(__name__)
+
+
+def _to_decimal(value):
+    try:
+        return Decimal(value)
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+
+
+class Notification(object):
+    """
+    Confirmation page notification, with the main parameters typed. Every parameter is kept, as sent, in fields.
+    """
+    __slots__ = ('fields', 'merchant_id', 'transaction_id', 'reference_sale', 'reference_pol', 'state_pol',
+                 'response_message_pol', 'response_code_pol', 'value', 'currency', 'payment_method_name', 'sign',
+                 'test')
+
+    def __init__(self, fields):
+        """
+
+        Args:
+            fields: Dict of the parameters of the notification.
+        """
+        self.fields = fields
+        self.merchant_id = fields.get('merchant_id')
+        self.transaction_id = fields.get('transaction_id')
+        self.reference_sale = fields.get('reference_sale')
+        self.reference_pol = fields.get('reference_pol')
+        self.state_pol = to_known_enum(StatePol, fields.get('state_pol'))
+        self.response_message_pol = to_known_enum(MessagePol, fields.get('response_message_pol'))
+        self.response_code_pol = fields.get('response_code_pol')
+        self.value = _to_decimal(fields.get('value'))
+        self.currency = fields.get('currency')
+        self.payment_method_name = fields.get('payment_method_name')
+        self.sign = fields.get('sign')
+        self.test = fields.get('test') in ('1', 'true', 'True')
+
+    def __repr__(self):
+        return '<Notification transaction_id={} reference_sale={} state_pol={}>'.format(
+            self.transaction_id, self.reference_sale, self.state_pol)
+
+    @classmethod
+    def from_body(cls, body):
+        """
+
+        Args:
+            body: application/x-www-form-urlencoded body of the POST, as bytes or str.
+
+        Returns:
+            Notification.
+
+        """
+        if isinstance(body, bytes):
+            body = body.decode('utf-8', 'replace')
+        return cls(dict(parse_qsl(body, keep_blank_values=True)))
+
+    def get_state_pol(self):
+        return self.state_pol.value if isinstance(self.state_pol, StatePol) else self.state_pol
+
+    @property
+    def is_approved(self):
+        return self.state_pol is StatePol.APPROVED
+
+
+class NotificationProcessor(object):
+    """
+    Receives the confirmation page notifications of PayU: each one is parsed, its signature verified and, unless it
+    is a retry of one already received, queued for a pool of workers that call the handler. Receiving only costs the
+    parsing and a hash, so the HTTP answer stays fast under bursts. The workers are started by the first notification
+    if start() was not called.
+
+        processor = client.create_notification_processor(handle_payment, on_error=store_failed)
+        app = processor.wsgi_app()
+
+    Retries are recognized by transaction_id and state_pol in a bounded LRU store. Queued notifications are answered
+    with a 200 before the handler runs, so PayU never sends again one whose handler fails: it is passed to on_error,
+    which must keep it, e.g. in a dead-letter store. With synchronous=True the handler runs before answering instead,
+    and a failure is answered with a 500 and forgotten, so PayU sends it again.
+    """
+
+    def __init__(self, signature, handler, max_workers=4, max_queue_size=10000, dedup=None, verify=True,
+                 synchronous=False, on_error=None):
+        """
+
+        Args:
+            signature: payu.signature.SignatureEngine of the merchant.
+            handler: Called with each Notification, from a worker thread, or from the request in synchronous mode.
+            max_workers: Number of worker threads.
+            max_queue_size: Maximum number of notifications waiting for a worker; more are answered as BUSY.
+            dedup: payu.cache.LRUCache used to recognize retries. Defaults to one of 100000 entries for a day.
+            verify: Whether notifications with a wrong signature are rejected.
+            synchronous: Whether the handler runs before the notification is answered, instead of in the workers.
+            on_error: Called with the Notification and the exception when the handler fails in a worker. Defaults to
+            logging the error.
+        """
+        self.signature = signature
+        self.handler = handler
+        self.max_workers = max_workers
+        self.dedup = dedup if dedup is not None else LRUCache(maxsize=100000, ttl=86400)
+        self.verify = verify
+        self.synchronous = synchronous
+        self.on_error = on_error
+
+        self._queue = queue.Queue(max_queue_size)
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        with self._lock:
+            if self._workers:
+                return
+            for i in range(self.max_workers):
+                worker = threading.Thread(target=self._work, name='payu-notifications-{}'.format(i), daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def stop(self):
+        """
+        Stops the workers once the notifications already queued are handled.
+        """
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for _ in workers:
+            self._queue.put(_STOP)
+        for worker in workers:
+            worker.join()
+
+    def join(self):
+        """
+        Blocks until every queued notification is handled.
+        """
+        self._queue.join()
+
+    def is_valid(self, notification):
+        if not notification.sign:
+            return False
+        return self.signature.verify_confirmation(notification.sign, notification.reference_sale,
+                                                  notification.value, notification.currency,
+                                                  notification.get_state_pol())
+
+    def process(self, body):
+        """
+
+        Args:
+            body: Body of the POST, or a dict of its parameters.
+
+        Returns:
+            Tuple of the outcome, ACCEPTED, DUPLICATE, INVALID, BUSY or, in synchronous mode, FAILED, and the
+            Notification.
+
+        """
+        notification = Notification(body) if isinstance(body, dict) else Notification.from_body(body)
+        if not notification.transaction_id or notification.value is None:
+            return INVALID, notification
+        if self.verify and not self.is_valid(notification):
+            logger.warning('Invalid signature in the notification of {}.'.format(notification.transaction_id))
+            return INVALID, notification
+
+        key = (notification.transaction_id, notification.get_state_pol())
+        if not self.dedup.add(key):
+            return DUPLICATE, notification
+
+        if self.synchronous:
+            try:
+                self.handler(notification)
+            except Exception:
+                logger.exception('The handler failed for the notification of {}.'.format(notification.transaction_id))
+                self.dedup.invalidate(key)
+                return FAILED, notification
+            return ACCEPTED, notification
+
+        if not self._workers:
+            self.start()
+        try:
+            self._queue.put_nowait(notification)
+        except queue.Full:
+            self.dedup.invalidate(key)
+            return BUSY, notification
+        return ACCEPTED, notification
+
+    def _work(self):
+        while True:
+            notification = self._queue.get()
+            try:
+                if notification is _STOP:
+                    return
+                self.handler(notification)
+            except Exception as e:
+                self._handle_error(notification, e)
+            finally:
+                self._queue.task_done()
+
+    def _handle_error(self, notification, error):
+        if self.on_error is None:
+            logger.error('The handler failed for the notification of {}.'.format(notification.transaction_id),
+                         exc_info=error)
+            return
+        try:
+            self.on_error(notification, error)
+        except Exception:
+            logger.exception('on_error failed for the notification of {}.'.format(notification.transaction_id))
+
+    def wsgi_app(self):
+        return WSGIApp(self)
+
+    def asgi_app(self):
+        return ASGIApp(self)
+
+
+def _get_status_line(outcome):
+    code = STATUS_CODES[outcome]
+    reasons = {200: 'OK', 400: 'Bad Request', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+    return '{} {}'.format(code, reasons[code])
+
+
+class WSGIApp(object):
+    """
+    WSGI application for the confirmation page URL. It answers any path, so it can be mounted where needed.
+    """
+
+    def __init__(self, processor):
+        self.processor = processor
+
+    def __call__(self, environ, start_response):
+        if environ.get('REQUEST_METHOD') != 'POST':
+            start_response('405 Method Not Allowed', [('Content-Type', 'text/plain'), ('Allow', 'POST')])
+            return [b'']
+
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        body = environ['wsgi.input'].read(length) if length else b''
+        outcome, _ = self.processor.process(body)
+        start_response(_get_status_line(outcome), [('Content-Type', 'text/plain')])
+        return [outcome.encode('ascii')]
+
+
+class ASGIApp(object):
+    """
+    ASGI application for the confirmation page URL. Processing does not block on the handler, which runs in the
+    workers of the processor or, in synchronous mode, in the default executor of the event loop.
+    """
+
+    def __init__(self, processor):
+        self.processor = processor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return
+        if scope['method'] != 'POST':
+            await self._respond(send, 405, b'', [(b'allow', b'POST')])
+            return
+
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+
+        body = b''.join(chunks)
+        if self.processor.synchronous:
+            import asyncio
+
+            outcome, _ = await asyncio.get_running_loop().run_in_executor(None, self.processor.process, body)
+        else:
+            outcome, _ = self.processor.process(body)
+        await self._respond(send, STATUS_CODES[outcome], outcome.encode('ascii'))
+
+    async def _respond(self, send, status, body, headers=()):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'text/plain')] + list(headers),
+        })
+        await send({'type': 'http.response.body', 'body': body})
@@ -1,6 +1,5 @@
-from payu.enumerators import Country, Currency, Franchise, PaymentCommand, TransactionType
-from payu.exceptions import CVVRequiredError
-from payu.utils import get_available_franchise_for_payment
+from payu.builders import to_country, to_currency, to_franchise, to_transaction_type
+from payu.enumerators import PaymentCommand, TransactionType
 
 
 class Payment(object):
@@ -8,6 +7,10 @@ class Payment(object):
     def __init__(self, client):
         self.client = client
         self.url = self.client.url + '/payments-api/{}/service.cgi'.format(self.client.payments_api_version)
+        self.methods_cache = None
+        if self.client.payment_methods_ttl:
+            self.methods_cache = self.client._create_cache(self.client.payment_methods_ttl,
+                                                           self.client.payment_methods_stale_ttl)
 
     def ping(self):
         payload = {
@@ -22,6 +25,29 @@ class Payment(object):
         return self.client._post(self.url, json=payload)
 
     def get_payments_methods(self):
+        """
+        Gets the payment methods available in the account. If the client has payment_methods_ttl the response is
+        cached: it is served from the cache while it is fresh, then served stale while it is refreshed in the
+        background, and concurrent misses are made into a single call.
+
+        Returns:
+
+        """
+        if self.methods_cache is None:
+            return self._get_payments_methods()
+        return self.methods_cache.get(PaymentCommand.GET_PAYMENT_METHODS.value, self._get_payments_methods)
+
+    def invalidate_payments_methods(self):
+        """
+        Drops the cached payment methods, so the next get_payments_methods() call fetches them.
+
+        Returns:
+
+        """
+        if self.methods_cache is not None:
+            self.methods_cache.invalidate()
+
+    def _get_payments_methods(self):
         payload = {
             "test": self.client.is_test,
             "language": self.client.language.value,
@@ -168,69 +194,22 @@ class Payment(object):
         Returns:
 
         """
-        if not isinstance(payment_country, Country):
-            payment_country = Country(payment_country)
-
-        if not isinstance(transaction_type, TransactionType):
-            transaction_type = TransactionType(transaction_type)
-
-        if not isinstance(payment_method, Franchise):
-            payment_method = Franchise(payment_method)
-
-        if not isinstance(currency, Currency):
-            currency = Currency(currency)
-
-        franchises = get_available_franchise_for_payment(payment_country, transaction_type)
-        if not franchises or payment_method not in franchises:
-            fmt = 'The credit card franchise {} with transaction type {} is not available for {}.'
-            raise CVVRequiredError(fmt.format(payment_method.value, transaction_type.value, payment_country.name))
-
-        payload = {
-            "language": self.client.language.value,
-            "command": PaymentCommand.SUBMIT_TRANSACTION.value,
-            "merchant": {
-                "apiKey": self.client.api_key,
-                "apiLogin": self.client.api_login
-            },
-            "transaction": {
-                "order": {
-                    "accountId": self.client.account_id,
-                    "referenceCode": reference_code,
-                    "description": description,
-                    "language": language or self.client.language.value,
-                    "signature": self.client._get_signature(reference_code, tx_value, currency.value),
-                    "notifyUrl": notify_url,
-                    "additionalValues": {
-                        "TX_VALUE": {
-                            "value": tx_value,
-                            "currency": currency.value
-                        },
-                        "TX_TAX": {
-                            "value": tx_tax,
-                            "currency": currency.value
-                        },
-                        "TX_TAX_RETURN_BASE": {
-                            "value": tx_tax_return_base,
-                            "currency": currency.value
-                        }
-                    },
-                    "buyer": buyer,
-                    "shippingAddress": shipping_address
-                },
-                "payer": payer,
-                "creditCard": credit_card,
-                "extraParameters": extra_parameters,
-                "type": transaction_type.value,
-                "paymentMethod": payment_method.value,
-                "paymentCountry": payment_country.value,
-                "deviceSessionId": device_session_id,
-                "ipAddress": ip_address,
-                "cookie": cookie,
-                "userAgent": user_agent
-            },
-            "test": self.client.is_test
-        }
-        return self.client._post(self.url, json=payload)
+        payment_country = to_country(payment_country)
+        transaction_type = to_transaction_type(transaction_type)
+        payment_method = to_franchise(payment_method)
+        currency = to_currency(currency)
+
+        self.client.capabilities.validate_payment(payment_country=payment_country, payment_method=payment_method,
+                                                  transaction_type=transaction_type)
+
+        payload = self.client.transaction_builder.build(
+            reference_code=reference_code, description=description, tx_value=tx_value, tx_tax=tx_tax,
+            tx_tax_return_base=tx_tax_return_base, currency=currency, buyer=buyer, payer=payer,
+            credit_card=credit_card, payment_method=payment_method, payment_country=payment_country,
+            device_session_id=device_session_id, ip_address=ip_address, cookie=cookie, user_agent=user_agent,
+            transaction_type=transaction_type, language=language, shipping_address=shipping_address,
+            extra_parameters=extra_parameters, notify_url=notify_url)
+        return self.client._post(self.url, data=payload)
 
     def make_authorization(self, **kwargs):
         kwargs['transaction_type'] = TransactionType.AUTHORIZATION
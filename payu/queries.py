@@ -22,7 +22,7 @@ class Query(object):
     def get_order_by_identifier(self, order_id):
         payload = {
             "test": self.client.is_test,
-            "language": self.client.language,
+            "language": self.client.language.value,
             "command": QueryCommand.ORDER_DETAIL.value,
             "merchant": {
                 "apiLogin": self.client.api_login,
@@ -37,7 +37,7 @@ class Query(object):
     def get_order_by_reference(self, reference_code):
         payload = {
             "test": self.client.is_test,
-            "language": self.client.language,
+            "language": self.client.language.value,
             "command": QueryCommand.ORDER_DETAIL_REFERENCE_CODE.value,
             "merchant": {
                 "apiLogin": self.client.api_login,
@@ -52,7 +52,7 @@ class Query(object):
     def get_transaction_response(self, transaction_id):
         payload = {
             "test": self.client.is_test,
-            "language": self.client.language,
+            "language": self.client.language.value,
             "command": QueryCommand.TRANSACTION_RESPONSE_DETAIL.value,
             "merchant": {
                 "apiLogin": self.client.api_login,
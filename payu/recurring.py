@@ -1,4 +1,23 @@
 import base64
+import datetime
+
+from payu.history import split_date_range
+
+REST_ERROR_TYPES = frozenset(['BAD_REQUEST', 'UNAUTHORIZED', 'FORBIDDEN', 'NOT_FOUND', 'METHOD_NOT_ALLOWED',
+                              'CONFLICT', 'UNSUPPORTED_MEDIA_TYPE', 'INTERNAL_SERVER_ERROR'])
+
+
+def is_rest_error(response):
+    """
+
+    Args:
+        response: Decoded response of the recurring REST API.
+
+    Returns:
+        True if the response is an error; otherwise, False.
+
+    """
+    return not isinstance(response, dict) or response.get('type') in REST_ERROR_TYPES or 'errorList' in response
 
 
 class Recurring(object):
@@ -99,7 +118,7 @@ class Recurring(object):
         Returns:
 
         """
-        return self.client._get(self.url + 'plans/{}'.format(plan_code), headers=self.get_headers())
+        return self._get_cached(('plan', plan_code), self.url + 'plans/{}'.format(plan_code))
 
     def update_plan(self, plan_code):
         raise NotImplementedError
@@ -114,7 +133,8 @@ class Recurring(object):
         Returns:
 
         """
-        return self.client._delete(self.url + 'plans/{}'.format(plan_code), headers=self.get_headers())
+        response = self.client._delete(self.url + 'plans/{}'.format(plan_code), headers=self.get_headers())
+        return self._invalidate(response, ('plan', plan_code))
 
     def create_customer(self, *, full_name, email):
         """
@@ -146,7 +166,7 @@ class Recurring(object):
         Returns:
 
         """
-        return self.client._get(self.url + 'customers/{}'.format(customer_id), headers=self.get_headers())
+        return self._get_cached(('customer', customer_id), self.url + 'customers/{}'.format(customer_id))
 
     def update_customer(self, plan_code):
         raise NotImplementedError
@@ -161,7 +181,8 @@ class Recurring(object):
         Returns:
 
         """
-        return self.client._delete(self.url + 'customers/{}'.format(customer_id), headers=self.get_headers())
+        response = self.client._delete(self.url + 'customers/{}'.format(customer_id), headers=self.get_headers())
+        return self._invalidate(response, ('customer', customer_id))
 
     def create_credit_card(self, *, customer_id, name, document, number, exp_month, exp_year, type, address):
         """
@@ -206,7 +227,8 @@ class Recurring(object):
             "address": address
         }
         fmt = 'customers/{}/creditCards'.format(customer_id)
-        return self.client._post(self.url + fmt, json=payload, headers=self.get_headers())
+        response = self.client._post(self.url + fmt, json=payload, headers=self.get_headers())
+        return self._invalidate(response, ('customer', customer_id))
 
     def get_credit_card(self, credit_card_id):
         """
@@ -218,7 +240,7 @@ class Recurring(object):
         Returns:
 
         """
-        return self.client._get(self.url + 'creditCards/{}'.format(credit_card_id), headers=self.get_headers())
+        return self._get_cached(('credit_card', credit_card_id), self.url + 'creditCards/{}'.format(credit_card_id))
 
     def update_credit_card(self):
         raise NotImplementedError
@@ -235,7 +257,8 @@ class Recurring(object):
 
         """
         fmt = 'customers/{}/creditCards/{}'.format(customer_id, credit_card_id)
-        return self.client._delete(self.url + fmt, headers=self.get_headers())
+        response = self.client._delete(self.url + fmt, headers=self.get_headers())
+        return self._invalidate(response, ('credit_card', credit_card_id), ('customer', customer_id))
 
     def create_subscription(self, *, customer_id, credit_card_token, plan_code, quantity=None, installments=None,
                             trial_days=None, immediate_payment=None, extra1=None, extra2=None, delivery_address=None,
@@ -300,7 +323,8 @@ class Recurring(object):
             "notifyUrl": notify_url,
             "recurringBillItems": recurring_bill_items
         }
-        return self.client._post(self.url + 'subscriptions', json=payload, headers=self.get_headers())
+        response = self.client._post(self.url + 'subscriptions', json=payload, headers=self.get_headers())
+        return self._invalidate(response, ('customer', customer_id))
 
     def get_subscription(self, subscription_id):
         """
@@ -312,7 +336,8 @@ class Recurring(object):
         Returns:
 
         """
-        return self.client._put(self.url + 'subscriptions/{}'.format(subscription_id), headers=self.get_headers())
+        fmt = 'subscriptions/{}'.format(subscription_id)
+        return self._get_cached(('subscription', subscription_id), self.url + fmt)
 
     def update_subscription(self, *, subscription_id, credit_card_token):
         """
@@ -330,7 +355,8 @@ class Recurring(object):
             "creditCardToken": credit_card_token
         }
         fmt = 'subscriptions/{}'.format(subscription_id)
-        return self.client._put(self.url + fmt, json=payload, headers=self.get_headers())
+        response = self.client._put(self.url + fmt, json=payload, headers=self.get_headers())
+        return self._invalidate(response, ('subscription', subscription_id))
 
     def delete_subscription(self, subscription_id):
         """
@@ -342,7 +368,9 @@ class Recurring(object):
         Returns:
 
         """
-        return self.client._delete(self.url + 'subscriptions/{}'.format(subscription_id), headers=self.get_headers())
+        fmt = 'subscriptions/{}'.format(subscription_id)
+        response = self.client._delete(self.url + fmt, headers=self.get_headers())
+        return self._invalidate(response, ('subscription', subscription_id))
 
     def create_additional_charge(self, *, subscription_id, description, plan_value, plan_tax, plan_tax_return_base,
                                  currency):
@@ -499,6 +527,42 @@ class Recurring(object):
             params['dateFinal'] = date_final.strftime('%Y-%m-%d')
         return self.client._get(self.url + 'recurringBill', params=params, headers=self.get_headers())
 
+    def iter_recurring_bills_by_client(self, *, customer_id, date_begin, date_final, window=datetime.timedelta(days=31),
+                                       max_workers=4):
+        """
+        Yields the bills of a customer one at a time in date order. The date range is split into windows that are
+        fetched at most max_workers at a time, so wide ranges do not have to fit in a single response.
+
+            for bill in client.recurring.iter_recurring_bills_by_client(customer_id='CUSTOMER_ID',
+                                                                        date_begin=date(2015, 1, 1),
+                                                                        date_final=date(2017, 12, 31)):
+                ...
+
+        With AsyncClient it returns an async generator.
+
+        Args:
+            customer_id:
+            date_begin:
+            date_final:
+            window: timedelta that each request spans.
+            max_workers: Maximum number of requests running at the same time.
+
+        Returns:
+            Generator of the bills of recurringBillList. Raises payu.exceptions.HistoryWindowError if a window fails.
+
+        """
+        def fetch(begin, final):
+            return self.get_recurring_bill_by_client(customer_id=customer_id, date_begin=begin, date_final=final)
+
+        windows = split_date_range(date_begin, date_final, window, resolution=datetime.timedelta(days=1))
+        return self.client._iter_windows(fetch, windows, self._get_bills, max_workers)
+
+    def _get_bills(self, response):
+        response = self.client._decode(response)
+        if is_rest_error(response):
+            return None
+        return response.get('recurringBillList') or []
+
     def get_recurring_bill_by_subscription(self, subscription_id):
         """
         Consulta de las facturas que están pagadas o pendientes por pagar. Se puede consultar por cliente,
@@ -515,6 +579,47 @@ class Recurring(object):
         }
         return self.client._get(self.url + 'recurringBill', params=params, headers=self.get_headers())
 
+    def _get_cached(self, key, url):
+        """
+        Read-through lookup in the recurring cache of the client, if it has one.
+
+        Args:
+            key: Tuple of the object type and its identifier.
+            url:
+
+        Returns:
+
+        """
+        cache = self.client.recurring_cache
+        if cache is None:
+            return self.client._get(url, headers=self.get_headers())
+
+        response = cache.get(key)
+        if response is not None:
+            return self.client._resolved(response)
+        return self.client._then(self.client._get(url, headers=self.get_headers()),
+                                 lambda r: self._store(key, r))
+
+    def _store(self, key, response):
+        if not is_rest_error(self.client._decode(response)):
+            self.client.recurring_cache.set(key, response)
+        return response
+
+    def _invalidate(self, response, *keys):
+        cache = self.client.recurring_cache
+        if cache is None:
+            return response
+
+        def invalidate(r):
+            for key in keys:
+                cache.invalidate(key)
+            return r
+
+        # The entries are dropped when the call is made and again once it is answered, so a concurrent read can not
+        # cache the object as it was before the change.
+        invalidate(None)
+        return self.client._then(response, invalidate)
+
     def get_headers(self):
         token = '{}:{}'.format(self.client.api_login, self.client.api_key)
         result = base64.b64encode(token.encode('utf-8')).decode('utf-8')
@@ -0,0 +1,155 @@
+import random
+
+from payu.enumerators import PaymentCommand, QueryCommand
+from payu.timeouts import RECURRING_GET
+
+# Commands without side effects at PayU. They can be sent again as many times as needed.
+IDEMPOTENT_COMMANDS = frozenset([
+    PaymentCommand.PING.value,
+    PaymentCommand.GET_PAYMENT_METHODS.value,
+    PaymentCommand.GET_BANK_LIST.value,
+    PaymentCommand.GET_TOKENS.value,
+    QueryCommand.ORDER_DETAIL.value,
+    QueryCommand.ORDER_DETAIL_REFERENCE_CODE.value,
+    QueryCommand.TRANSACTION_RESPONSE_DETAIL.value,
+    RECURRING_GET,
+])
+
+# Key of the order lookup in the responses built by get_resolved_response().
+RESOLVED_KEY = 'orderLookup'
+
+
+class RetryPolicy(object):
+    """
+    Decides which failed calls are sent again and how long to wait between attempts.
+
+    Idempotent commands are retried on transport errors and on the configured HTTP statuses with exponential backoff
+    and full jitter. Any other command is only retried when the connection could not even be established, because
+    then the request never reached PayU. Ambiguous SUBMIT_TRANSACTION failures are never resent; the client resolves
+    them through Query.get_order_by_reference instead.
+    """
+
+    def __init__(self, max_attempts=3, backoff_factor=0.25, max_backoff=5, retry_statuses=(500, 502, 503, 504),
+                 idempotent_commands=IDEMPOTENT_COMMANDS):
+        """
+
+        Args:
+            max_attempts: Total number of attempts per call, including the first one. Use 1 to disable retries.
+            backoff_factor: Base of the exponential backoff in seconds.
+            max_backoff: Upper bound of the wait between attempts in seconds.
+            retry_statuses: HTTP statuses that make an idempotent call be retried.
+            idempotent_commands: Commands that can be retried freely.
+        """
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_statuses = frozenset(retry_statuses)
+        self.idempotent_commands = frozenset(idempotent_commands)
+
+    def is_idempotent(self, command):
+        return command in self.idempotent_commands
+
+    def should_retry_error(self, command, attempt, connect_error=False):
+        """
+
+        Args:
+            command: Command of the failed call.
+            attempt: Number of attempts already made, starting at 1.
+            connect_error: Whether the connection could not be established, so nothing was sent.
+
+        Returns:
+            True if the call must be sent again; otherwise, False.
+
+        """
+        if attempt >= self.max_attempts:
+            return False
+        return connect_error or self.is_idempotent(command)
+
+    def should_retry_status(self, command, attempt, status_code):
+        if attempt >= self.max_attempts:
+            return False
+        return status_code in self.retry_statuses and self.is_idempotent(command)
+
+    def is_ambiguous_status(self, command, status_code):
+        return command == PaymentCommand.SUBMIT_TRANSACTION.value and status_code in self.retry_statuses
+
+    def get_backoff(self, attempt):
+        """
+
+        Args:
+            attempt: Number of attempts already made, starting at 1.
+
+        Returns:
+            Seconds to wait before the next attempt.
+
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** (attempt - 1)))
+
+
+def get_reference_code(kwargs):
+    """
+
+    Args:
+        kwargs: Keyword arguments of a SUBMIT_TRANSACTION request, with the payload in json or data.
+
+    Returns:
+        The reference code of the order in the payload, or None if it has none (e.g. captures and refunds).
+
+    """
+    payload = kwargs.get('json')
+    if isinstance(payload, dict):
+        return payload.get('transaction', {}).get('order', {}).get('referenceCode')
+    for key in ('data', 'content'):
+        reference_code = getattr(kwargs.get(key), 'reference_code', None)
+        if reference_code is not None:
+            return reference_code
+    return None
+
+
+def is_order_found(response):
+    """
+
+    Args:
+        response: Parsed response of Query.get_order_by_reference.
+
+    Returns:
+        True if PayU knows at least one order for the reference code; otherwise, False.
+
+    """
+    if not isinstance(response, dict) or response.get('code') != 'SUCCESS':
+        return False
+    return bool((response.get('result') or {}).get('payload'))
+
+
+def get_resolved_response(response):
+    """
+    Builds the response of a SUBMIT_TRANSACTION from the order PayU registered for it, so that it can be read like the
+    response of the payment itself. The lookup is kept under RESOLVED_KEY.
+
+    Args:
+        response: Parsed response of Query.get_order_by_reference, with at least one order.
+
+    Returns:
+        Dict with code, error, transactionResponse, built from the last transaction of the last order, and the
+        lookup; or None if that order has no transaction response yet.
+
+    """
+    order = response['result']['payload'][-1]
+    transactions = order.get('transactions') or []
+    transaction = transactions[-1] if transactions else {}
+    if not transaction.get('transactionResponse'):
+        return None
+    transaction_response = dict(transaction['transactionResponse'])
+    transaction_response.setdefault('orderId', order.get('id'))
+    transaction_response.setdefault('transactionId', transaction.get('id'))
+    return {'code': 'SUCCESS', 'error': None, 'transactionResponse': transaction_response, RESOLVED_KEY: response}
+
+
+def is_resolved(response):
+    """
+
+    Returns:
+        True if the decoded response of a payment was built from an order lookup after its outcome was unknown.
+
+    """
+    return isinstance(response, dict) and RESOLVED_KEY in response
@@ -0,0 +1,120 @@
+import hashlib
+import hmac
+from decimal import ROUND_HALF_EVEN, Decimal
+
+
+def format_confirmation_value(value):
+    """
+    Formats the value of a confirmation page notification the way PayU does before signing it: with one decimal when
+    the second one is zero (150.00 -> 150.0) and with two decimals otherwise (150.26 -> 150.26).
+
+    Args:
+        value: The value parameter of the notification.
+
+    Returns:
+        The value as signed by PayU.
+
+    """
+    value = Decimal(str(value)).quantize(Decimal('0.01'), rounding=ROUND_HALF_EVEN)
+    if value == value.quantize(Decimal('0.1')):
+        return str(value.quantize(Decimal('0.1')))
+    return str(value)
+
+
+class SignatureEngine(object):
+    """
+    Computes and verifies PayU signatures for one merchant. The hash state of the constant "api_key~merchant_id~"
+    prefix is computed once and copied for every signature.
+    """
+
+    def __init__(self, api_key, merchant_id, algorithm='md5'):
+        """
+
+        Args:
+            api_key:
+            merchant_id:
+            algorithm: Hash algorithm configured in the PayU account: md5, sha1 or sha256.
+        """
+        self.algorithm = algorithm
+        self._prefix = hashlib.new(algorithm, '{}~{}~'.format(api_key, merchant_id).encode('utf-8'))
+
+    def _sign(self, data):
+        signature = self._prefix.copy()
+        signature.update(data.encode('utf-8'))
+        return signature.hexdigest()
+
+    def sign(self, reference_code, tx_value, currency):
+        """
+        Signature of a transaction request.
+
+        Args:
+            reference_code:
+            tx_value: The value exactly as it is sent in TX_VALUE.
+            currency:
+
+        Returns:
+            The hexadecimal signature.
+
+        """
+        return self._sign('{}~{}~{}'.format(reference_code, tx_value, currency))
+
+    def sign_confirmation(self, reference_sale, value, currency, state_pol):
+        """
+        Signature PayU sends in the sign parameter of the confirmation page.
+
+        Args:
+            reference_sale:
+            value: The value parameter of the notification, without formatting.
+            currency:
+            state_pol:
+
+        Returns:
+            The hexadecimal signature.
+
+        """
+        return self._sign('{}~{}~{}~{}'.format(reference_sale, format_confirmation_value(value), currency, state_pol))
+
+    def verify(self, signature, reference_code, tx_value, currency):
+        return hmac.compare_digest(str(signature).lower(), self.sign(reference_code, tx_value, currency))
+
+    def verify_confirmation(self, signature, reference_sale, value, currency, state_pol):
+        expected = self.sign_confirmation(reference_sale, value, currency, state_pol)
+        return hmac.compare_digest(str(signature).lower(), expected)
+
+    def sign_many(self, items):
+        """
+
+        Args:
+            items: Iterable of (reference_code, tx_value, currency) tuples.
+
+        Returns:
+            List of signatures.
+
+        """
+        prefix = self._prefix
+        signatures = []
+        for reference_code, tx_value, currency in items:
+            signature = prefix.copy()
+            signature.update('{}~{}~{}'.format(reference_code, tx_value, currency).encode('utf-8'))
+            signatures.append(signature.hexdigest())
+        return signatures
+
+    def verify_many(self, items):
+        """
+        Verifies the signatures of many confirmation page notifications.
+
+        Args:
+            items: Iterable of (sign, reference_sale, value, currency, state_pol) tuples.
+
+        Returns:
+            List of booleans.
+
+        """
+        prefix = self._prefix
+        results = []
+        for sign, reference_sale, value, currency, state_pol in items:
+            signature = prefix.copy()
+            data = '{}~{}~{}~{}'.format(reference_sale, format_confirmation_value(value), currency, state_pol)
+            signature.update(data.encode('utf-8'))
+            results.append(hmac.compare_digest(str(sign).lower(), signature.hexdigest()))
+        return results
@@ -0,0 +1,163 @@
+import copy
+import threading
+import time
+
+from payu.exceptions import DeadlineExceededError
+from payu.retry import IDEMPOTENT_COMMANDS
+from payu.timeouts import get_deadline, get_remaining
+
+# Read-only commands whose identical concurrent calls can share one upstream request.
+COALESCED_COMMANDS = IDEMPOTENT_COMMANDS
+
+
+class _Flight(object):
+    __slots__ = ('event', 'value', 'error', 'expires_at')
+
+    def __init__(self, expires_at):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+        self.expires_at = expires_at
+
+
+def _must_rerun(error, expires_at):
+    """
+    Whether a caller that joined a failed call must make the call itself: when the call was interrupted, or when it
+    failed once the deadline of the caller that made it had expired, which may be earlier than this caller's.
+    """
+    if not isinstance(error, Exception):
+        return True
+    return expires_at is not None and expires_at <= time.monotonic()
+
+
+def _copy_value(value):
+    # Every caller that joined a call gets its own copy, so none of them sees the changes of the others.
+    return copy.deepcopy(value)
+
+
+def _copy_error(error):
+    """
+    Returns a new exception of the same type and attributes as the error of a shared call, so each caller that joined
+    it raises its own exception, with its own traceback, chained to the original one.
+    """
+    cls = type(error)
+    copied = cls.__new__(cls, *error.args)
+    copied.args = error.args
+    copied.__dict__.update(getattr(error, '__dict__', {}))
+    return copied
+
+
+class SingleFlight(object):
+    """
+    Coalesces concurrent calls with the same key: the first one runs and the others, from any thread, wait for it and
+    get a copy of its result or of its exception. Calls made after it finished run again. A caller that joins a call
+    waits no longer than its own payu.timeouts.deadline(), and makes the call again if it failed because of the
+    earlier deadline of the caller that made it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._flights)
+
+    def do(self, key, func, *args, **kwargs):
+        """
+
+        Args:
+            key: Hashable identity of the call.
+            func: Callable that makes the call.
+            *args:
+            **kwargs:
+
+        Returns:
+            What func returned, or a copy of it to every caller that joined the call.
+
+        Raises:
+            DeadlineExceededError: If the deadline of a caller that joined the call expires before it finishes.
+
+        """
+        with self._lock:
+            self.calls += 1
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight(get_deadline())
+                else:
+                    self.coalesced += 1
+
+            if leader:
+                break
+
+            remaining = get_remaining()
+            if not flight.event.wait(None if remaining is None else max(remaining, 0)):
+                raise DeadlineExceededError('The deadline expired while waiting for an identical call in flight.')
+            if flight.error is None:
+                return _copy_value(flight.value)
+            if not _must_rerun(flight.error, flight.expires_at):
+                raise _copy_error(flight.error) from flight.error
+            with self._lock:
+                self.coalesced -= 1
+
+        try:
+            flight.value = func(*args, **kwargs)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.event.set()
+        return flight.value
+
+    def get_stats(self):
+        with self._lock:
+            return {'calls': self.calls, 'coalesced': self.coalesced, 'in_flight': len(self._flights)}
+
+
+class AsyncSingleFlight(SingleFlight):
+    """
+    Asyncio version of SingleFlight, for callables that return awaitables. The call runs as a task, so a waiter that
+    is cancelled does not cancel it for the others.
+    """
+
+    async def do(self, key, func, *args, **kwargs):
+        import asyncio
+
+        self.calls += 1
+        while True:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                task = asyncio.ensure_future(func(*args, **kwargs))
+                flight = self._flights[key] = (task, get_deadline())
+                task.add_done_callback(lambda _, flight=flight: self._discard(key, flight))
+            else:
+                self.coalesced += 1
+            task, expires_at = flight
+
+            remaining = get_remaining()
+            done, _ = await asyncio.wait([task], timeout=None if remaining is None else max(remaining, 0))
+            if not done:
+                raise DeadlineExceededError('The deadline expired while waiting for an identical call in flight.')
+            if leader:
+                return task.result()
+
+            error = asyncio.CancelledError() if task.cancelled() else task.exception()
+            if error is None:
+                return _copy_value(task.result())
+            if not _must_rerun(error, expires_at):
+                raise _copy_error(error) from error
+            self.coalesced -= 1
+
+    def _discard(self, key, flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def get_stats(self):
+        return {'calls': self.calls, 'coalesced': self.coalesced, 'in_flight': len(self._flights)}
@@ -0,0 +1,273 @@
+import itertools
+import json
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAYMENTS_PATH = re.compile(r'^/payments-api/[^/]+/service\.cgi$')
+REPORTS_PATH = re.compile(r'^/reports-api/[^/]+/service\.cgi$')
+RECURRING_PATH = re.compile(r'^/payments-api/rest/v[^/]+/(?P<resource>[^/?]+)/?(?P<rest>[^?]*)')
+
+PAYMENT_METHODS = [
+    {'id': '10', 'description': 'VISA', 'country': 'CO', 'enabled': True, 'reason': None},
+    {'id': '11', 'description': 'MASTERCARD', 'country': 'CO', 'enabled': True, 'reason': None},
+    {'id': '12', 'description': 'AMEX', 'country': 'CO', 'enabled': True, 'reason': None},
+    {'id': '13', 'description': 'DINERS', 'country': 'CO', 'enabled': True, 'reason': None},
+    {'id': '35', 'description': 'PSE', 'country': 'CO', 'enabled': True, 'reason': None},
+    {'id': '38', 'description': 'EFECTY', 'country': 'CO', 'enabled': True, 'reason': None},
+    {'id': '39', 'description': 'BALOTO', 'country': 'CO', 'enabled': True, 'reason': None},
+]
+
+
+class StandInServer(object):
+    """
+    Local stand-in for the PayU payments, reports and recurring APIs, meant for load tests and benchmarks that can
+    not run against the sandbox. The fault settings are plain attributes and can be changed while it runs.
+
+        with StandInServer(latency=0.01, error_rate=0.01) as server:
+            client = Client(API_LOGIN, API_KEY, MERCHANT_ID, ACCOUNT_ID, base_url=server.url)
+            client.payments.ping()
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, error_rate=0.0, slow_rate=0.0, slow_latency=5.0,
+                 non_json_rate=0.0):
+        """
+
+        Args:
+            host: Interface to listen on.
+            port: Port to listen on. 0 picks a free port.
+            latency: Seconds added to every response, or a (min, max) tuple to pick it uniformly.
+            error_rate: Rate, between 0 and 1, of responses that are a 500 error.
+            slow_rate: Rate, between 0 and 1, of responses delayed by slow_latency.
+            slow_latency: Seconds added to the slow responses.
+            non_json_rate: Rate, between 0 and 1, of responses with an HTML body instead of JSON.
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.non_json_rate = non_json_rate
+
+        self.orders = {}
+        self.requests = 0
+        self._ids = itertools.count(840000000)
+        self._lock = threading.Lock()
+
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.standin = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='payu-standin', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def get_delay(self):
+        delay = self.latency
+        if isinstance(delay, (tuple, list)):
+            delay = random.uniform(*delay)
+        if self.slow_rate and random.random() < self.slow_rate:
+            delay += self.slow_latency
+        return delay
+
+    def next_id(self):
+        with self._lock:
+            self.requests += 1
+            return next(self._ids)
+
+    def handle_service(self, payload):
+        command = payload.get('command')
+        if command == 'PING':
+            return {'code': 'SUCCESS', 'error': None, 'transactionResponse': None}
+        if command == 'GET_PAYMENT_METHODS':
+            return {'code': 'SUCCESS', 'error': None, 'paymentMethods': PAYMENT_METHODS}
+        if command == 'SUBMIT_TRANSACTION':
+            return self.submit_transaction(payload.get('transaction') or {})
+        if command == 'CREATE_TOKEN':
+            token = dict(payload.get('creditCardToken') or {})
+            token['creditCardTokenId'] = str(uuid.uuid4())
+            token['maskedNumber'] = _mask(token.pop('number', ''))
+            return {'code': 'SUCCESS', 'error': None, 'creditCardToken': token}
+        if command == 'GET_TOKENS':
+            info = payload.get('creditCardTokenInformation') or {}
+            tokens = [{
+                'creditCardTokenId': info.get('creditCardTokenId') or str(uuid.uuid4()),
+                'name': 'APPROVED',
+                'payerId': info.get('payerId'),
+                'identificationNumber': '32144457',
+                'paymentMethod': 'VISA',
+                'maskedNumber': '411111******1111',
+                'creationDate': info.get('startDate'),
+            }]
+            return {'code': 'SUCCESS', 'error': None, 'creditCardTokenList': tokens}
+        if command == 'REMOVE_TOKEN':
+            return {'code': 'SUCCESS', 'error': None, 'creditCardToken': payload.get('removeCreditCardToken')}
+        if command == 'ORDER_DETAIL':
+            order = self.get_order(lambda o: str(o['id']) == str(payload['details']['orderId']))
+            return {'code': 'SUCCESS', 'error': None, 'result': {'payload': order}}
+        if command == 'ORDER_DETAIL_REFERENCE_CODE':
+            reference_code = payload['details']['referenceCode']
+            order = self.orders.get(reference_code)
+            return {'code': 'SUCCESS', 'error': None, 'result': {'payload': [order] if order else None}}
+        if command == 'TRANSACTION_RESPONSE_DETAIL':
+            transaction = {'state': 'APPROVED', 'trazabilityCode': '00000000', 'authorizationCode': '00000000',
+                           'responseCode': 'APPROVED', 'operationDate': int(time.time() * 1000)}
+            return {'code': 'SUCCESS', 'error': None, 'result': {'payload': transaction}}
+        return {'code': 'ERROR', 'error': 'Invalid command {}'.format(command)}
+
+    def submit_transaction(self, transaction):
+        order_id = self.next_id()
+        transaction_id = str(uuid.uuid4())
+        reference_code = (transaction.get('order') or {}).get('referenceCode')
+        response = {
+            'orderId': order_id,
+            'transactionId': transaction_id,
+            'state': 'APPROVED',
+            'paymentNetworkResponseCode': None,
+            'paymentNetworkResponseErrorMessage': None,
+            'trazabilityCode': '00000000',
+            'authorizationCode': '00000000',
+            'pendingReason': None,
+            'responseCode': 'APPROVED',
+            'errorCode': None,
+            'responseMessage': None,
+            'transactionDate': None,
+            'transactionTime': None,
+            'operationDate': int(time.time() * 1000),
+            'extraParameters': None,
+        }
+        if reference_code:
+            self.orders[reference_code] = {
+                'id': order_id,
+                'accountId': (transaction.get('order') or {}).get('accountId'),
+                'status': 'CAPTURED',
+                'referenceCode': reference_code,
+                'description': transaction['order'].get('description'),
+                'language': transaction['order'].get('language'),
+                'additionalValues': transaction['order'].get('additionalValues'),
+                'transactions': [{'id': transaction_id, 'type': transaction.get('type'),
+                                  'paymentMethod': transaction.get('paymentMethod'),
+                                  'transactionResponse': dict(response)}],
+            }
+        return {'code': 'SUCCESS', 'error': None, 'transactionResponse': response}
+
+    def get_order(self, predicate):
+        for order in list(self.orders.values()):
+            if predicate(order):
+                return order
+        return None
+
+    def handle_recurring(self, method, resource, rest, payload):
+        self.next_id()
+        if method == 'DELETE':
+            return {'description': 'The {} {} was deleted'.format(resource, rest)}
+        if resource == 'recurringBill':
+            bills = [{
+                'id': str(uuid.uuid4()),
+                'orderId': self.next_id(),
+                'subscriptionId': 'SUBSCRIPTION_ID',
+                'state': 'PAID',
+                'amount': 20000,
+                'currency': 'COP',
+                'dateCharge': int(time.time() * 1000),
+            } for _ in range(3)]
+            return {'recurringBillList': bills}
+        body = dict(payload or {})
+        body.setdefault('id', rest or str(uuid.uuid4()))
+        if resource == 'plans':
+            body.setdefault('planCode', rest)
+        return body
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.dispatch()
+
+    def do_POST(self):
+        self.dispatch()
+
+    def do_PUT(self):
+        self.dispatch()
+
+    def do_DELETE(self):
+        self.dispatch()
+
+    def dispatch(self):
+        standin = self.server.standin
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+
+        delay = standin.get_delay()
+        if delay:
+            time.sleep(delay)
+
+        if standin.error_rate and random.random() < standin.error_rate:
+            return self.respond(500, b'{"code":"ERROR","error":"Internal server error"}')
+        if standin.non_json_rate and random.random() < standin.non_json_rate:
+            return self.respond(502, b'<html><body>Bad Gateway</body></html>', 'text/html')
+
+        try:
+            payload = json.loads(body.decode('utf-8')) if body else None
+        except ValueError:
+            return self.respond(400, b'{"code":"ERROR","error":"Invalid JSON"}')
+
+        path = self.path.split('?', 1)[0]
+        recurring = RECURRING_PATH.match(path)
+        if self.command == 'POST' and (PAYMENTS_PATH.match(path) or REPORTS_PATH.match(path)):
+            if payload is None:
+                return self.respond(400, b'{"code":"ERROR","error":"Empty body"}')
+            response = standin.handle_service(payload)
+        elif recurring:
+            response = standin.handle_recurring(self.command, recurring.group('resource'),
+                                                recurring.group('rest').strip('/'), payload)
+        else:
+            return self.respond(404, b'{"code":"ERROR","error":"Not found"}')
+        self.respond(200, json.dumps(response).encode('utf-8'))
+
+    def respond(self, status, body, content_type='application/json'):
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up on the request, e.g. its timeout expired or a hedge answered first.
+            self.close_connection = True
+
+
+def _mask(number):
+    if len(number) < 10:
+        return number
+    return '{}{}{}'.format(number[:6], '*' * (len(number) - 10), number[-4:])
@@ -0,0 +1,96 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from payu.enumerators import PaymentCommand, QueryCommand
+from payu.exceptions import DeadlineExceededError
+
+RECURRING_GET = 'RECURRING_GET'
+RECURRING_POST = 'RECURRING_POST'
+RECURRING_PUT = 'RECURRING_PUT'
+RECURRING_DELETE = 'RECURRING_DELETE'
+
+# (connect, read) timeouts in seconds for each command. PayU guarantees ~3 seconds on average and at most one minute
+# for transactions, while pings and lookups should fail fast.
+DEFAULT_TIMEOUTS = {
+    PaymentCommand.PING.value: (2, 3),
+    PaymentCommand.SUBMIT_TRANSACTION.value: (5, 60),
+    PaymentCommand.GET_PAYMENT_METHODS.value: (3, 10),
+    PaymentCommand.GET_BANK_LIST.value: (3, 10),
+    PaymentCommand.CREATE_TOKEN.value: (3, 30),
+    PaymentCommand.GET_TOKENS.value: (3, 30),
+    PaymentCommand.REMOVE_TOKEN.value: (3, 30),
+    QueryCommand.ORDER_DETAIL.value: (2, 10),
+    QueryCommand.ORDER_DETAIL_REFERENCE_CODE.value: (2, 10),
+    QueryCommand.TRANSACTION_RESPONSE_DETAIL.value: (2, 10),
+    RECURRING_GET: (3, 15),
+    RECURRING_POST: (5, 60),
+    RECURRING_PUT: (5, 60),
+    RECURRING_DELETE: (5, 30),
+}
+
+_deadline = ContextVar('payu_deadline', default=None)
+
+
+@contextmanager
+def deadline(seconds):
+    """
+    Bounds every PayU call made inside the block (in the current thread or asyncio task) so that all of them together
+    finish within the given number of seconds. Nested deadlines never extend the outer one.
+
+    Args:
+        seconds: Time budget for the block.
+
+    """
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        expires_at = min(expires_at, current)
+    token = _deadline.set(expires_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def get_deadline():
+    """
+
+    Returns:
+        The time.monotonic() time the active deadline expires at, or None if there is no active deadline.
+
+    """
+    return _deadline.get()
+
+
+def get_remaining():
+    """
+
+    Returns:
+        Seconds left before the active deadline expires, or None if there is no active deadline.
+
+    """
+    expires_at = _deadline.get()
+    if expires_at is None:
+        return None
+    return expires_at - time.monotonic()
+
+
+def clamp_timeout(timeout):
+    """
+    Shrinks a (connect, read) timeout so it does not outlive the active deadline.
+
+    Args:
+        timeout: Tuple of connect and read timeouts in seconds.
+
+    Returns:
+        The clamped (connect, read) tuple.
+
+    """
+    remaining = get_remaining()
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        raise DeadlineExceededError('The deadline for the request has already expired.')
+    connect, read = timeout
+    return min(connect, remaining), min(read, remaining)
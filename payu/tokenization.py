@@ -1,6 +1,10 @@
-from payu.enumerators import Country, Currency, Franchise, PaymentCommand, TransactionType
-from payu.exceptions import CVVRequiredError, FranchiseUnavailableError
-from payu.utils import get_available_franchise_for_tokenization, has_franchise_cvv_tokenization
+import datetime
+
+from payu.bulk import (MAX_ROWS, OPTIONAL_PAYMENT_FIELDS, PAYMENT_FIELDS, TOKEN_FIELDS, TOKEN_RESULT_FIELDS, BulkReport,
+                       get_row, iter_results, write_chunks)
+from payu.builders import to_country, to_currency, to_franchise, to_transaction_type
+from payu.enumerators import PaymentCommand, TransactionType
+from payu.history import split_date_range
 
 
 class Tokenization(object):
@@ -43,7 +47,7 @@ class Tokenization(object):
         }
         return self.client._post(self.url, json=payload)
 
-    def create_multiple_tokens(self):
+    def create_multiple_tokens(self, cards, *, directory=None, chunk_size=MAX_ROWS):
         """
         Using this feature you can register various customer’s credit card data and get token sequential numbers.
 
@@ -57,10 +61,41 @@ class Tokenization(object):
         The file must be encoded under the UTF-8 standard.
         The file must not have more than 10,000 registers.
 
+        The cards are streamed into as many files as needed, so any number of them can be given without holding
+        them in memory. The files are uploaded in the PayU module, and the result files it returns can be read with
+        get_multiple_tokens_results().
+
+        Args:
+            cards: Iterable of dicts with the arguments of create_single_token(), or of sequences in the order above.
+            Raises ValueError if a dict misses one of them.
+            directory: Directory where the files are created. Defaults to a new temporary directory.
+            chunk_size: Maximum number of registers per file.
+
+        Returns:
+            List of the paths of the CSV files.
+
+        """
+        rows = (self._get_token_row(card) for card in cards)
+        return list(write_chunks(rows, directory=directory, prefix='payu-tokens-', chunk_size=chunk_size))
+
+    def _get_token_row(self, card):
+        row = get_row(card, TOKEN_FIELDS)
+        row[4] = to_franchise(row[4]).value
+        return row
+
+    def get_multiple_tokens_results(self, source, fields=TOKEN_RESULT_FIELDS):
+        """
+        Reads the result files of a massive tokenization lazily, one register at a time.
+
+        Args:
+            source: Path or text file of a result file, or an iterable of them.
+            fields: Column names of the result file, see payu.bulk.TOKEN_RESULT_FIELDS.
+
         Returns:
+            Generator of dicts with the fields as keys.
 
         """
-        raise NotImplementedError
+        return iter_results(source, fields)
 
     def make_payment(self, *, reference_code, description, tx_value, currency, buyer, payer, credit_card_token_id,
                      payment_method, payment_country, device_session_id, ip_address, cookie, user_agent, language=None,
@@ -182,70 +217,23 @@ class Tokenization(object):
         Returns:
 
         """
-        if not isinstance(payment_country, Country):
-            payment_country = Country(payment_country)
-
-        if not isinstance(transaction_type, TransactionType):
-            transaction_type = TransactionType(transaction_type)
-
-        if not isinstance(payment_method, Franchise):
-            payment_method = Franchise(payment_method)
-
-        if not isinstance(currency, Currency):
-            currency = Currency(currency)
-
-        franchises = get_available_franchise_for_tokenization(payment_country, transaction_type)
-        if not franchises or payment_method not in franchises:
-            fmt = 'The credit card franchise {} with transaction type {} is not available for {}.'
-            raise FranchiseUnavailableError(
-                fmt.format(payment_method.value, transaction_type.value, payment_country.name))
-
-        if has_franchise_cvv_tokenization(payment_method, payment_country, transaction_type) and not security_code:
-            fmt = 'Card verification value (CVV) is required for franchise {} with transaction type {} in {}.'
-            raise CVVRequiredError(fmt.format(payment_country.value, transaction_type.value, payment_country.name))
-
-        payload = {
-            "language": self.client.language.value,
-            "command": PaymentCommand.SUBMIT_TRANSACTION.value,
-            "merchant": {
-                "apiKey": self.client.api_key,
-                "apiLogin": self.client.api_login
-            },
-            "transaction": {
-                "order": {
-                    "accountId": self.client.account_id,
-                    "referenceCode": reference_code,
-                    "description": description,
-                    "language": language or self.client.language.value,
-                    "signature": self.client._get_signature(reference_code, tx_value, currency.value),
-                    "notifyUrl": notify_url,
-                    "additionalValues": {
-                        "TX_VALUE": {
-                            "value": tx_value,
-                            "currency": currency.value
-                        }
-                    },
-                    "buyer": buyer,
-                    "shippingAddress": shipping_address
-                },
-                "payer": payer,
-                "creditCardTokenId": credit_card_token_id,
-                "extraParameters": extra_parameters,
-                "type": transaction_type.value,
-                "paymentMethod": payment_method.value,
-                "paymentCountry": payment_country.value,
-                "deviceSessionId": device_session_id,
-                "ipAddress": ip_address,
-                "cookie": cookie,
-                "userAgent": user_agent
-            },
-            "test": self.client.is_test
-        }
-        if security_code:
-            payload['transaction']['creditCard'] = {
-                'securityCode': security_code
-            }
-        return self.client._post(self.url, json=payload)
+        payment_country = to_country(payment_country)
+        transaction_type = to_transaction_type(transaction_type)
+        payment_method = to_franchise(payment_method)
+        currency = to_currency(currency)
+
+        self.client.capabilities.validate_payment(payment_country=payment_country, payment_method=payment_method,
+                                                  transaction_type=transaction_type, tokenization=True,
+                                                  security_code=security_code)
+
+        payload = self.client.transaction_builder.build_token(
+            reference_code=reference_code, description=description, tx_value=tx_value, currency=currency,
+            buyer=buyer, payer=payer, credit_card_token_id=credit_card_token_id, payment_method=payment_method,
+            payment_country=payment_country, device_session_id=device_session_id, ip_address=ip_address,
+            cookie=cookie, user_agent=user_agent, transaction_type=transaction_type, language=language,
+            shipping_address=shipping_address, extra_parameters=extra_parameters, notify_url=notify_url,
+            security_code=security_code)
+        return self.client._post(self.url, data=payload)
 
     def make_authorization(self, **kwargs):
         kwargs['transaction_type'] = TransactionType.AUTHORIZATION
@@ -270,7 +258,7 @@ class Tokenization(object):
         }
         return self.client._post(self.url, json=payload)
 
-    def make_multiple_payments(self):
+    def make_multiple_payments(self, payments, *, directory=None, chunk_size=MAX_ROWS):
         """
         This feature will allow you to make massive collections using the Token that were previously created by our
         system
@@ -286,10 +274,64 @@ class Tokenization(object):
         The file must be encoded under the UTF-8 standard.
         The file must not have more than 10,000 records.
 
+        The payments are streamed into as many files as needed, to upload in the PayU module. For accounts without
+        massive collections use make_parallel_payments().
+
+        Args:
+            payments: Iterable of dicts with the keys of payu.bulk.PAYMENT_FIELDS, or of sequences in the order above.
+            account_id, installments, tx_tax, tx_tax_return_base, additional_value and language default to those of
+            the client, 1 and 0, and security_code can be left out. Raises ValueError if another key is missing.
+            directory: Directory where the files are created. Defaults to a new temporary directory.
+            chunk_size: Maximum number of records per file.
+
         Returns:
+            List of the paths of the CSV files.
 
         """
-        raise NotImplementedError
+        rows = (self._get_payment_row(payment) for payment in payments)
+        return list(write_chunks(rows, directory=directory, prefix='payu-payments-', chunk_size=chunk_size))
+
+    def _get_payment_row(self, payment):
+        if hasattr(payment, 'keys'):
+            payment = dict({
+                'account_id': self.client.account_id,
+                'installments': 1,
+                'tx_tax': 0,
+                'tx_tax_return_base': 0,
+                'additional_value': 0,
+                'language': self.client.language.value,
+            }, **payment)
+        row = get_row(payment, PAYMENT_FIELDS, OPTIONAL_PAYMENT_FIELDS)
+        row[7] = to_currency(row[7]).value
+        return row
+
+    def make_parallel_payments(self, payments, *, max_workers=10):
+        """
+        Makes the payments with make_payment() on at most max_workers concurrent calls. An error in one payment does
+        not stop the others, and only the payments in flight are held in memory.
+
+        Args:
+            payments: Iterable of dicts with the arguments of make_payment().
+            max_workers: Maximum number of payments running at the same time.
+
+        Returns:
+            payu.bulk.BulkReport.
+
+        """
+        report = BulkReport()
+        reference_codes = {}
+
+        def get_calls():
+            for index, payment in enumerate(payments):
+                reference_codes[index] = payment.get('reference_code')
+                yield self.make_payment, payment
+
+        def add(result):
+            response = None if result.error else self.client._decode(result.result)
+            report.add(result.index, reference_codes.pop(result.index), response, result.error)
+
+        results = self.client.batch(get_calls(), max_workers=max_workers, stream=True)
+        return self.client._consume(results, add, report)
 
     def get_tokens(self, *, payer_id, credit_card_token_id, start_date, end_date):
         """
@@ -321,6 +363,40 @@ class Tokenization(object):
         }
         return self.client._post(self.url, json=payload)
 
+    def iter_tokens(self, *, payer_id, credit_card_token_id, start_date, end_date, window=datetime.timedelta(days=31),
+                    max_workers=4):
+        """
+        Yields the Credit Cards Token one at a time in date order. The date range is split into windows that are
+        queried at most max_workers at a time, so wide ranges do not have to fit in a single response.
+
+        With AsyncClient it returns an async generator.
+
+        Args:
+            payer_id:
+            credit_card_token_id:
+            start_date: date or datetime. A date is taken as its midnight, as get_tokens() sends it.
+            end_date: date or datetime. A date is taken as its midnight, as get_tokens() sends it.
+            window: timedelta that each request spans.
+            max_workers: Maximum number of requests running at the same time.
+
+        Returns:
+            Generator of the tokens of creditCardTokenList. Raises payu.exceptions.HistoryWindowError if a window
+            fails.
+
+        """
+        def fetch(start, end):
+            return self.get_tokens(payer_id=payer_id, credit_card_token_id=credit_card_token_id, start_date=start,
+                                   end_date=end)
+
+        # The API takes seconds, so the windows are split at that resolution even when the bounds are dates.
+        windows = split_date_range(_to_datetime(start_date), _to_datetime(end_date), window)
+        return self.client._iter_windows(fetch, windows, self._get_tokens, max_workers)
+
+    def _get_tokens(self, response):
+        if not self.client._is_success(response):
+            return None
+        return self.client._decode(response).get('creditCardTokenList') or []
+
     def remove_token(self, *, payer_id, credit_card_token_id):
         """
         This feature allows you to delete a tokenized credit card register.
@@ -346,3 +422,9 @@ class Tokenization(object):
             "test": self.client.is_test
         }
         return self.client._post(self.url, json=payload)
+
+
+def _to_datetime(value):
+    if isinstance(value, datetime.datetime):
+        return value
+    return datetime.datetime.combine(value, datetime.time.min)
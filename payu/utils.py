@@ -1,5 +1,4 @@
-from payu.enumerators import Country, Franchise as F, TransactionType as T
-from payu.exceptions import InvalidCountryError
+from payu.capabilities import PAYMENT, TOKENIZATION, get_capability_matrix
 
 
 def get_available_franchise_for_payment(country, transaction_type):
@@ -13,49 +12,7 @@ def get_available_franchise_for_payment(country, transaction_type):
         List of available Franchises for a country and transaction type.
 
     """
-    if country == Country.ARGENTINA:
-        if transaction_type in (T.AUTHORIZATION, T.CAPTURE):
-            return F.VISA, F.MASTERCARD, F.AMEX, F.SHOPPING, F.CABAL, F.ARGENCARD, F.CENCOSUD, F.NARANJA
-        else:
-            return F.VISA, F.MASTERCARD, F.AMEX, F.SHOPPING, F.CABAL, F.ARGENCARD, F.CENCOSUD, F.NARANJA
-    elif country == Country.BRAZIL:
-        if transaction_type in (T.AUTHORIZATION, T.CAPTURE):
-            return F.VISA, F.MASTERCARD, F.AMEX, F.DINERS, F.HIPERCARD, F.ELO
-        else:
-            return F.VISA, F.MASTERCARD, F.AMEX, F.DINERS, F.HIPERCARD, F.ELO
-    elif country == Country.COLOMBIA:
-        if transaction_type in (T.AUTHORIZATION, T.CAPTURE):
-            return None
-        else:
-            return F.VISA, F.MASTERCARD, F.AMEX, F.DINERS, F.CODENSA, F.VISA_DEBIT
-    elif country == Country.MEXICO:
-        # Nota de Ingeniero de Payu:
-        # Puede procesar en 2 pasos VISA y MASTERCARD
-        # Puede procesar en 1 VISA, MASTERCARD y AMEX
-        if transaction_type in (T.AUTHORIZATION, T.CAPTURE):
-            return F.VISA, F.MASTERCARD
-        else:
-            return F.VISA, F.MASTERCARD, F.AMEX
-    elif country == Country.PANAMA:
-        if transaction_type in (T.AUTHORIZATION, T.CAPTURE):
-            return None
-        else:
-            return F.VISA, F.MASTERCARD
-    elif country == Country.PERU:
-        # Nota de Ingeniero de Payu:
-        # Puede procesar en 2 pasos MASTERCARD, DINERS, AMEX y VISA DEBIT
-        # Puede procesar en 1 paso MASTERCARD VISA DEBIT y DEBIT
-        if transaction_type in (T.AUTHORIZATION, T.CAPTURE):
-            return F.VISA, F.MASTERCARD, F.DINERS, F.AMEX, F.VISA_DEBIT
-        else:
-            return F.VISA, F.MASTERCARD, F.DINERS, F.AMEX, F.VISA_DEBIT, F.MASTERCARD_DEBIT
-    elif country == Country.CHILE:
-        if transaction_type in (T.AUTHORIZATION, T.CAPTURE):
-            return None
-        else:
-            return F.VISA, F.MASTERCARD, F.AMEX, F.DINERS
-    else:
-        raise InvalidCountryError
+    return get_capability_matrix().get_franchises(PAYMENT, country, transaction_type)
 
 
 def get_available_franchise_for_tokenization(country, transaction_type):
@@ -69,55 +26,7 @@ def get_available_franchise_for_tokenization(country, transaction_type):
         List of available Franchises for a country and transaction type.
 
     """
-    if country == Country.ARGENTINA:
-        # Nota de Ingeniero de Payu:
-        # Puede procesar en 2 pasos TODAS sin CVV excepto VISA
-        # Puede procesar en 1 paso TODAS sin CVV excepto VISA
-        if transaction_type in (T.AUTHORIZATION, T.CAPTURE):
-            return F.VISA, F.MASTERCARD, F.AMEX, F.SHOPPING, F.CABAL, F.ARGENCARD, F.CENCOSUD, F.NARANJA
-        else:
-            return F.VISA, F.MASTERCARD, F.AMEX, F.SHOPPING, F.CABAL, F.ARGENCARD, F.CENCOSUD, F.NARANJA
-    elif country == Country.BRAZIL:
-        # Nota de Ingeniero de Payu:
-        # Puede procesar en 2 pasos TODAS sin CVV
-        # Puede procesar en 1 paso TODAS sin CVV
-        if transaction_type in (T.AUTHORIZATION, T.CAPTURE):
-            return F.VISA, F.MASTERCARD, F.AMEX, F.DINERS, F.HIPERCARD, F.ELO
-        else:
-            return F.VISA, F.MASTERCARD, F.AMEX, F.DINERS, F.HIPERCARD, F.ELO
-    elif country == Country.COLOMBIA:
-        if transaction_type in (T.AUTHORIZATION, T.CAPTURE):
-            return None
-        else:
-            return F.VISA, F.MASTERCARD, F.AMEX, F.DINERS
-    elif country == Country.MEXICO:
-        # Nota de Ingeniero de Payu:
-        # Puede procesar en 2 pasos TODAS sin CVV excepto AMEX
-        # Puede procesar en 1 paso TODAS sin CVV excepto AMEX
-        if transaction_type in (T.AUTHORIZATION, T.CAPTURE):
-            return F.VISA, F.MASTERCARD
-        else:
-            return F.VISA, F.MASTERCARD, F.AMEX
-    elif country == Country.PANAMA:
-        if transaction_type in (T.AUTHORIZATION, T.CAPTURE):
-            return None
-        else:
-            return F.VISA, F.MASTERCARD
-    elif country == Country.PERU:
-        # Nota de Ingeniero de Payu:
-        # Puede procesar en 2 pasos TODAS sin CVV
-        # Puede procesar en 1 paso TODAS sin CVV
-        if transaction_type in (T.AUTHORIZATION, T.CAPTURE):
-            return F.VISA, F.MASTERCARD, F.DINERS, F.AMEX
-        else:
-            return F.VISA, F.MASTERCARD, F.DINERS, F.AMEX
-    elif country == Country.CHILE:
-        if transaction_type in (T.AUTHORIZATION, T.CAPTURE):
-            return None
-        else:
-            return F.VISA, F.MASTERCARD, F.AMEX, F.DINERS
-    else:
-        raise InvalidCountryError
+    return get_capability_matrix().get_franchises(TOKENIZATION, country, transaction_type)
 
 
 def has_franchise_cvv_tokenization(franchise, country, transaction_type):
@@ -131,34 +40,19 @@ def has_franchise_cvv_tokenization(franchise, country, transaction_type):
     Returns:
         True if CVV is required for a country and transaction type; otherwise, False.
     """
-    if country == Country.ARGENTINA:
-        franchise_list = (F.VISA,)
-        if transaction_type in (T.AUTHORIZATION, T.CAPTURE) and franchise in franchise_list:
-            return True
-        if transaction_type == T.AUTHORIZATION_AND_CAPTURE and franchise in franchise_list:
-            return True
-    elif country == Country.BRAZIL:
-        # Nota de Ingeniero de Payu:
-        # Puede procesar todas sin CVV
-        return False
-    elif country == Country.COLOMBIA:
-        # Nota de Ingeniero de Payu:
-        # Puede procesar todas sin CVV
-        return False
-    elif country == Country.CHILE:
-        # Nota de Ingeniero de Payu:
-        # No puede procesar ninguna sin CVV
-        return True
-    elif country == Country.MEXICO:
-        if transaction_type == T.AUTHORIZATION_AND_CAPTURE and franchise in (F.AMEX,):
-            return True
-    elif country == Country.PANAMA:
-        # Nota de Ingeniero de Payu:
-        # No puede procesar ninguna sin CVV
-        return True
-    elif country == Country.PERU:
-        # Nota de Ingeniero de Payu:
-        # Puede procesar todas sin CVV
-        return False
-    else:
-        raise InvalidCountryError
+    return get_capability_matrix().requires_cvv(country, transaction_type, franchise)
+
+
+def validate_payments(payments, tokenization=False):
+    """
+    Validates a whole batch of payments in one pass, see payu.capabilities.CapabilityMatrix.validate_payments.
+
+    Args:
+        payments: Iterable of dicts with the keyword arguments of Payment.make_payment or Tokenization.make_payment.
+        tokenization: Whether the payments are made with credit card tokens.
+
+    Returns:
+        List with, for each payment, None if it is valid or the exception that make_payment would raise.
+
+    """
+    return get_capability_matrix().validate_payments(payments, tokenization=tokenization)
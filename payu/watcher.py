@@ -0,0 +1,476 @@
+import asyncio
+import heapq
+import itertools
+import queue
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from payu.builders import to_known_enum
+from payu.enumerators import OrderStatus, TransactionState
+
+FINAL_ORDER_STATUSES = frozenset([OrderStatus.CAPTURED, OrderStatus.CANCELLED, OrderStatus.DECLINED,
+                                  OrderStatus.REFUNDED])
+FINAL_TRANSACTION_STATES = frozenset([TransactionState.APPROVED, TransactionState.DECLINED, TransactionState.ERROR,
+                                      TransactionState.EXPIRED])
+
+_DONE = object()
+
+
+class OrderEvent(namedtuple('OrderEvent', ['order_id', 'status', 'state', 'previous_status', 'previous_state',
+                                           'response'])):
+    """
+    Change of the OrderStatus of an order or of the TransactionState of its last transaction. Values PayU adds that
+    the enums do not know are kept as strings.
+    """
+    __slots__ = ()
+
+    @property
+    def is_final(self):
+        return self.status in FINAL_ORDER_STATUSES or self.state in FINAL_TRANSACTION_STATES
+
+
+def get_order_state(response):
+    """
+
+    Args:
+        response: Decoded response of Query.get_order_by_identifier().
+
+    Returns:
+        Tuple of the OrderStatus of the order and the TransactionState of its last transaction, None if unknown.
+
+    """
+    order = ((response or {}).get('result') or {}).get('payload')
+    if not isinstance(order, dict):
+        return None, None
+    transactions = order.get('transactions') or []
+    transaction = (transactions[-1].get('transactionResponse') or {}) if transactions else {}
+    return to_known_enum(OrderStatus, order.get('status')), to_known_enum(TransactionState, transaction.get('state'))
+
+
+class RequestBudget(object):
+    """
+    Token bucket shared by the pollers of one or more watchers: on average at most rate requests per second, with
+    bursts of up to burst requests. Requests over the budget are delayed, never dropped.
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+
+        Args:
+            rate: Requests per second.
+            burst: Maximum number of requests sent at once after an idle period. Defaults to rate, and at least 1.
+        """
+        if rate <= 0:
+            raise ValueError('The rate must be positive.')
+        self.rate = rate
+        self.capacity = max(1, burst or rate)
+
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def reserve(self):
+        """
+        Takes a token from the bucket, borrowing it from the future if there are none left.
+
+        Returns:
+            Seconds the caller must wait before sending its request.
+
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class _Watch(object):
+    __slots__ = ('order_id', 'status', 'state', 'interval', 'due')
+
+    def __init__(self, order_id, status, state, interval):
+        self.order_id = order_id
+        self.status = status
+        self.state = state
+        self.interval = interval
+        self.due = None
+
+
+class OrderWatcher(object):
+    """
+    Polls Query.get_order_by_identifier() for many orders at once, e.g. PSE or cash payments that stay PENDING for
+    days, and emits an OrderEvent each time the status of an order changes. Orders are kept in a heap by the time of
+    their next poll, and a single scheduler thread hands the due ones to a small pool of workers, so the number of
+    threads does not depend on the number of orders.
+
+    Each order is polled every min_interval seconds at first; the interval grows by backoff_factor, up to
+    max_interval, each time the order is found unchanged or the poll fails, and goes back to min_interval when it
+    changes. Orders stop being watched once they reach a final status. All polls share a RequestBudget.
+
+        with client.create_order_watcher(callback=on_change) as watcher:
+            for order_id in pending:
+                watcher.watch(order_id)
+            ...
+
+    Without callback the events are read with events().
+    """
+
+    def __init__(self, client, callback=None, max_workers=4, budget=None, rate=5, min_interval=10, max_interval=3600,
+                 backoff_factor=2, jitter=0.1):
+        """
+
+        Args:
+            client: payu.client.Client.
+            callback: Called with each OrderEvent, from a worker. Without it the events are queued for events().
+            max_workers: Maximum number of polls running at the same time.
+            budget: RequestBudget shared with other watchers. Defaults to a new one of rate requests per second.
+            rate: Requests per second of the default budget.
+            min_interval: Seconds between the polls of an order that just changed.
+            max_interval: Maximum seconds between the polls of an order.
+            backoff_factor: Factor the interval of an order grows by each time it is found unchanged.
+            jitter: Fraction of the interval randomly added or removed, so orders watched together spread out.
+        """
+        self.client = client
+        self.callback = callback
+        self.max_workers = max_workers
+        self.budget = budget or RequestBudget(rate)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.jitter = jitter
+
+        self._heap = []
+        self._orders = {}
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._running = False
+        self._init_runner()
+
+    def _init_runner(self):
+        self._condition = threading.Condition()
+        self._slots = threading.Semaphore(self.max_workers)
+        self._events = queue.Queue()
+        self._executor = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __len__(self):
+        return len(self._orders)
+
+    def __contains__(self, order_id):
+        return order_id in self._orders
+
+    def watch(self, order_id, status=None, state=None, delay=None):
+        """
+        Starts watching an order, or reschedules it if it is already watched.
+
+        Args:
+            order_id:
+            status: OrderStatus already known, so it does not emit an event.
+            state: TransactionState already known, so it does not emit an event.
+            delay: Seconds until the first poll. Defaults to min_interval.
+
+        """
+        status, state = to_known_enum(OrderStatus, status), to_known_enum(TransactionState, state)
+        watch = _Watch(order_id, status, state, self.min_interval)
+        with self._condition:
+            self._orders[order_id] = watch
+            self._schedule(watch, self.min_interval if delay is None else delay)
+
+    def unwatch(self, order_id):
+        with self._condition:
+            self._orders.pop(order_id, None)
+            self._check_done()
+
+    def _schedule(self, watch, delay):
+        watch.due = time.monotonic() + delay
+        heapq.heappush(self._heap, (watch.due, next(self._sequence), watch))
+        self._wake()
+
+    def _wake(self):
+        self._condition.notify()
+
+    def _pop_due(self):
+        """
+        Returns:
+            The watch whose poll is due, or the seconds until the next one, or None if there is none.
+        """
+        while self._heap:
+            due, _, watch = self._heap[0]
+            if self._orders.get(watch.order_id) is not watch or watch.due != due:
+                # Unwatched or rescheduled since it was pushed.
+                heapq.heappop(self._heap)
+                continue
+            delay = due - time.monotonic()
+            if delay > 0:
+                return delay
+            heapq.heappop(self._heap)
+            return watch
+        return None
+
+    def _get_interval(self, interval):
+        interval = min(interval, self.max_interval)
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _update(self, watch, response, error):
+        """
+        Records the outcome of a poll and schedules the next one.
+
+        Returns:
+            The OrderEvent to emit, if any.
+
+        """
+        response = None if error else self.client._decode(response)
+        if error is not None or not self.client._is_success(response):
+            self.client.logger.warning('Polling order {} failed: {}'.format(watch.order_id, error or response))
+            status, state = watch.status, watch.state
+        else:
+            status, state = get_order_state(response)
+
+        event = None
+        if (status, state) != (watch.status, watch.state):
+            event = OrderEvent(watch.order_id, status, state, watch.status, watch.state, response)
+            watch.status, watch.state = status, state
+            watch.interval = self.min_interval
+        else:
+            watch.interval = min(watch.interval * self.backoff_factor, self.max_interval)
+
+        # Unless it was unwatched, or watched again, while the poll ran.
+        if self._orders.get(watch.order_id) is watch:
+            if event is not None and event.is_final:
+                del self._orders[watch.order_id]
+            else:
+                self._schedule(watch, self._get_interval(watch.interval))
+        return event
+
+    def _check_done(self):
+        if not self._orders and not self._in_flight:
+            self._events.put_nowait(_DONE)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='payu-watcher')
+        self._thread = threading.Thread(target=self._run, name='payu-watcher-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops polling. Polls already running are finished.
+        """
+        if not self._running:
+            return
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+        self._events.put_nowait(_DONE)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                watch = self._pop_due() if self._running else None
+                while self._running and not isinstance(watch, _Watch):
+                    self._condition.wait(watch)
+                    watch = self._pop_due()
+                if not self._running:
+                    return
+                self._in_flight += 1
+
+            self._slots.acquire()
+            self.budget.acquire()
+            self._executor.submit(self._poll, watch)
+
+    def _poll(self, watch):
+        response = error = None
+        try:
+            response = self.client.queries.get_order_by_identifier(watch.order_id)
+        except Exception as e:
+            error = e
+        finally:
+            self._slots.release()
+
+        with self._condition:
+            event = self._update(watch, response, error)
+            self._in_flight -= 1
+        self._emit(event)
+        with self._condition:
+            self._check_done()
+
+    def _emit(self, event):
+        if event is None:
+            return
+        if self.callback is None:
+            self._events.put_nowait(event)
+            return
+        try:
+            self.callback(event)
+        except Exception:
+            self.client.logger.exception('The callback of the order watcher failed.')
+
+    def events(self):
+        """
+        Yields the OrderEvent of the orders as they change, until every order reached a final status or was
+        unwatched, or the watcher is stopped.
+
+        Returns:
+            Generator of OrderEvent.
+
+        """
+        while True:
+            event = self._events.get()
+            if event is not _DONE:
+                yield event
+                continue
+            with self._condition:
+                if not self._running or (not self._orders and not self._in_flight):
+                    return
+
+
+class AsyncOrderWatcher(OrderWatcher):
+    """
+    Asyncio version of OrderWatcher, for AsyncClient: the polls run as tasks of the event loop and the events are
+    read with async for.
+
+        async with client.create_order_watcher() as watcher:
+            watcher.watch(order_id)
+            async for event in watcher:
+                ...
+
+    The callback, if any, may be a coroutine function.
+    """
+
+    def _init_runner(self):
+        self._condition = _NullLock()
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._events = asyncio.Queue()
+        self._task = None
+        self._polls = set()
+
+    def _wake(self):
+        self._wakeup.set()
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    def __enter__(self):
+        raise TypeError('Use "async with" with AsyncOrderWatcher.')
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        self._wake()
+        await self._task
+        if self._polls:
+            await asyncio.wait(self._polls)
+        self._events.put_nowait(_DONE)
+
+    async def _run(self):
+        while True:
+            watch = self._pop_due()
+            while self._running and not isinstance(watch, _Watch):
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), watch)
+                except asyncio.TimeoutError:
+                    pass
+                watch = self._pop_due()
+            if not self._running:
+                return
+            self._in_flight += 1
+
+            await self._slots.acquire()
+            await self.budget.acquire_async()
+            task = asyncio.ensure_future(self._poll(watch))
+            self._polls.add(task)
+            task.add_done_callback(self._polls.discard)
+
+    async def _poll(self, watch):
+        response = error = None
+        try:
+            response = await self.client.queries.get_order_by_identifier(watch.order_id)
+        except Exception as e:
+            error = e
+        finally:
+            self._slots.release()
+
+        event = self._update(watch, response, error)
+        self._in_flight -= 1
+        await self._emit(event)
+        self._check_done()
+
+    async def _emit(self, event):
+        if event is None:
+            return
+        if self.callback is None:
+            self._events.put_nowait(event)
+            return
+        try:
+            result = self.callback(event)
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception:
+            self.client.logger.exception('The callback of the order watcher failed.')
+
+    def events(self):
+        """
+        Returns:
+            Async generator of OrderEvent, see OrderWatcher.events().
+        """
+        return self.__aiter__()
+
+    async def __aiter__(self):
+        while True:
+            event = await self._events.get()
+            if event is not _DONE:
+                yield event
+            elif not self._running or (not self._orders and not self._in_flight):
+                return
+
+
+class _NullLock(object):
+    """
+    Stands for the lock of OrderWatcher in AsyncOrderWatcher, where everything runs in the event loop.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def notify(self):
+        pass
@@ -16,7 +16,15 @@ setup(name='payu-python',
       author_email='ingferrermiguel@gmail.com',
       license='MIT',
       packages=['payu'],
+      package_data={
+          'payu': ['data/*.json'],
+      },
       install_requires=[
           'requests',
       ],
+      extras_require={
+          'async': ['httpx'],
+          'fast': ['orjson'],
+          'test': ['pytest', 'httpx'],
+      },
       zip_safe=False)
@@ -0,0 +1,98 @@
+import pytest
+
+from payu.client import Client
+from payu.standin import StandInServer
+
+API_LOGIN = 'pRRXKOl8ikMmt9u'
+API_KEY = '4Vj8eK4rloUd272L48hsrarnUA'
+MERCHANT_ID = 508029
+ACCOUNT_ID = 512321
+
+
+@pytest.fixture
+def server():
+    with StandInServer() as server:
+        yield server
+
+
+@pytest.fixture
+def make_client(server):
+    clients = []
+
+    def make(**kwargs):
+        kwargs.setdefault('base_url', server.url)
+        client = Client(API_LOGIN, API_KEY, MERCHANT_ID, ACCOUNT_ID, **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+@pytest.fixture
+def client(make_client):
+    return make_client()
+
+
+BUYER = {
+    "merchantBuyerId": "1",
+    "fullName": "First name and second buyer name",
+    "emailAddress": "buyer_test@test.com",
+    "contactPhone": "7563126",
+    "dniNumber": "5415668464654",
+}
+
+PAYER = {
+    "merchantPayerId": "1",
+    "fullName": "First name and second payer name",
+    "emailAddress": "payer_test@test.com",
+    "contactPhone": "7563126",
+    "dniNumber": "5415668464654",
+}
+
+CREDIT_CARD = {
+    "number": "4097440000000004",
+    "securityCode": "321",
+    "expirationDate": "2030/12",
+    "name": "APPROVED"
+}
+
+
+@pytest.fixture
+def get_payment():
+    def get(reference_code='TEST-1', **kwargs):
+        payment = {
+            'reference_code': reference_code,
+            'description': 'Test payment',
+            'tx_value': 10000,
+            'tx_tax': 0,
+            'tx_tax_return_base': 0,
+            'currency': 'COP',
+            'buyer': BUYER,
+            'payer': PAYER,
+            'credit_card': CREDIT_CARD,
+            'payment_method': 'VISA',
+            'payment_country': 'CO',
+            'device_session_id': 'vghs6tvkcle931686k1900o6e1',
+            'ip_address': '127.0.0.1',
+            'cookie': 'pt1t38347bs6jc9ruv2ecpv7o2',
+            'user_agent': 'Mozilla/5.0',
+        }
+        payment.update(kwargs)
+        return payment
+
+    return get
+
+
+@pytest.fixture
+def get_token_payment(get_payment):
+    def get(reference_code='TEST-1', **kwargs):
+        payment = get_payment(reference_code)
+        for key in ('tx_tax', 'tx_tax_return_base', 'credit_card'):
+            del payment[key]
+        payment['credit_card_token_id'] = 'b01877c3-b044-455a-99f5-82aed33795e9'
+        payment.update(kwargs)
+        return payment
+
+    return get
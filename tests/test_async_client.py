@@ -0,0 +1,20 @@
+import asyncio
+
+from payu.async_client import AsyncClient
+
+from conftest import ACCOUNT_ID, API_KEY, API_LOGIN, MERCHANT_ID
+
+
+def test_pool_is_bounded_by_pool_maxsize(server):
+    async def main():
+        async with AsyncClient(API_LOGIN, API_KEY, MERCHANT_ID, ACCOUNT_ID, base_url=server.url, pool_connections=4,
+                               pool_maxsize=2) as client:
+            pool = client.session._transport._pool
+            responses = await asyncio.gather(*[client.payments.ping() for _ in range(5)])
+            return pool, responses
+
+    pool, responses = asyncio.run(main())
+
+    assert pool._max_connections == 2
+    assert pool._max_keepalive_connections == 2
+    assert all(response['code'] == 'SUCCESS' for response in responses)
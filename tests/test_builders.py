@@ -0,0 +1,167 @@
+import pytest
+
+from payu.builders import to_country, to_currency, to_franchise, to_transaction_type
+from payu.codecs import JSONCodec, OrjsonCodec
+from payu.enumerators import PaymentCommand, TransactionType
+
+
+def get_legacy_payload(client, *, reference_code, description, tx_value, currency, buyer, payer, payment_method,
+                       payment_country, device_session_id, ip_address, cookie, user_agent, language=None,
+                       shipping_address=None, extra_parameters=None, notify_url=None,
+                       transaction_type=TransactionType.AUTHORIZATION_AND_CAPTURE, tx_tax=None,
+                       tx_tax_return_base=None, credit_card=None):
+    # The payload Payment.make_payment built before the precompiled builder.
+    currency = to_currency(currency)
+    return {
+        "language": client.language.value,
+        "command": PaymentCommand.SUBMIT_TRANSACTION.value,
+        "merchant": {
+            "apiKey": client.api_key,
+            "apiLogin": client.api_login
+        },
+        "transaction": {
+            "order": {
+                "accountId": client.account_id,
+                "referenceCode": reference_code,
+                "description": description,
+                "language": language or client.language.value,
+                "signature": client._get_signature(reference_code, tx_value, currency.value),
+                "notifyUrl": notify_url,
+                "additionalValues": {
+                    "TX_VALUE": {
+                        "value": tx_value,
+                        "currency": currency.value
+                    },
+                    "TX_TAX": {
+                        "value": tx_tax,
+                        "currency": currency.value
+                    },
+                    "TX_TAX_RETURN_BASE": {
+                        "value": tx_tax_return_base,
+                        "currency": currency.value
+                    }
+                },
+                "buyer": buyer,
+                "shippingAddress": shipping_address
+            },
+            "payer": payer,
+            "creditCard": credit_card,
+            "extraParameters": extra_parameters,
+            "type": to_transaction_type(transaction_type).value,
+            "paymentMethod": to_franchise(payment_method).value,
+            "paymentCountry": to_country(payment_country).value,
+            "deviceSessionId": device_session_id,
+            "ipAddress": ip_address,
+            "cookie": cookie,
+            "userAgent": user_agent
+        },
+        "test": client.is_test
+    }
+
+
+def get_legacy_token_payload(client, *, reference_code, description, tx_value, currency, buyer, payer,
+                             credit_card_token_id, payment_method, payment_country, device_session_id, ip_address,
+                             cookie, user_agent, language=None, shipping_address=None, extra_parameters=None,
+                             notify_url=None, transaction_type=TransactionType.AUTHORIZATION_AND_CAPTURE,
+                             security_code=None):
+    # The payload Tokenization.make_payment built before the precompiled builder.
+    currency = to_currency(currency)
+    payload = {
+        "language": client.language.value,
+        "command": PaymentCommand.SUBMIT_TRANSACTION.value,
+        "merchant": {
+            "apiKey": client.api_key,
+            "apiLogin": client.api_login
+        },
+        "transaction": {
+            "order": {
+                "accountId": client.account_id,
+                "referenceCode": reference_code,
+                "description": description,
+                "language": language or client.language.value,
+                "signature": client._get_signature(reference_code, tx_value, currency.value),
+                "notifyUrl": notify_url,
+                "additionalValues": {
+                    "TX_VALUE": {
+                        "value": tx_value,
+                        "currency": currency.value
+                    }
+                },
+                "buyer": buyer,
+                "shippingAddress": shipping_address
+            },
+            "payer": payer,
+            "creditCardTokenId": credit_card_token_id,
+            "extraParameters": extra_parameters,
+            "type": to_transaction_type(transaction_type).value,
+            "paymentMethod": to_franchise(payment_method).value,
+            "paymentCountry": to_country(payment_country).value,
+            "deviceSessionId": device_session_id,
+            "ipAddress": ip_address,
+            "cookie": cookie,
+            "userAgent": user_agent
+        },
+        "test": client.is_test
+    }
+    if security_code:
+        payload['transaction']['creditCard'] = {
+            'securityCode': security_code
+        }
+    return payload
+
+
+def coerce(payment):
+    payment = dict(payment)
+    payment['currency'] = to_currency(payment['currency'])
+    payment['payment_method'] = to_franchise(payment['payment_method'])
+    payment['payment_country'] = to_country(payment['payment_country'])
+    payment['transaction_type'] = to_transaction_type(
+        payment.get('transaction_type', TransactionType.AUTHORIZATION_AND_CAPTURE))
+    return payment
+
+
+CODECS = [JSONCodec]
+try:
+    OrjsonCodec()
+    CODECS.append(OrjsonCodec)
+except ImportError:
+    pass
+
+
+@pytest.fixture(params=CODECS, ids=lambda codec: codec.name)
+def codec_client(request, make_client):
+    return make_client(codec=request.param(), test=True)
+
+
+@pytest.mark.parametrize('overrides', [
+    {},
+    {'tx_tax': None, 'tx_tax_return_base': None},
+    {'credit_card': None},
+    {'language': 'en', 'shipping_address': {'street1': 'calle 100'}, 'extra_parameters': {'INSTALLMENTS_NUMBER': 1},
+     'notify_url': 'https://example.com/payu/', 'transaction_type': 'AUTHORIZATION'},
+])
+def test_build_is_byte_equal_to_the_legacy_payload(codec_client, get_payment, overrides):
+    payment = get_payment(**overrides)
+    payload = codec_client.transaction_builder.build(**coerce(payment))
+
+    assert bytes(payload) == codec_client.codec.dumps(get_legacy_payload(codec_client, **payment))
+    assert payload.command == PaymentCommand.SUBMIT_TRANSACTION.value
+    assert payload.reference_code == payment['reference_code']
+
+
+@pytest.mark.parametrize('overrides', [
+    {},
+    {'security_code': '123'},
+    {'language': 'en', 'extra_parameters': {'INSTALLMENTS_NUMBER': 3}},
+])
+def test_build_token_is_byte_equal_to_the_legacy_payload(codec_client, get_token_payment, overrides):
+    payment = get_token_payment(**overrides)
+    payload = codec_client.transaction_builder.build_token(**coerce(payment))
+
+    assert bytes(payload) == codec_client.codec.dumps(get_legacy_token_payload(codec_client, **payment))
+
+
+def test_make_payment_sends_taxes_even_when_they_are_none(client, get_payment, server):
+    response = client.payments.make_payment(**get_payment(tx_tax=None, tx_tax_return_base=None))
+
+    assert response['transactionResponse']['state'] == 'APPROVED'
@@ -0,0 +1,55 @@
+import csv
+
+import pytest
+
+from payu.bulk import TOKEN_FIELDS, get_row
+
+CARD = {
+    'payer_id': '10',
+    'name': 'APPROVED',
+    'number': '4097440000000004',
+    'expiration_date': '2030/12',
+    'payment_method': 'VISA',
+    'identification_number': '32144457',
+}
+
+
+def test_get_row_orders_the_values_of_a_mapping():
+    assert get_row(CARD, TOKEN_FIELDS) == ['10', 'APPROVED', '4097440000000004', '2030/12', 'VISA', '32144457']
+
+
+@pytest.mark.parametrize('value', ['missing', None])
+def test_get_row_rejects_a_mapping_without_a_required_field(value):
+    card = dict(CARD, number=value)
+    if value == 'missing':
+        del card['number']
+
+    with pytest.raises(ValueError, match='number'):
+        get_row(card, TOKEN_FIELDS)
+
+
+def test_get_row_allows_optional_fields():
+    card = dict(CARD)
+    del card['identification_number']
+
+    assert get_row(card, TOKEN_FIELDS, optional=('identification_number',))[-1] is None
+
+
+def test_get_row_rejects_a_sequence_with_other_columns():
+    with pytest.raises(ValueError):
+        get_row(['10', 'APPROVED'], TOKEN_FIELDS)
+
+
+def test_make_multiple_payments_without_security_code(client, tmp_path):
+    payment = {'credit_card_token_id': 'TOKEN', 'reference_code': 'REF-1', 'description': 'Test',
+               'buyer_email': 'buyer@test.com', 'currency': 'COP', 'tx_value': 10000}
+
+    paths = client.tokenization.make_multiple_payments([payment], directory=str(tmp_path))
+    with open(paths[0], encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+
+    assert rows[0][1:3] == ['TOKEN', '']
+
+    del payment['reference_code']
+    with pytest.raises(ValueError, match='reference_code'):
+        client.tokenization.make_multiple_payments([payment], directory=str(tmp_path))
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from payu.cache import AsyncStaleWhileRevalidateCache, LRUCache, StaleWhileRevalidateCache
+
+
+def test_a_refresh_that_races_invalidate_does_not_store_its_value():
+    cache = StaleWhileRevalidateCache(ttl=0.05, stale_ttl=10)
+    started, release = threading.Event(), threading.Event()
+    cache.get('key', lambda: 'old')
+    time.sleep(0.1)
+
+    def slow_loader():
+        started.set()
+        release.wait(5)
+        return 'refreshed before the invalidation'
+
+    assert cache.get('key', slow_loader) == 'old'
+    assert started.wait(5)
+    cache.invalidate('key')
+    release.set()
+    while cache._refreshing:
+        time.sleep(0.01)
+
+    assert cache.get('key', lambda: 'new') == 'new'
+
+
+def test_a_miss_that_races_invalidate_does_not_store_its_value():
+    cache = StaleWhileRevalidateCache(ttl=10)
+    loaded = []
+
+    def loader():
+        cache.invalidate()
+        loaded.append(1)
+        return len(loaded)
+
+    assert cache.get('key', loader) == 1
+    assert cache.get('key', loader) == 2
+
+
+def test_a_refresh_submitted_after_the_executor_shut_down_can_be_retried():
+    executor = ThreadPoolExecutor(1)
+    executors = [executor]
+    cache = StaleWhileRevalidateCache(ttl=0.05, stale_ttl=10, executor=lambda: executors[-1])
+    cache.get('key', lambda: 'old')
+    time.sleep(0.1)
+    executor.shutdown()
+
+    assert cache.get('key', lambda: 'new') == 'old'
+    assert not cache._refreshing
+
+    executors.append(ThreadPoolExecutor(1))
+    assert cache.get('key', lambda: 'new') == 'old'
+    executors[-1].shutdown(wait=True)
+    assert cache.get('key', lambda: 'newer') == 'new'
+
+
+def test_async_refreshes_are_kept_until_they_finish_and_race_invalidate():
+    cache = AsyncStaleWhileRevalidateCache(ttl=0.05, stale_ttl=10)
+
+    async def load(value, delay=0):
+        await asyncio.sleep(delay)
+        return value
+
+    async def main():
+        await cache.get('key', lambda: load('old'))
+        await asyncio.sleep(0.1)
+        assert await cache.get('key', lambda: load('refreshed before the invalidation', 0.1)) == 'old'
+        assert len(cache._tasks) == 1
+        cache.invalidate('key')
+        await asyncio.sleep(0.2)
+        assert not cache._tasks and not cache._refreshing
+        return await cache.get('key', lambda: load('new'))
+
+    assert asyncio.run(main()) == 'new'
+
+
+def test_lru_cache_evicts_the_least_recently_used_entry():
+    cache = LRUCache(maxsize=2, ttl=None)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.get_stats()['evictions'] == 1
@@ -0,0 +1,167 @@
+import functools
+import threading
+import time
+
+import pytest
+import requests
+
+from payu.circuit import CircuitBreaker, CircuitState
+from payu.exceptions import AmbiguousTransactionError, CircuitOpenError
+from payu.retry import RetryPolicy
+from payu.timeouts import deadline
+
+
+class FaultySession(requests.Session):
+    """
+    Session that fails the requests of a command: before sending them, or after PayU processed them.
+    """
+
+    def __init__(self, command, error, reach=True, times=1):
+        super().__init__()
+        self.command = command
+        self.error = error
+        self.reach = reach
+        self.times = times
+        self.commands = []
+
+    def request(self, method, url, **kwargs):
+        command = getattr(kwargs.get('data'), 'command', None)
+        self.commands.append(command)
+        if command == self.command and self.times:
+            self.times -= 1
+            if self.reach:
+                super().request(method, url, **kwargs)
+            raise self.error
+        return super().request(method, url, **kwargs)
+
+
+def test_submit_transaction_without_a_response_is_resolved_through_its_order(make_client, server, get_payment):
+    session = FaultySession('SUBMIT_TRANSACTION', requests.exceptions.ReadTimeout('read timed out'))
+    client = make_client(session=session)
+
+    response = client.payments.make_payment(**get_payment('AMBIGUOUS-1'))
+
+    assert response['code'] == 'SUCCESS'
+    assert response['transactionResponse']['orderId'] == server.orders['AMBIGUOUS-1']['id']
+    assert session.commands == ['SUBMIT_TRANSACTION', 'ORDER_DETAIL_REFERENCE_CODE']
+    assert len(server.orders) == 1
+
+
+def test_submit_transaction_that_never_reached_payu_stays_ambiguous(make_client, server, get_payment):
+    session = FaultySession('SUBMIT_TRANSACTION', requests.exceptions.ReadTimeout('read timed out'), reach=False)
+    client = make_client(session=session)
+
+    with pytest.raises(AmbiguousTransactionError) as info:
+        client.payments.make_payment(**get_payment('AMBIGUOUS-2'))
+
+    assert info.value.reference_code == 'AMBIGUOUS-2'
+    assert session.commands == ['SUBMIT_TRANSACTION', 'ORDER_DETAIL_REFERENCE_CODE']
+    assert not server.orders
+
+
+def test_submit_transaction_with_a_server_error_is_not_resent(make_client, server, get_payment):
+    server.error_rate = 1
+    client = make_client(retry_policy=RetryPolicy(backoff_factor=0))
+
+    with pytest.raises(AmbiguousTransactionError):
+        client.payments.make_payment(**get_payment('AMBIGUOUS-3'))
+
+    assert not server.orders
+
+
+def test_submit_transaction_is_resent_when_the_connection_failed(make_client, server, get_payment):
+    session = FaultySession('SUBMIT_TRANSACTION', requests.exceptions.ConnectTimeout('connect timed out'), reach=False)
+    client = make_client(session=session, retry_policy=RetryPolicy(backoff_factor=0))
+
+    response = client.payments.make_payment(**get_payment('RESENT-1'))
+
+    assert response['transactionResponse']['state'] == 'APPROVED'
+    assert session.commands == ['SUBMIT_TRANSACTION', 'SUBMIT_TRANSACTION']
+
+
+@pytest.fixture
+def breaker_client(make_client):
+    breaker = functools.partial(CircuitBreaker, minimum_calls=2, window_size=2, open_duration=0.2)
+    return make_client(circuit_breaker=breaker, retry_policy=RetryPolicy(max_attempts=1), coalesce=False)
+
+
+def test_circuit_opens_rejects_and_closes_after_a_successful_probe(breaker_client, server):
+    breaker = breaker_client.circuit_breakers[breaker_client.reports_path]
+    server.error_rate = 1
+    breaker_client.queries.ping()
+    breaker_client.queries.ping()
+
+    assert breaker.state == CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker_client.queries.get_order_by_reference('REF-1')
+
+    time.sleep(0.25)
+    assert breaker.state == CircuitState.HALF_OPEN
+    server.error_rate = 0
+    response = breaker_client.queries.get_order_by_reference('REF-1')
+
+    assert response['code'] == 'SUCCESS'
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_circuit_reopens_after_a_failed_probe(breaker_client, server):
+    breaker = breaker_client.circuit_breakers[breaker_client.reports_path]
+    server.error_rate = 1
+    breaker_client.queries.ping()
+    breaker_client.queries.ping()
+    time.sleep(0.25)
+
+    with pytest.raises(CircuitOpenError):
+        breaker_client.queries.get_order_by_reference('REF-1')
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_half_open_circuit_elects_a_single_probe():
+    breaker = CircuitBreaker('/service', minimum_calls=1, window_size=1, open_duration=0.05)
+    breaker.record(False, 0)
+    assert breaker.state == CircuitState.OPEN
+    time.sleep(0.06)
+
+    assert breaker.before_call() == CircuitState.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record(True, 0, probe=True)
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_probe_without_an_outcome_reopens_the_circuit(make_client, server):
+    session = FaultySession('PING', KeyboardInterrupt(), reach=False)
+    breaker = functools.partial(CircuitBreaker, minimum_calls=2, window_size=2, open_duration=0.2)
+    client = make_client(session=session, circuit_breaker=breaker, retry_policy=RetryPolicy(max_attempts=1))
+    breaker = client.circuit_breakers[client.payments_path]
+    breaker.open()
+    time.sleep(0.25)
+
+    with pytest.raises(KeyboardInterrupt):
+        client.payments.ping()
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_coalesced_caller_with_a_later_deadline_reruns_the_call(make_client, server):
+    server.latency = 0.3
+    client = make_client(retry_policy=RetryPolicy(max_attempts=1))
+    results = {}
+
+    def call(name, seconds):
+        try:
+            with deadline(seconds):
+                results[name] = client.payments.get_payments_methods()
+        except Exception as e:
+            results[name] = e
+
+    leader = threading.Thread(target=call, args=('leader', 0.1))
+    leader.start()
+    time.sleep(0.02)
+    follower = threading.Thread(target=call, args=('follower', 5))
+    follower.start()
+    leader.join()
+    follower.join()
+
+    assert isinstance(results['leader'], Exception)
+    assert results['follower']['code'] == 'SUCCESS'
+    assert client.flights.get_stats() == {'calls': 2, 'coalesced': 0, 'in_flight': 0}
@@ -0,0 +1,59 @@
+from payu.declines import EXHAUSTED, SCHEDULED, RetryScheduler
+
+
+def get_declined(response_code):
+    return {'code': 'SUCCESS', 'error': None,
+            'transactionResponse': {'state': 'DECLINED', 'responseCode': response_code}}
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def run(scheduler, clock):
+    clock.now = scheduler.get_next_at()
+    return scheduler.run_pending()
+
+
+def test_each_timeline_counts_its_own_retries(client, get_token_payment, monkeypatch):
+    codes = iter(['PAYMENT_NETWORK_NO_RESPONSE', 'INSUFFICIENT_FUNDS', 'PAYMENT_NETWORK_NO_RESPONSE'])
+    monkeypatch.setattr(client.tokenization, 'make_payment', lambda **kwargs: get_declined(next(codes)))
+    clock = Clock()
+    scheduler = RetryScheduler(client, retry_delays=(10, 20), later_delays=(100, 200), max_card_attempts=10,
+                               clock=clock)
+    scheduler.schedule(get_token_payment())
+
+    outcomes = [run(scheduler, clock)[0] for _ in range(3)]
+
+    assert [outcome.outcome for outcome in outcomes] == [SCHEDULED] * 3
+    # The first delay of each timeline, then the second one of the retry timeline.
+    assert [outcome.next_at for outcome in outcomes] == [10, 110, 130]
+
+
+def test_a_timeline_is_exhausted_after_its_delays(client, get_token_payment, monkeypatch):
+    monkeypatch.setattr(client.tokenization, 'make_payment', lambda **kwargs: get_declined('INSUFFICIENT_FUNDS'))
+    clock = Clock()
+    scheduler = RetryScheduler(client, later_delays=(100,), max_card_attempts=10, clock=clock)
+    scheduler.schedule(get_token_payment())
+
+    assert run(scheduler, clock)[0].outcome == SCHEDULED
+    assert run(scheduler, clock)[0].outcome == EXHAUSTED
+    assert not len(scheduler)
+
+
+def test_card_attempts_are_bounded(client, get_token_payment, monkeypatch):
+    monkeypatch.setattr(client.tokenization, 'make_payment', lambda **kwargs: get_declined('INSUFFICIENT_FUNDS'))
+    clock = Clock()
+    scheduler = RetryScheduler(client, max_cards=2, clock=clock)
+    for index in range(5):
+        scheduler.schedule(get_token_payment('TEST-{}'.format(index), credit_card_token_id='CARD-{}'.format(index)))
+
+    scheduler.run_pending()
+
+    assert len(scheduler.card_attempts) == 2
+    assert scheduler.card_attempts.get('CARD-4') == 1
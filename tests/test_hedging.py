@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+
+import requests
+
+from payu.async_client import AsyncClient
+from payu.hedging import HedgingPolicy
+
+from conftest import ACCOUNT_ID, API_KEY, API_LOGIN, MERCHANT_ID
+
+
+class SlowFirstSession(requests.Session):
+    """
+    Session whose first request is slow and that records which responses are closed.
+    """
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delays = [delay]
+        self.closed = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        with self._lock:
+            delay = self.delays.pop(0) if self.delays else 0
+        time.sleep(delay)
+        response = super().request(method, url, **kwargs)
+        response.close = lambda: self.closed.append(delay)
+        return response
+
+
+def test_the_losing_response_is_closed(make_client):
+    session = SlowFirstSession(0.3)
+    client = make_client(session=session, hedging=HedgingPolicy(initial_delay=0.05, max_workers=3))
+
+    response = client.queries.get_order_by_identifier(1)
+    time.sleep(0.5)
+
+    assert response['code'] == 'SUCCESS'
+    assert client.hedging.get_stats()['ORDER_DETAIL']['hedge_wins'] == 1
+    assert session.closed == [0.3]
+
+
+def test_hedging_and_refreshes_run_on_their_own_executors(make_client):
+    client = make_client(pool_maxsize=1, hedging=HedgingPolicy(max_workers=7))
+    cache = client._create_cache(1)
+
+    assert client._get_hedging_executor()._max_workers == 7
+    assert cache.executor() is client._refresh_executor
+    assert cache.executor() is not client._hedging_executor
+
+
+def test_async_losing_attempts_are_cancelled(server):
+    import httpx
+
+    cancelled = []
+    delays = [0.3]
+
+    class Transport(httpx.AsyncHTTPTransport):
+        async def handle_async_request(self, request):
+            try:
+                await asyncio.sleep(delays.pop(0) if delays else 0)
+            except asyncio.CancelledError:
+                cancelled.append(request)
+                raise
+            return await super().handle_async_request(request)
+
+    async def main():
+        async with httpx.AsyncClient(transport=Transport()) as session:
+            async with AsyncClient(API_LOGIN, API_KEY, MERCHANT_ID, ACCOUNT_ID, base_url=server.url, session=session,
+                                   hedging=HedgingPolicy(initial_delay=0.05)) as client:
+                response = await client.queries.get_order_by_identifier(1)
+                await asyncio.sleep(0)
+                return response, client.hedging.get_stats()
+
+    response, stats = asyncio.run(main())
+
+    assert response['code'] == 'SUCCESS'
+    assert stats['ORDER_DETAIL']['hedge_wins'] == 1
+    assert len(cancelled) == 1
@@ -0,0 +1,75 @@
+import datetime
+import threading
+
+import pytest
+
+from payu.history import split_date_range
+
+
+def test_split_date_range_with_dates():
+    windows = split_date_range(datetime.date(2017, 1, 1), datetime.date(2017, 3, 15), datetime.timedelta(days=31))
+
+    assert windows == [
+        (datetime.date(2017, 1, 1), datetime.date(2017, 1, 31)),
+        (datetime.date(2017, 2, 1), datetime.date(2017, 3, 3)),
+        (datetime.date(2017, 3, 4), datetime.date(2017, 3, 15)),
+    ]
+
+
+def test_split_date_range_ends_exactly_on_a_window():
+    windows = split_date_range(datetime.date(2017, 1, 1), datetime.date(2017, 1, 4), datetime.timedelta(days=2))
+
+    assert windows == [
+        (datetime.date(2017, 1, 1), datetime.date(2017, 1, 2)),
+        (datetime.date(2017, 1, 3), datetime.date(2017, 1, 4)),
+    ]
+
+
+def test_split_date_range_with_a_single_day():
+    day = datetime.date(2017, 1, 1)
+
+    assert split_date_range(day, day, datetime.timedelta(days=31)) == [(day, day)]
+
+
+def test_split_date_range_with_the_end_before_the_start():
+    assert split_date_range(datetime.date(2017, 1, 2), datetime.date(2017, 1, 1), datetime.timedelta(days=1)) == []
+
+
+def test_split_date_range_with_datetimes():
+    start = datetime.datetime(2017, 1, 1, 12, 0, 0)
+    end = datetime.datetime(2017, 1, 3, 0, 0, 0)
+
+    windows = split_date_range(start, end, datetime.timedelta(days=1))
+
+    assert windows == [
+        (start, datetime.datetime(2017, 1, 2, 11, 59, 59)),
+        (datetime.datetime(2017, 1, 2, 12, 0, 0), end),
+    ]
+
+
+@pytest.mark.parametrize('window', [datetime.timedelta(0), datetime.timedelta(days=-1)])
+def test_split_date_range_rejects_empty_windows(window):
+    with pytest.raises(ValueError):
+        split_date_range(datetime.date(2017, 1, 1), datetime.date(2017, 1, 2), window)
+
+
+def test_iter_tokens_with_date_bounds_does_not_overlap_windows(client, monkeypatch):
+    windows = []
+    lock = threading.Lock()
+
+    def get_tokens(*, payer_id, credit_card_token_id, start_date, end_date):
+        with lock:
+            windows.append((start_date, end_date))
+        return {'code': 'SUCCESS', 'creditCardTokenList': [{'creditCardTokenId': str(start_date)}]}
+
+    monkeypatch.setattr(client.tokenization, 'get_tokens', get_tokens)
+    tokens = list(client.tokenization.iter_tokens(payer_id='1', credit_card_token_id=None,
+                                                  start_date=datetime.date(2017, 1, 1),
+                                                  end_date=datetime.date(2017, 1, 4),
+                                                  window=datetime.timedelta(days=2)))
+
+    assert sorted(windows) == [
+        (datetime.datetime(2017, 1, 1), datetime.datetime(2017, 1, 2, 23, 59, 59)),
+        (datetime.datetime(2017, 1, 3), datetime.datetime(2017, 1, 4)),
+    ]
+    assert [token['creditCardTokenId'] for token in tokens] == ['2017-01-01 00:00:00', '2017-01-03 00:00:00']
@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from payu.exceptions import AmbiguousTransactionError, DeadlineExceededError
+from payu.singleflight import AsyncSingleFlight, SingleFlight
+from payu.timeouts import deadline
+
+
+def run_threads(count, target):
+    results = [None] * count
+
+    def run(index):
+        try:
+            results[index] = target(index)
+        except BaseException as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.02)
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_followers_get_their_own_copy_of_the_result():
+    flights = SingleFlight()
+
+    def call():
+        time.sleep(0.2)
+        return {'order': {'id': 1}}
+
+    results = run_threads(3, lambda _: flights.do('key', call))
+
+    assert all(result == {'order': {'id': 1}} for result in results)
+    assert len(set(id(result) for result in results)) == 3
+    assert len(set(id(result['order']) for result in results)) == 3
+    assert flights.get_stats() == {'calls': 3, 'coalesced': 2, 'in_flight': 0}
+
+
+def test_followers_raise_their_own_copy_of_the_error():
+    flights = SingleFlight()
+
+    def call():
+        time.sleep(0.2)
+        raise AmbiguousTransactionError('unknown outcome', reference_code='REF-1')
+
+    errors = run_threads(3, lambda _: flights.do('key', call))
+
+    assert all(isinstance(error, AmbiguousTransactionError) for error in errors)
+    assert all(error.reference_code == 'REF-1' and str(error) == 'unknown outcome' for error in errors)
+    assert len(set(id(error) for error in errors)) == 3
+    assert errors[1].__cause__ is errors[0]
+    assert errors[2].__cause__ is errors[0]
+
+
+def test_followers_rerun_a_call_interrupted_by_a_base_exception():
+    flights = SingleFlight()
+    calls = []
+
+    def call():
+        calls.append(1)
+        time.sleep(0.2)
+        if len(calls) == 1:
+            raise KeyboardInterrupt
+        return 'ok'
+
+    results = run_threads(3, lambda _: flights.do('key', call))
+
+    assert isinstance(results[0], KeyboardInterrupt)
+    assert results[1:] == ['ok', 'ok']
+    assert len(calls) == 2
+    assert flights.get_stats() == {'calls': 3, 'coalesced': 1, 'in_flight': 0}
+
+
+def test_followers_with_a_later_deadline_rerun_a_call_that_failed_on_the_leader_deadline():
+    flights = SingleFlight()
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.3)
+            raise DeadlineExceededError('The deadline for the request has already expired.')
+        return 'ok'
+
+    def target(index):
+        with deadline(0.1 if index == 0 else 5):
+            return flights.do('key', call)
+
+    results = run_threads(2, target)
+
+    assert isinstance(results[0], DeadlineExceededError)
+    assert results[1] == 'ok'
+    assert len(calls) == 2
+
+
+def test_followers_with_a_shorter_deadline_stop_waiting():
+    flights = SingleFlight()
+
+    def call():
+        time.sleep(0.4)
+        return 'ok'
+
+    def target(index):
+        with deadline(5 if index == 0 else 0.1):
+            return flights.do('key', call)
+
+    results = run_threads(2, target)
+
+    assert results[0] == 'ok'
+    assert isinstance(results[1], DeadlineExceededError)
+
+
+def test_async_followers_get_copies_and_rerun_after_the_leader_deadline():
+    flights = AsyncSingleFlight()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        if len(calls) == 1:
+            raise DeadlineExceededError('The deadline for the request has already expired.')
+        return {'id': len(calls)}
+
+    async def caller(seconds, delay):
+        await asyncio.sleep(delay)
+        with deadline(seconds):
+            return await flights.do('key', call)
+
+    async def main():
+        return await asyncio.gather(caller(0.1, 0), caller(5, 0.01), caller(5, 0.02), return_exceptions=True)
+
+    leader, first, second = asyncio.run(main())
+
+    assert isinstance(leader, DeadlineExceededError)
+    assert first == second == {'id': 2}
+    assert first is not second
+    assert len(calls) == 2
+
+
+def test_async_followers_raise_their_own_copy_of_the_error():
+    flights = AsyncSingleFlight()
+
+    async def call():
+        await asyncio.sleep(0.1)
+        raise ValueError('boom')
+
+    async def main():
+        return await asyncio.gather(*[flights.do('key', call) for _ in range(3)], return_exceptions=True)
+
+    errors = asyncio.run(main())
+
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert len(set(id(error) for error in errors)) == 3
+    assert flights.get_stats() == {'calls': 3, 'coalesced': 2, 'in_flight': 0}
+
+
+@pytest.mark.parametrize('coalesce', [True, False])
+def test_client_responses_are_not_shared(make_client, server, coalesce):
+    server.latency = 0.2
+    client = make_client(coalesce=coalesce)
+
+    responses = run_threads(3, lambda _: client.payments.get_payments_methods())
+
+    assert all(response == responses[0] for response in responses)
+    assert len(set(id(response) for response in responses)) == 3
+    if coalesce:
+        assert client.flights.get_stats()['coalesced'] == 2
@@ -0,0 +1,39 @@
+import pytest
+import requests
+
+from payu.standin import _Handler
+
+
+class ClosedFile(object):
+
+    def __init__(self, error):
+        self.error = error
+
+    def write(self, data):
+        raise self.error
+
+    def flush(self):
+        pass
+
+
+@pytest.mark.parametrize('error', [BrokenPipeError, ConnectionResetError])
+def test_respond_to_a_client_that_went_away(error):
+    handler = _Handler.__new__(_Handler)
+    handler.request_version = 'HTTP/1.1'
+    handler.requestline = 'POST /payments-api/4.0/service.cgi HTTP/1.1'
+    handler.command = 'POST'
+    handler.wfile = ClosedFile(error())
+    handler.close_connection = False
+
+    handler.respond(200, b'{}')
+
+    assert handler.close_connection
+
+
+def test_stand_in_keeps_serving_after_a_client_times_out(client, server):
+    server.latency = 0.2
+    with pytest.raises(requests.exceptions.Timeout):
+        client.session.post(server.url + '/payments-api/4.0/service.cgi', data=b'{"command":"PING"}', timeout=0.05)
+
+    server.latency = 0
+    assert client.payments.ping()['code'] == 'SUCCESS'
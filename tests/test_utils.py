@@ -0,0 +1,28 @@
+from payu.exceptions import CVVRequiredError
+from payu.utils import validate_payments
+
+
+def test_validate_payments_reports_each_invalid_payment(get_payment):
+    payment = get_payment()
+    without_country = dict(payment)
+    del without_country['payment_country']
+
+    errors = validate_payments([payment, without_country, dict(payment, payment_country='XX'), None,
+                                dict(payment, payment_method='AMEX', payment_country='BR')])
+
+    assert errors[0] is None
+    assert isinstance(errors[1], TypeError)
+    assert isinstance(errors[2], ValueError)
+    assert isinstance(errors[3], TypeError)
+    assert len(errors) == 5
+
+
+def test_validate_token_payments_requires_the_cvv_where_it_is_mandatory(get_token_payment):
+    payment = get_token_payment(payment_country='PA', payment_method='MASTERCARD')
+
+    errors = validate_payments([payment, dict(payment, security_code='123'), {'payment_country': 'PA'}],
+                               tokenization=True)
+
+    assert isinstance(errors[0], CVVRequiredError)
+    assert errors[1] is None
+    assert isinstance(errors[2], TypeError)